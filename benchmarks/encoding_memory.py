@@ -0,0 +1,62 @@
+"""
+Compare the memory used to store the tilings found by a search as Tiling
+objects, as Tiling.compress bytes and in the compact encoding.
+
+Usage: python benchmarks/encoding_memory.py [number of expansions]
+"""
+import sys
+
+from tilescopethree import TileScopeTHREE
+from tilescopethree.encoding import decode_tiling
+from tilescopethree.strategy_packs_v2 import (
+    all_the_strategies_database_verified, point_placements,
+    point_placements_fusion_with_interleaving,
+    row_and_col_placements_fusion_with_interleaving_fusion)
+
+BASES = [('132', point_placements),
+         ('123', all_the_strategies_database_verified),
+         ('1342_1423', point_placements_fusion_with_interleaving),
+         ('1324', row_and_col_placements_fusion_with_interleaving_fusion)]
+
+
+def deep_size(obj, seen=None):
+    """Return the number of bytes used by the object and everything it
+    refers to."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_size(k, seen) + deep_size(v, seen)
+                          for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_size(x, seen) for x in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_size(obj.__dict__, seen)
+    for slot in getattr(type(obj), '__slots__', ()):
+        if hasattr(obj, slot):
+            size += deep_size(getattr(obj, slot), seen)
+    return size
+
+
+def measure(basis, pack, expansions):
+    searcher = TileScopeTHREE(basis, pack)
+    searcher.expand_classes(expansions)
+    encoded = [info.comb_class
+               for info in searcher.classdb.label_to_info.values()]
+    tilings = [decode_tiling(e) for e in encoded]
+    compressed = [t.compress() for t in tilings]
+    return (len(tilings), deep_size(tilings), deep_size(compressed),
+            deep_size(encoded))
+
+
+if __name__ == '__main__':
+    expansions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    row = "{:<10} {:>8} {:>14} {:>14} {:>14}"
+    print(row.format("basis", "tilings", "Tiling", "compress", "encoding"))
+    for basis, pack in BASES:
+        print(row.format(basis, *measure(basis, pack, expansions)))
@@ -0,0 +1,79 @@
+"""
+Compare the time taken to build the children of the insertion rules of some
+3x3 tilings with the Tiling constructor and from the parent with
+add_obstructions and add_requirement.
+
+Usage: python benchmarks/incremental_children.py [repeats]
+"""
+import sys
+import time
+
+from permuta import Perm
+from tilescopethree.incremental import (add_obstructions, add_requirement,
+                                        stats)
+from tilescopethree.strategies import (all_cell_insertions,
+                                       all_col_insertions,
+                                       all_requirement_insertions,
+                                       all_row_insertions)
+from tilings import Obstruction, Requirement, Tiling
+
+CELLS = [(0, 0), (0, 2), (1, 1), (2, 0), (2, 2)]
+
+
+def tiling(basis, positive):
+    """A 3x3 tiling with the basis in the cells of an X, increasing
+    obstructions between the cells in the same row and a point in the
+    positive cells."""
+    obs = [Obstruction.single_cell(Perm.to_standard(patt), cell)
+           for patt in basis for cell in CELLS]
+    obs += [Obstruction(Perm((0, 1)), ((0, y), (2, y))) for y in (0, 2)]
+    reqs = [[Requirement.single_cell(Perm((0,)), cell)] for cell in positive]
+    return Tiling(obs, reqs)
+
+
+TILINGS = [('132', tiling(['132'], [])),
+           ('123', tiling(['123'], [(1, 1)])),
+           ('1324', tiling(['1324'], [(0, 0)])),
+           ('1234_2143', tiling(['1234', '2143'], [(1, 1), (2, 2)]))]
+
+
+def rules(t):
+    for strategy in (all_row_insertions, all_col_insertions):
+        yield from strategy(t)
+    yield from all_cell_insertions(t, maxreqlen=2)
+    yield from all_requirement_insertions(t, no_reqs=False)
+
+
+def full(t, rule):
+    return [Tiling(t.obstructions + rule.obstructions, t.requirements),
+            Tiling(t.obstructions, t.requirements + (rule.requirement,))]
+
+
+def incremental(t, rule):
+    return [add_obstructions(t, rule.obstructions),
+            add_requirement(t, rule.requirement)]
+
+
+def measure(t, rule_list, build, repeats):
+    start = time.time()
+    for _ in range(repeats):
+        for rule in rule_list:
+            build(t, rule)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    row = "{:<10} {:>6} {:>10} {:>12} {:>8}"
+    print(row.format("basis", "rules", "full", "incremental", "fast"))
+    for name, t in TILINGS:
+        rule_list = list(rules(t))
+        assert all(full(t, rule) == incremental(t, rule)
+                   for rule in rule_list)
+        before = stats.incremental
+        full_time = measure(t, rule_list, full, repeats)
+        incremental_time = measure(t, rule_list, incremental, repeats)
+        fast = (stats.incremental - before) // repeats
+        print(row.format(name, len(rule_list), "{:.2f}".format(full_time),
+                         "{:.2f}".format(incremental_time),
+                         "{}/{}".format(fast, 2 * len(rule_list))))
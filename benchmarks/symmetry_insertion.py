@@ -0,0 +1,42 @@
+"""
+Compare the cost of adding the tilings found by a search with symmetries,
+when all symmetries of every tiling are added to the class database and when
+each tiling is looked up by its canonical form in a SymmetryIndex.
+
+Usage: python benchmarks/symmetry_insertion.py [number of expansions]
+"""
+import sys
+import time
+
+from tilescopethree import TileScopeTHREE
+from tilescopethree.strategy_packs_v2 import (
+    point_placements, row_and_col_placements,
+    row_and_col_placements_fusion_with_interleaving_fusion)
+
+BASES = [('132', point_placements),
+         ('123', row_and_col_placements),
+         ('1234', point_placements),
+         ('1324', row_and_col_placements_fusion_with_interleaving_fusion)]
+
+
+def measure(basis, pack, expansions, canonical_symmetries):
+    searcher = TileScopeTHREE(basis, pack.add_symmetry(),
+                              canonical_symmetries=canonical_symmetries)
+    start = time.time()
+    searcher.expand_classes(expansions)
+    return (len(searcher.classdb.label_to_info), searcher.symmetry_time,
+            time.time() - start)
+
+
+if __name__ == '__main__':
+    expansions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    row = "{:<10} {:<10} {:>8} {:>10} {:>10}"
+    print(row.format("basis", "method", "tilings", "symmetry", "total"))
+    for basis, pack in BASES:
+        for canonical_symmetries in (False, True):
+            tilings, symmetry_time, total = measure(basis, pack, expansions,
+                                                    canonical_symmetries)
+            print(row.format(basis,
+                             "canonical" if canonical_symmetries else "all",
+                             tilings, "{:.2f}".format(symmetry_time),
+                             "{:.2f}".format(total)))
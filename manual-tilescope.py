@@ -1,6 +1,7 @@
 from permuta import Perm
 from permuta.descriptors import Basis
 from tilescopethree import TileScopeTHREE
+from tilescopethree.inferral import InferralEngine
 from tilescopethree.strategies.batch_strategies.cell_insertion import \
     all_cell_insertions
 from tilescopethree.strategies.equivalence_strategies.fusion_with_interleaving import (
@@ -18,6 +19,8 @@ basis = Basis([Perm.to_standard(p) for p in basis.split('_')])
 
 tilescope = TileScopeTHREE(start_tiling, point_placements)
 
+inferral_engine = InferralEngine(point_placements.inferral_strats)
+
 options = ("1: insert a point\n"
            "2: place a point\n"
            "3: factors\n"
@@ -32,18 +35,7 @@ old_tasks = []
 
 def infer(tiling):
     """Repeatedly apply inferral strategies until no change."""
-    inferred = tiling
-    change = False
-    for strategy in point_placements.inferral_strats:
-        s = strategy(inferred)
-        if s is not None:
-            new_inferred = s.comb_classes[0]
-            if new_inferred != inferred:
-                change = True
-                inferred = new_inferred
-    if not change:
-        return inferred
-    return infer(inferred)
+    return inferral_engine.infer(tiling)
 
 
 def insert_point(tiling):
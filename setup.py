@@ -25,6 +25,9 @@ setup(
         'tilings==1.0.1',
         'sympy==1.5.1',
     ],
+    extras_require={
+        'numpy': ['numpy==1.18.1'],
+    },
     dependency_links = [
         'https://github.com/PermutaTriangle/Tilings/tarball/develop#egg=tilings-1.0.1',
     ],
@@ -35,5 +38,6 @@ setup(
         'pytest-pep8==1.0.6',
         'pytest-isort==0.3.1',
         'pytest-timeout==1.3.4',
+        'numpy==1.18.1',
     ],
 )
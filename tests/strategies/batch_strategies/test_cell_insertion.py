@@ -32,12 +32,8 @@ def test_all_cell_insertions_points(simple_tiling):
                       [Requirement(Perm((0, 1)), ((0, 0), (1, 0))),
                        Requirement(Perm((0, 1)), ((0, 0), (1, 1)))]])))
 
-    actual.add((Tiling(obstructions=[Obstruction(Perm(tuple()), tuple())]),
-                Tiling(
-        obstructions=[Obstruction(Perm((1, 0)), ((0, 1), (1, 0)))],
-        requirements=[[Requirement(Perm((0,)), ((0, 0),))],
-                      [Requirement(Perm((0, 1)), ((0, 0), (1, 0))),
-                       Requirement(Perm((0, 1)), ((0, 0), (1, 1)))]])))
+    # Inserting a point into the positive cell (0, 0) is not done, as the
+    # tiling avoiding it is empty.
 
     actual.add((Tiling(
         requirements=[[Requirement(Perm((0, 1)), ((0, 0), (1, 0)))]]),
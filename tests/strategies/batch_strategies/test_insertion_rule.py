@@ -0,0 +1,53 @@
+from permuta import Perm
+from tilescopethree.strategies import (all_cell_insertions,
+                                       all_row_insertions,
+                                       requirement_corroboration)
+from tilescopethree.strategies.batch_strategies.cell_insertion import (
+    cell_insertion, row_insertion_helper)
+from tilescopethree.strategies.batch_strategies.requirement_corroboration \
+    import gp_insertion
+from tilings import Tiling
+
+pytest_plugins = [
+    'tests.fixtures.simple_tiling'
+]
+
+
+def test_lazy_children(simple_tiling):
+    rules = list(all_cell_insertions(simple_tiling, maxreqlen=2))
+    assert rules and not any(rule.built for rule in rules)
+    for rule in rules:
+        cell = tuple(int(c) for c in rule.formal_step.split('|')[1:3])
+        patt = Perm.to_standard(rule.formal_step.split('|')[3])
+        assert rule.comb_classes == cell_insertion(simple_tiling, patt, cell)
+        assert rule.built
+
+
+def test_row_insertions(simple_tiling):
+    for rule in all_row_insertions(simple_tiling):
+        assert not rule.built
+        row = int(rule.formal_step.split()[2])
+        assert rule.comb_classes == row_insertion_helper(simple_tiling, row,
+                                                         None)
+
+
+def test_requirement_corroboration(simple_tiling):
+    reqs = [req for reqs in simple_tiling.requirements for req in reqs
+            if len(reqs) > 1]
+    rules = list(requirement_corroboration(simple_tiling, None))
+    assert len(rules) == len(reqs)
+    for req, rule in zip(reqs, rules):
+        assert rule.comb_classes == gp_insertion(simple_tiling, req)
+
+
+def test_fingerprint(simple_tiling):
+    # The only row of Av(132) has a single cell, so inserting into the row is
+    # the same as inserting a point into the cell.
+    tiling = Tiling.from_string('132')
+    row_rule, = all_row_insertions(tiling)
+    point_rule, = all_cell_insertions(tiling)
+    assert row_rule.fingerprint == point_rule.fingerprint
+    assert row_rule.comb_classes == point_rule.comb_classes
+    rules = list(all_cell_insertions(simple_tiling, maxreqlen=2))
+    assert len(set(rule.fingerprint for rule in rules)) == len(rules)
+    assert not any(rule.built for rule in rules)
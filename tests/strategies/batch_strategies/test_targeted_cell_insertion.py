@@ -0,0 +1,47 @@
+from permuta import Perm
+from tilescopethree.strategies import targeted_cell_insertion
+from tilescopethree.strategies.batch_strategies.targeted_cell_insertion \
+    import components, factors_of_gridded_perm
+from tilings import Obstruction, Requirement, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.simple_tiling'
+]
+
+
+def five_by_five():
+    cells = [(i, (2 * i) % 5) for i in range(5)]
+    obs = [Obstruction.single_cell(Perm((0, 1, 2)), cell) for cell in cells]
+    obs += [Obstruction(Perm((0, 1, 2)), cells[:3]),
+            Obstruction(Perm((1, 0)), (cells[1], cells[4])),
+            Obstruction(Perm((2, 1, 0)), (cells[2], cells[2], cells[3]))]
+    return Tiling(obs)
+
+
+def test_factors_of_gridded_perm(simple_tiling):
+    tiling = five_by_five()
+    comps = components(tiling)
+    assert len(comps) == 5
+    factors = set()
+    for ob in tiling.obstructions:
+        subperms = [ob.get_gridded_perm_in_cells(c) for c in comps]
+        subperms = [p for p in subperms if p]
+        if len(subperms) > 1:
+            factors.update(subperms)
+    assert factors_of_gridded_perm(tiling) == factors
+    assert all(isinstance(f, Obstruction) for f in factors)
+    assert factors_of_gridded_perm(simple_tiling) is None
+
+
+def test_targeted_cell_insertion():
+    tiling = five_by_five()
+    rules = list(targeted_cell_insertion(tiling))
+    assert rules
+    for rule in rules:
+        f, = rule.obstructions
+        assert rule.formal_step == "Insert {}.".format(repr(f))
+        assert rule.ignore_parent
+        assert rule.comb_classes == [
+            Tiling(tiling.obstructions + (f,), tiling.requirements),
+            Tiling(tiling.obstructions, tiling.requirements +
+                   ((Requirement(f.patt, f.pos),),))]
@@ -0,0 +1,50 @@
+from permuta import Perm
+from tilescopethree.strategies import (all_cell_insertions,
+                                       empty_cell_inferral)
+from tilings import Obstruction, Requirement, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.simple_tiling'
+]
+
+
+def empty_cells(tiling):
+    """The cells that are empty, checked one at a time."""
+    return tuple(sorted(
+        cell for cell in tiling.active_cells - tiling.positive_cells
+        if Tiling(tiling.obstructions, tiling.requirements +
+                  ((Requirement.single_cell(Perm((0,)), cell),),)
+                  ).is_empty()))
+
+
+def check(tiling):
+    cells = empty_cells(tiling)
+    rule = empty_cell_inferral(tiling)
+    if not cells:
+        assert rule is None
+        return
+    assert rule.formal_step == "The cells {} are empty".format(cells)
+    assert rule.comb_classes[0] == Tiling(
+        tiling.obstructions + tuple(Obstruction.single_cell(Perm((0,)), cell)
+                                    for cell in cells),
+        tiling.requirements)
+
+
+def test_empty_cell_inferral(simple_tiling):
+    # A point in either cell is above or below a point in the other.
+    obstructions = [Obstruction(Perm((0, 1)), ((0, 0), (1, 0))),
+                    Obstruction(Perm((1, 0)), ((0, 0), (1, 0))),
+                    Obstruction.single_cell(Perm((0, 1, 2)), (0, 0)),
+                    Obstruction.single_cell(Perm((0, 1, 2)), (1, 0))]
+    tiling = Tiling(obstructions,
+                    [[Requirement.single_cell(Perm((0,)), (1, 0))]])
+    assert empty_cells(tiling) == ((0, 0),)
+    check(tiling)
+    check(Tiling(obstructions,
+                 [[Requirement.single_cell(Perm((1, 0)), (0, 0)),
+                   Requirement.single_cell(Perm((0, 1)), (1, 0))]]))
+    check(Tiling(obstructions))
+    check(simple_tiling)
+    for rule in all_cell_insertions(Tiling.from_string('1324'), maxreqlen=2):
+        for child in rule.comb_classes:
+            check(child)
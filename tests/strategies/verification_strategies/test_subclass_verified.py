@@ -0,0 +1,54 @@
+from itertools import chain
+
+from permuta import Av, Perm
+from permuta.descriptors import Basis
+from tilescopethree.strategies.verification_strategies.subclass_verified \
+    import SubclassPatterns, subclass_verified
+from tilings import Obstruction, Requirement, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.simple_tiling'
+]
+
+
+def patterns_avoided(tiling, basis, maxlen=4):
+    """The patterns avoided by every gridded perm, computed naively."""
+    patterns = set(chain(*[Av(basis).of_length(i)
+                           for i in range(maxlen + 1)]))
+    maxlen += tiling.maximum_length_of_minimum_gridded_perm()
+    for i in range(maxlen + 1):
+        for g in tiling.objects_of_length(i):
+            patterns = set(p for p in patterns if g.patt.avoids(p))
+    return patterns
+
+
+def test_avoided_by_all():
+    basis = [Perm((0, 2, 1))]
+    subclass = SubclassPatterns(basis, 3)
+    assert len(subclass.patterns) == 1 + 1 + 2 + 5
+    assert subclass.avoided_by_all([]) == set(subclass.patterns)
+    assert (subclass.avoided_by_all([Perm((0, 1))]) ==
+            set(patt for patt in subclass.patterns
+                if len(patt) > 1 and patt != Perm((0, 1))))
+    assert (subclass.avoided_by_all([Perm((0, 1)), Perm((1, 0))]) ==
+            set(patt for patt in subclass.patterns if len(patt) == 3))
+    assert (subclass.avoided_by_all([Perm((0, 1)), Perm((1, 0, 2, 3)),
+                                     Perm((3, 1, 2, 0))]) is None)
+
+
+def test_subclass_verified(simple_tiling):
+    two_cells = Tiling(
+        obstructions=[Obstruction(Perm((1, 0)), [(0, 0), (0, 0)]),
+                      Obstruction(Perm((1, 0)), [(1, 0), (1, 0)])],
+        requirements=[[Requirement(Perm((0,)), [(0, 0)])]])
+    basis = [Perm((0, 2, 1))]
+    for tiling in (simple_tiling, two_cells):
+        rule = subclass_verified(tiling, basis)
+        patterns = patterns_avoided(tiling, basis)
+        assert (rule is None) == (not patterns)
+        if rule is not None:
+            assert "{}".format(Basis(patterns)) in rule.formal_step
+            # Checking the same tiling again uses the cached result.
+            assert (subclass_verified(tiling, basis).formal_step ==
+                    rule.formal_step)
+    assert subclass_verified(Tiling.from_string('132'), basis) is None
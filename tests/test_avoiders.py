@@ -0,0 +1,39 @@
+from permuta import Av, Perm
+from tilescopethree.avoiders import AvoidersCache
+
+
+def test_avoiders():
+    cache = AvoidersCache()
+    basis = [Perm((0, 2, 1)), Perm((1, 0, 2))]
+    assert (cache.get(basis, 4).perms ==
+            tuple(Av(basis).of_length(4)))
+    assert cache.get(list(reversed(basis)), 4) is cache.get(basis, 4)
+    assert cache.hits == 2
+    assert cache.misses == 1
+
+
+def test_filters():
+    cache = AvoidersCache()
+    basis = [Perm((0, 2, 1))]
+    reqs = [Perm((2, 1, 0, 3)), Perm((0, 1))]
+    assert (cache.not_contained_in(basis, 3, reqs) ==
+            tuple(p for p in Av(basis).of_length(3)
+                  if not any(p in r for r in reqs)))
+    assert (cache.not_contained_in(basis, 2, []) ==
+            tuple(Av(basis).of_length(2)))
+    assert (cache.containing(basis, 4, Perm((1, 0))) ==
+            tuple(p for p in Av(basis).of_length(4) if Perm((1, 0)) in p))
+
+
+def test_eviction():
+    cache = AvoidersCache(maxsize=2)
+    basis = [Perm((0, 1))]
+    cache.get(basis, 1)
+    cache.get(basis, 2)
+    cache.get(basis, 1)
+    cache.get(basis, 3)
+    assert cache.evictions == 1
+    assert cache.size() == 2
+    cache.get(basis, 1)
+    assert cache.misses == 3
+    assert "2 entries storing 2 permutations" in cache.status()
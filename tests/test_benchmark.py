@@ -0,0 +1,51 @@
+import json
+
+from permuta import Perm
+from tilescopethree.benchmark import (compare, load_corpus, main,
+                                      save_corpus, time_strategy)
+from tilings import Tiling
+
+
+def results(strategy_time, search_time, found=True):
+    return {'strategies': {'fusion': strategy_time},
+            'searches': {'132 point_placements': {'time': search_time,
+                                                  'found': found}}}
+
+
+def test_compare():
+    old = results(1.0, 2.0)
+    assert compare(old, results(1.05, 1.0)) == []
+    assert compare(old, results(1.5, 2.0)) == [('strategy fusion', 1.0, 1.5)]
+    assert compare(old, results(1.5, 2.0), threshold=0.6) == []
+    assert (compare(old, results(1.0, 1.0, found=False)) ==
+            [('132 point_placements (no tree found)', 2.0, 1.0)])
+    # Very fast benchmarks are ignored.
+    assert compare(results(0.001, 2.0), results(0.005, 2.0)) == []
+
+
+def test_compare_command(tmpdir, capsys):
+    old, new = str(tmpdir.join('old.json')), str(tmpdir.join('new.json'))
+    with open(old, 'w') as f:
+        json.dump(results(1.0, 2.0), f)
+    with open(new, 'w') as f:
+        json.dump(results(1.0, 3.0), f)
+    assert main(['compare', old, old]) == 0
+    assert main(['compare', old, new]) == 1
+    assert 'search 132 point_placements' in capsys.readouterr().out
+
+
+def test_corpus(tmpdir):
+    filename = str(tmpdir.join('corpus.json'))
+    tilings = [('132', Tiling.from_string('132')),
+               ('123_321', Tiling.from_string('123_321'))]
+    save_corpus(tilings, filename)
+    assert load_corpus(filename) == tilings
+    seen = []
+
+    def strategy(tiling, basis, **kwargs):
+        seen.append((tiling, tuple(basis)))
+        yield tiling
+
+    assert time_strategy(strategy, tilings, repeat=2) >= 0
+    assert len(seen) == 4
+    assert seen[1] == (tilings[1][1], (Perm((0, 1, 2)), Perm((2, 1, 0))))
@@ -0,0 +1,78 @@
+from comb_spec_searcher import Rule
+from tilescopethree import TileScopeTHREE
+from tilescopethree.children import ChildCache
+from tilescopethree.parallel import PrefetchedStrategy, rule_to_record
+from tilescopethree.strategies import (all_point_insertions,
+                                       all_row_insertions, verify_atoms)
+from tilescopethree.strategy_packs_v2 import TileScopePack
+from tilings import Tiling
+
+
+def _pack(*expansion_strats):
+    return TileScopePack(initial_strats=[],
+                         inferral_strats=[],
+                         expansion_strats=list(expansion_strats),
+                         ver_strats=[verify_atoms],
+                         name="point and row insertions")
+
+
+def test_duplicate_rules():
+    searcher = TileScopeTHREE('132', _pack([all_point_insertions,
+                                            all_row_insertions]))
+    # Inferral, initial and then the first set of expansion strategies.
+    searcher.expand_classes(3)
+    # The row insertion into the only row of the start tiling is the same
+    # rule as the point insertion into its only cell.
+    assert searcher.child_cache.built == 1
+    assert searcher.child_cache.duplicates == 1
+    assert searcher.child_cache.reused == 0
+    assert "1 duplicates" in searcher.status()
+
+
+def test_reused_children():
+    searcher = TileScopeTHREE('132', _pack([all_point_insertions],
+                                           [all_row_insertions]))
+    # The row insertion comes in the next expansion of the start tiling,
+    # after its children are expanded, so they are taken from the class
+    # database.
+    searcher.expand_classes(8)
+    assert searcher.child_cache.built == 1
+    assert searcher.child_cache.reused == 1
+    assert searcher.child_cache.duplicates == 0
+    assert "1 reused" in searcher.status()
+
+
+class _Searcher(object):
+    """Stands in for the searcher, with every class verified."""
+
+    class equivdb(object):
+        @staticmethod
+        def is_verified(label):
+            return True
+
+
+def test_dropped_for_verified_parent():
+    cache = ChildCache()
+    tiling = Tiling.from_string('132')
+    strategy = cache.wrap(all_point_insertions, _Searcher(), 0)
+    assert strategy.__name__ == 'all_point_insertions'
+    assert list(strategy(tiling)) == []
+    assert cache.dropped == 1 and cache.built == 0
+    # The rules found by a worker are dropped too.
+    records = [rule_to_record(rule) for rule in all_point_insertions(tiling)]
+    prefetched = PrefetchedStrategy(all_point_insertions, records)
+    assert list(cache.wrap(prefetched, _Searcher(), 0)(tiling)) == []
+    assert cache.dropped == 2
+
+    def eager(tiling, **kwargs):
+        yield Rule("Eager", [tiling], [True], [True], [True])
+
+    assert len(list(cache.wrap(eager, _Searcher(), 0)(tiling))) == 1
+
+
+def test_lru():
+    cache = ChildCache(maxsize=2)
+    for key in range(3):
+        cache.put(key, (key,))
+    assert cache.get(0) is None
+    assert cache.get(2) == (2,)
@@ -0,0 +1,40 @@
+from permuta import Perm
+from tilescopethree.containment import (avoiding, containment_matrix,
+                                        gridded_perms)
+from tilings import GriddedPerm, Obstruction, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.diverse_tiling',
+    'tests.fixtures.simple_tiling',
+]
+
+
+def _reference(tiling, maxlen):
+    obs_tiling = Tiling(tiling.obstructions, remove_empty=False,
+                        derive_empty=False, minimize=False, sorted_input=True)
+    return [set(obs_tiling.gridded_perms_of_length(length))
+            for length in range(maxlen + 1)]
+
+
+def test_gridded_perms(simple_tiling, diverse_tiling):
+    for tiling, maxlen in ((simple_tiling, 5), (diverse_tiling, 4),
+                           (Tiling.from_string('1324_4231'), 6)):
+        perms = gridded_perms(tiling.obstructions, maxlen)
+        assert len(perms) == maxlen + 1
+        for found, expected in zip(perms, _reference(tiling, maxlen)):
+            assert len(found) == len(expected)
+            assert set(found) == expected
+    empty = [Obstruction(Perm(tuple()), tuple())]
+    assert gridded_perms(empty, 2) == [[], [], []]
+
+
+def test_containment_matrix(diverse_tiling):
+    gps = [gp for perms in gridded_perms(diverse_tiling.obstructions, 3)
+           for gp in perms]
+    gps += [GriddedPerm(Perm((0, 1)), ((0, 0), (0, 0))),
+            GriddedPerm(Perm((2, 0, 1)), ((0, 1), (0, 1), (0, 1)))]
+    patterns = list(diverse_tiling.obstructions)
+    assert (containment_matrix(patterns, gps) ==
+            [[patt in gp for gp in gps] for patt in patterns])
+    assert (avoiding(patterns, gps) ==
+            [gp for gp in gps if not any(patt in gp for patt in patterns)])
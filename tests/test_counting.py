@@ -0,0 +1,116 @@
+import pytest
+import sympy
+from sympy.abc import x
+
+from comb_spec_searcher import ProofTree
+from comb_spec_searcher.proof_tree import ProofTreeNode
+from permuta import Perm
+from tilescopethree import counting
+from tilescopethree.counting import (GenfSeries, count_terms,
+                                     count_terms_crt, primes, tree_series)
+from tilings import Obstruction, Requirement, Tiling
+
+epsilon = Tiling(obstructions=[Obstruction(Perm((0,)), [(0, 0)])])
+atom = Tiling(obstructions=[Obstruction(Perm((0, 1)), [(0, 0), (0, 0)]),
+                            Obstruction(Perm((1, 0)), [(0, 0), (0, 0)])],
+              requirements=[[Requirement(Perm((0,)), [(0, 0)])]])
+av132 = Tiling.from_string('132')
+
+
+def catalan_tree():
+    """F = 1 + F x F"""
+    return ProofTree(ProofTreeNode(
+        0, [0], [av132], disjoint_union=True, children=[
+            ProofTreeNode(1, [1], [epsilon], strategy_verified=True),
+            ProofTreeNode(2, [2], [av132], decomposition=True, children=[
+                ProofTreeNode(0, [0], [av132], recursion=True),
+                ProofTreeNode(3, [3], [atom], strategy_verified=True),
+                ProofTreeNode(0, [0], [av132], recursion=True)])]))
+
+
+def catalan(n):
+    return sympy.binomial(2 * n, n) // (n + 1)
+
+
+def test_catalan():
+    assert (count_terms(catalan_tree(), 13) ==
+            [1, 1, 2, 5, 14, 42, 132, 429, 1430, 4862, 16796, 58786, 208012])
+
+
+@pytest.mark.timeout(30)
+def test_many_terms():
+    terms = count_terms(catalan_tree(), 1000)
+    assert terms[999] == catalan(999)
+    p = 2**31 - 1
+    assert (count_terms(catalan_tree(), 1000, modulus=p) ==
+            [t % p for t in terms])
+
+
+@pytest.mark.timeout(30)
+def test_vectorised(monkeypatch):
+    pytest.importorskip('numpy')
+    p = next(primes())
+    series = tree_series(catalan_tree(), modulus=p)
+    assert series[2].product.vectorised
+    vectorised = count_terms(catalan_tree(), 1000, modulus=p)
+    monkeypatch.setattr(counting, 'numpy', None)
+    series = tree_series(catalan_tree(), modulus=p)
+    assert not series[2].product.vectorised
+    assert count_terms(catalan_tree(), 1000, modulus=p) == vectorised
+    assert vectorised[999] == catalan(999) % p
+
+
+def test_recursion_before_positive_child():
+    """F = 1 + F (x F), with the recursion first in the product."""
+    tree = ProofTree(ProofTreeNode(
+        0, [0], [av132], disjoint_union=True, children=[
+            ProofTreeNode(1, [1], [epsilon], strategy_verified=True),
+            ProofTreeNode(2, [2], [av132], decomposition=True, children=[
+                ProofTreeNode(0, [0], [av132], recursion=True),
+                ProofTreeNode(3, [3], [av132], decomposition=True, children=[
+                    ProofTreeNode(4, [4], [atom], strategy_verified=True),
+                    ProofTreeNode(0, [0], [av132], recursion=True)])])]))
+    terms = [catalan(n) for n in range(40)]
+    assert count_terms(tree, 40) == terms
+    p = 1000003
+    assert count_terms(tree, 40, modulus=p) == [t % p for t in terms]
+
+
+def test_not_productive():
+    tree = ProofTree(ProofTreeNode(
+        0, [0], [av132], disjoint_union=True, children=[
+            ProofTreeNode(1, [1], [epsilon], strategy_verified=True),
+            ProofTreeNode(0, [0], [av132], recursion=True)]))
+    with pytest.raises(ValueError):
+        count_terms(tree, 5)
+
+
+def test_genf_series():
+    rational = GenfSeries((1 - x) / (1 - 3 * x + x**2))
+    assert [rational[i] for i in range(8)] == [1, 2, 5, 13, 34, 89, 233, 610]
+    algebraic = GenfSeries((1 - sympy.sqrt(1 - 4 * x)) / (2 * x))
+    assert [algebraic[i] for i in range(8)] == [catalan(i) for i in range(8)]
+
+
+def test_genf_expanded_once(monkeypatch):
+    expand = counting.taylor_expand
+    expansions = []
+
+    def taylor_expand(genf, n):
+        expansions.append(n)
+        return expand(genf, n=n)
+
+    monkeypatch.setattr(Tiling, 'get_genf',
+                        lambda self: (1 - sympy.sqrt(1 - 4 * x)) / (2 * x))
+    monkeypatch.setattr(counting, 'taylor_expand', taylor_expand)
+    tree = ProofTree(ProofTreeNode(0, [0], [av132], strategy_verified=True))
+    assert count_terms(tree, 40) == [catalan(n) for n in range(40)]
+    assert expansions == [39]
+
+
+@pytest.mark.timeout(60)
+def test_crt():
+    terms = count_terms(catalan_tree(), 300)
+    assert count_terms_crt(catalan_tree(), 300, processes=2) == terms
+    assert count_terms_crt(catalan_tree(), 300, processes=1, bits=600) == terms
+    assert count_terms_crt(catalan_tree(), 10) == terms[:10]
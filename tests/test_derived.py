@@ -0,0 +1,54 @@
+from permuta import Perm
+from tilescopethree.derived import DerivedCache
+from tilings import Obstruction, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.diverse_tiling',
+    'tests.fixtures.simple_tiling'
+]
+
+
+def test_derived_values(diverse_tiling, simple_tiling):
+    cache = DerivedCache()
+    for tiling in (diverse_tiling, simple_tiling):
+        data = cache.get(tiling)
+        assert data.cell_basis == tiling.cell_basis()
+        assert data.active_cells == tiling.active_cells
+        assert data.positive_cells == tiling.positive_cells
+        assert data.possibly_empty == tiling.possibly_empty
+        for row in range(tiling.dimensions[1]):
+            assert data.row_cells[row] == tiling.cells_in_row(row)
+        for col in range(tiling.dimensions[0]):
+            assert data.col_cells[col] == tiling.cells_in_col(col)
+
+
+def components(tiling):
+    return DerivedCache().get(tiling).components
+
+
+def test_components(diverse_tiling, simple_tiling):
+    assert (sorted(map(sorted, components(diverse_tiling))) ==
+            [[(0, 0), (0, 1), (0, 2), (1, 0), (1, 1), (1, 2), (2, 0),
+              (2, 1)]])
+    assert (sorted(map(sorted, components(simple_tiling))) ==
+            [[(0, 0), (0, 1), (1, 0), (1, 1)]])
+    diagonal = Tiling(obstructions=[
+        Obstruction.single_cell(Perm((0, 1)), (0, 0)),
+        Obstruction.single_cell(Perm((0, 1)), (1, 1)),
+        Obstruction(Perm((0, 1)), [(0, 0), (2, 2)])])
+    assert (sorted(map(sorted, components(diagonal))) ==
+            [[(0, 0)], [(1, 1)], [(2, 2)]])
+    assert DerivedCache().get(diagonal).row_masks == {0: 1, 1: 2, 2: 4}
+
+
+def test_hits_and_eviction(diverse_tiling, simple_tiling):
+    cache = DerivedCache(size=1)
+    cache.get(diverse_tiling).cell_basis
+    cache.get(diverse_tiling).cell_basis
+    cache.get(diverse_tiling).cell_basis
+    assert cache.stats.hits['cell_basis'] == 2
+    assert cache.stats.misses['cell_basis'] == 1
+    cache.get(simple_tiling).cell_basis
+    cache.get(diverse_tiling).cell_basis
+    assert cache.stats.misses['cell_basis'] == 3
+    assert 'cell_basis: 2 hits of 5 (40%)' in cache.stats.status()
@@ -0,0 +1,54 @@
+from permuta import Perm
+from tilescopethree.derived import DerivedCache
+from tilescopethree.emptiness import implied, prefilter, stats
+from tilescopethree.strategies import (all_cell_insertions,
+                                       all_requirement_insertions,
+                                       requirement_corroboration)
+from tilescopethree.strategies.batch_strategies.insertion_rule import \
+    InsertionRule
+from tilings import Obstruction, Requirement, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.diverse_tiling',
+    'tests.fixtures.simple_tiling'
+]
+
+
+def test_implied(simple_tiling):
+    assert not implied(simple_tiling, Obstruction(Perm((0,)), ((1, 0),)))
+    assert not implied(simple_tiling,
+                       Obstruction(Perm((0, 1)), ((0, 0), (1, 0))))
+
+
+def test_small_gridded_perms(simple_tiling, diverse_tiling):
+    cache = DerivedCache()
+    assert cache.get(diverse_tiling).small_gridded_perms == []
+    maxlen = simple_tiling.maximum_length_of_minimum_gridded_perm() + 1
+    assert (set(cache.get(simple_tiling).small_gridded_perms) ==
+            set(simple_tiling.gridded_perms(maxlen)))
+
+
+def test_prefilter(simple_tiling):
+    dropped = stats.dropped
+    rules = list(all_cell_insertions(simple_tiling, maxreqlen=2))
+    assert stats.dropped > dropped
+    rules += list(all_requirement_insertions(simple_tiling, no_reqs=False))
+    rules += list(requirement_corroboration(simple_tiling, None))
+    assert any(not empty for rule in rules for empty in rule.possibly_empty)
+    for rule in rules:
+        for child, empty in zip(rule.comb_classes, rule.possibly_empty):
+            assert empty or not child.is_empty()
+
+
+def test_dropped_rules():
+    tiling = Tiling(
+        obstructions=[Obstruction(Perm((1, 0)), ((0, 1), (1, 0)))],
+        requirements=[[Requirement(Perm((0,)), ((0, 0),))]])
+    # The point in (0, 0) is implied, and the second gridded perm contains
+    # the obstruction, so a child of each rule is empty.
+    for patt, pos in (((0,), ((0, 0),)), ((1, 0), ((0, 1), (1, 0)))):
+        rule = InsertionRule("Insert.", tiling,
+                             [Obstruction(Perm(patt), pos)],
+                             [Requirement(Perm(patt), pos)])
+        assert not prefilter(rule)
+        assert any(child.is_empty() for child in rule.comb_classes)
@@ -0,0 +1,49 @@
+from permuta import Perm
+from tilescopethree.encoding import (CompactClassDB, decode_tiling,
+                                     encode_tiling)
+from tilings import Obstruction, Requirement, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.diverse_tiling',
+    'tests.fixtures.simple_tiling'
+]
+
+
+def test_round_trip(diverse_tiling, simple_tiling):
+    for tiling in (diverse_tiling, simple_tiling, Tiling(),
+                   Tiling(obstructions=[Obstruction(Perm(), [])])):
+        encoded = encode_tiling(tiling)
+        assert isinstance(encoded, bytes)
+        assert decode_tiling(encoded) == tiling
+        assert decode_tiling(encoded).dimensions == tiling.dimensions
+
+
+def test_long_and_wide():
+    long_patt = Perm(tuple(range(20)))
+    tiling = Tiling(
+        obstructions=[Obstruction.single_cell(long_patt, (0, 0)),
+                      Obstruction(Perm((1, 0)), [(0, 0), (20, 20)])],
+        requirements=[[Requirement(Perm((0, 1)), [(17, 3), (19, 18)])]])
+    assert decode_tiling(encode_tiling(tiling)) == tiling
+
+
+def test_smaller_than_compress(diverse_tiling, simple_tiling):
+    for tiling in (diverse_tiling, simple_tiling):
+        assert len(encode_tiling(tiling)) < len(tiling.compress())
+
+
+def test_canonical(simple_tiling):
+    same = Tiling(obstructions=simple_tiling.obstructions,
+                  requirements=reversed(simple_tiling.requirements))
+    assert encode_tiling(same) == encode_tiling(simple_tiling)
+
+
+def test_compact_class_db(diverse_tiling, simple_tiling):
+    classdb = CompactClassDB(Tiling)
+    classdb.add(diverse_tiling)
+    classdb.add(simple_tiling)
+    classdb.add(diverse_tiling)
+    assert len(classdb.label_to_info) == 2
+    assert classdb.get_label(simple_tiling) == 1
+    assert classdb.get_class(0) == diverse_tiling
+    assert classdb.label_to_info[0].comb_class == encode_tiling(diverse_tiling)
@@ -0,0 +1,73 @@
+from permuta import Perm
+from tilescopethree.incremental import (add_obstructions, add_requirement,
+                                        stats)
+from tilescopethree.strategies import (all_cell_insertions,
+                                       all_col_insertions,
+                                       all_factor_insertions,
+                                       all_requirement_insertions,
+                                       all_row_insertions,
+                                       requirement_corroboration)
+from tilings import Obstruction, Requirement, Tiling
+
+pytest_plugins = [
+    'tests.fixtures.diverse_tiling',
+    'tests.fixtures.simple_tiling'
+]
+
+
+def rules(tiling):
+    yield from all_cell_insertions(tiling, maxreqlen=2)
+    yield from all_row_insertions(tiling)
+    yield from all_col_insertions(tiling)
+    yield from all_requirement_insertions(tiling, no_reqs=False)
+    yield from all_factor_insertions(tiling)
+    yield from requirement_corroboration(tiling, None)
+
+
+def assert_same(tiling, other):
+    assert tiling == other
+    assert tiling.obstructions == other.obstructions
+    assert tiling.requirements == other.requirements
+
+
+def check_children(tiling):
+    for rule in rules(tiling):
+        assert_same(add_obstructions(tiling, rule.obstructions),
+                    Tiling(tiling.obstructions + rule.obstructions,
+                           tiling.requirements))
+        assert_same(add_requirement(tiling, rule.requirement),
+                    Tiling(tiling.obstructions,
+                           tiling.requirements + (rule.requirement,)))
+
+
+def test_insertion_children(simple_tiling, diverse_tiling):
+    incremental = stats.incremental
+    for tiling in (simple_tiling, diverse_tiling, Tiling.from_string('1324'),
+                   Tiling.from_string('123_321')):
+        check_children(tiling)
+    assert stats.incremental > incremental
+
+
+def test_grandchildren():
+    tiling = Tiling.from_string('1234')
+    for rule in all_cell_insertions(tiling, maxreqlen=2):
+        for child in rule.comb_classes:
+            check_children(child)
+
+
+def test_fallback(simple_tiling):
+    # The new obstruction is contained in a requirement.
+    tiling = Tiling([Obstruction(Perm((0, 1)), ((0, 0), (0, 0)))],
+                    [[Requirement(Perm((0, 1)), ((0, 0), (1, 0)))]])
+    ob = Obstruction(Perm((0,)), ((1, 0),))
+    full = stats.full
+    assert_same(add_obstructions(tiling, [ob]),
+                Tiling(tiling.obstructions + (ob,), tiling.requirements))
+    # The new requirement contains one of the old ones.
+    tiling = Tiling([Obstruction(Perm((0, 1, 2)), ((0, 0),) * 3)],
+                    [[Requirement(Perm((0,)), ((0, 0),))]])
+    req = Requirement(Perm((1, 0)), ((0, 0),) * 2)
+    assert_same(add_requirement(tiling, [req]),
+                Tiling(tiling.obstructions, tiling.requirements + ((req,),)))
+    assert stats.full == full + 2
+    assert_same(add_obstructions(simple_tiling, []), simple_tiling)
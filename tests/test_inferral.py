@@ -0,0 +1,115 @@
+from comb_spec_searcher import InferralRule
+from permuta import Perm
+from tilescopethree import TileScopeTHREE
+from tilescopethree.inferral import DEPENDENCIES, InferralEngine, cells
+from tilescopethree.inferral_memo import InferralMemo
+from tilescopethree.strategies import all_cell_insertions, verify_atoms
+from tilescopethree.strategy_packs_v2 import TileScopePack
+from tilings import Obstruction, Requirement, Tiling
+
+
+def shorten(tiling, **kwargs):
+    """Replace the 1234 obstructions with 123 obstructions."""
+    new = [Obstruction(Perm((0, 1, 2)), ob.pos[:3])
+           for ob in tiling.obstructions if ob.patt == Perm((0, 1, 2, 3))]
+    if new:
+        return InferralRule("Shorten.",
+                            Tiling(tiling.obstructions + tuple(new),
+                                   tiling.requirements))
+
+
+def tighten(tiling, **kwargs):
+    """Add a 12 obstruction in the positive cells with a 123 obstruction."""
+    new = [Obstruction(Perm((0, 1)), ob.pos[:2])
+           for ob in tiling.obstructions if ob.patt == Perm((0, 1, 2)) and
+           ob.is_single_cell() in tiling.positive_cells]
+    if new:
+        return InferralRule("Tighten.",
+                            Tiling(tiling.obstructions + tuple(new),
+                                   tiling.requirements))
+
+
+calls = []
+
+
+def look(tiling, **kwargs):
+    """Depends on the cells of the tiling only, and never infers."""
+    calls.append(tiling)
+
+
+def _engine():
+    return InferralEngine([look, shorten, tighten],
+                          dependencies={'look': cells}, memo=InferralMemo())
+
+
+def test_infer():
+    engine = _engine()
+    tiling = Tiling([Obstruction.single_cell(Perm((0, 1, 2, 3)), (0, 0))],
+                    [[Requirement.single_cell(Perm((0,)), (0, 0))]])
+    del calls[:]
+    rules = []
+    inferred = engine.infer(tiling, record=lambda s, rule: rules.append(
+        rule) or True)
+    assert inferred == Tiling(
+        [Obstruction.single_cell(Perm((0, 1)), (0, 0))],
+        [[Requirement.single_cell(Perm((0,)), (0, 0))]])
+    assert [rule.formal_step for rule in rules] == ["Shorten.", "Tighten."]
+    # The cells never change, so look is only called once, while the
+    # searcher would call it again after each change.
+    assert len(calls) == 1
+    assert engine.calls == 4 and engine.skipped == 1
+    # Every tiling along the way is remembered.
+    assert engine.infer(rules[0].comb_classes[0]) == inferred
+    assert engine.infer(tiling) == inferred
+    assert engine.hits == 2 and engine.calls == 4
+    assert "2 from the memo" in engine.status()
+
+
+def test_own_memo():
+    tiling = Tiling.from_string('1234')
+    first = InferralEngine([look, shorten, tighten])
+    first.infer(tiling)
+    second = InferralEngine([look, shorten, tighten])
+    assert second.memo is not first.memo
+    second.infer(tiling)
+    assert second.hits == 0 and second.calls == first.calls
+    shared = InferralEngine([look, shorten, tighten], memo=first.memo)
+    shared.infer(tiling)
+    assert shared.hits == 1 and shared.calls == 0
+
+
+def test_stop():
+    engine = _engine()
+    tiling = Tiling.from_string('1234')
+    stopped = engine.infer(tiling, record=lambda s, rule: False)
+    assert stopped == Tiling.from_string('123')
+
+
+def _pack():
+    return TileScopePack(initial_strats=[],
+                         inferral_strats=[look, shorten, tighten],
+                         expansion_strats=[[all_cell_insertions]],
+                         ver_strats=[verify_atoms],
+                         name="cell insertions")
+
+
+def test_tilescope(monkeypatch):
+    monkeypatch.setitem(DEPENDENCIES, 'look', cells)
+    searcher = TileScopeTHREE('1234', _pack(), fixpoint_inferral=True,
+                              inferral_memo=InferralMemo())
+    reference = TileScopeTHREE('1234', _pack())
+    assert reference.inferral_engine is None
+    looked = []
+    for scope in (searcher, reference):
+        del calls[:]
+        scope.expand_classes(20)
+        looked.append(len(calls))
+    assert searcher.ruledb == reference.ruledb
+    assert searcher.equivdb == reference.equivdb
+    assert ({label: info.comb_class
+             for label, info in searcher.classdb.label_to_info.items()} ==
+            {label: info.comb_class
+             for label, info in reference.classdb.label_to_info.items()})
+    assert looked[0] < looked[1]
+    assert searcher.inferral_engine.skipped > 0
+    assert "Fixpoint inferral" in searcher.status()
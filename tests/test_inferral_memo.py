@@ -0,0 +1,68 @@
+from permuta import Perm
+from tilescopethree import TileScopeTHREE
+from tilescopethree.inferral_memo import InferralMemo, strategies_key
+from tilings import Obstruction, Tiling
+
+from .test_inferral import _pack, look, shorten, tighten
+
+KEY = strategies_key([look, shorten, tighten])
+
+
+def _tiling(n):
+    return Tiling.from_string(''.join(str(i + 1) for i in range(n)))
+
+
+def _steps(n):
+    child = Tiling([Obstruction.single_cell(Perm((0, 1)), (0, 0))])
+    return ((1, "Step {}.".format(n), child),)
+
+
+def test_get_put():
+    memo = InferralMemo()
+    tiling = Tiling.from_string('123')
+    key = memo.key(KEY, tiling)
+    assert memo.get(key) is None
+    memo.put(key, _steps(0))
+    assert memo.get(key) == _steps(0)
+    assert memo.get(memo.key(strategies_key([shorten]), tiling)) is None
+    assert memo.hit_rate() == 1 / 3
+    assert "1 hits of 3" in memo.status()
+
+
+def test_eviction():
+    for eviction, kept in (('lru', 0), ('fifo', 1)):
+        memo = InferralMemo(maxsize=2, eviction=eviction)
+        keys = [memo.key(KEY, _tiling(n)) for n in (2, 3, 4)]
+        memo.put(keys[0], _steps(0))
+        memo.put(keys[1], _steps(1))
+        memo.get(keys[0])
+        memo.put(keys[2], _steps(2))
+        assert memo.evictions == 1
+        assert memo.get(keys[kept]) is not None
+        assert memo.get(keys[1 - kept]) is None
+
+
+def test_persistence(tmpdir):
+    path = str(tmpdir.join('inferral.db'))
+    memo = InferralMemo(path=path)
+    key = memo.key(KEY, Tiling.from_string('123'))
+    memo.put(key, _steps(0))
+    memo.close()
+    memo = InferralMemo(path=path)
+    assert memo.get(key) == _steps(0)
+    memo.close()
+
+
+def test_tilescope(tmpdir):
+    path = str(tmpdir.join('inferral.db'))
+    first = TileScopeTHREE('1234', _pack(), fixpoint_inferral=True,
+                           inferral_memo=path)
+    first.expand_classes(20)
+    first.status()
+    second = TileScopeTHREE('1234', _pack(), fixpoint_inferral=True,
+                            inferral_memo=path)
+    second.expand_classes(20)
+    assert second.inferral_engine.calls == 0
+    assert second.inferral_engine.memo.hits > 0
+    assert first.ruledb == second.ruledb
+    assert first.equivdb == second.equivdb
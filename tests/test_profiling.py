@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from comb_spec_searcher import ProofTree, Rule, VerificationRule
+from comb_spec_searcher.proof_tree import ProofTreeNode
+from permuta import Perm
+from tilescopethree import TileScopeTHREE
+from tilescopethree.profiling import Profiler
+from tilescopethree.strategies.batch_strategies.insertion_rule import \
+    InsertionRule
+from tilescopethree.strategy_packs_v2 import point_placements
+from tilings import Obstruction, Requirement, Tiling
+
+av12 = Tiling.from_string('12')
+av21 = Tiling.from_string('21')
+
+
+def split(tiling, **kwargs):
+    yield Rule("split", [av12, av21], [True, True], [True, True],
+               [True, True], constructor='disjoint')
+    yield Rule("other split", [av21], [True], [True], [True])
+
+
+def verify(tiling, **kwargs):
+    if tiling == av12:
+        return VerificationRule("verified")
+
+
+def test_profiles():
+    profiler = Profiler()
+    assert len(list(profiler.wrap(split)(av12))) == 2
+    assert profiler.wrap(verify)(av12).formal_step == "verified"
+    assert profiler.wrap(verify)(av21) is None
+    profiles = profiler.to_jsonable()
+    assert list(profiles) == ['split', 'verify']
+    assert profiles['split']['calls'] == 1
+    assert profiles['split']['rules'] == 2
+    assert profiles['split']['children'] == 3
+    assert profiles['verify']['calls'] == 2
+    assert profiles['verify']['rules'] == 1
+    tree = ProofTree(ProofTreeNode(
+        0, [0], [av12], disjoint_union=True, formal_step="split", children=[
+            ProofTreeNode(1, [1], [av12], strategy_verified=True,
+                          formal_step="verified")]))
+    profiler.record_tree(tree)
+    assert profiler.profiles['split'].used == 1
+    assert profiler.profiles['verify'].used == 1
+    assert 'split' in profiler.status()
+
+
+def insert(tiling, **kwargs):
+    yield InsertionRule("insert", tiling,
+                        [Obstruction(Perm((0,)), ((0, 0),))],
+                        [Requirement(Perm((0,)), ((0, 0),))])
+
+
+def test_lazy_children():
+    profiler = Profiler()
+    rules = list(profiler.wrap(insert)(av12))
+    assert not rules[0].built
+    assert profiler.profiles['insert'].rules == 1
+    assert profiler.profiles['insert'].children == 0
+
+
+def test_dump(tmpdir):
+    profiler = Profiler()
+    list(profiler.wrap(split)(av12))
+    filename = str(tmpdir.join('profile.json'))
+    profiler.dump(filename)
+    with open(filename) as f:
+        assert json.load(f)['split']['rules'] == 2
+
+
+@pytest.mark.timeout(20)
+def test_tilescope_profile():
+    searcher = TileScopeTHREE('132', point_placements, profile=True)
+    tree = searcher.auto_search(smallest=True)
+    assert tree is not None
+    profiles = searcher.profiler.to_jsonable()
+    assert sum(profile['used'] for profile in profiles.values()) > 0
+    assert all(profile['used'] <= profile['rules']
+               for profile in profiles.values())
+    assert 'Strategy profiles' in searcher.status()
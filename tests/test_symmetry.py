@@ -0,0 +1,81 @@
+from comb_spec_searcher import ProofTree
+from comb_spec_searcher.proof_tree import ProofTreeNode
+from tilescopethree import TileScopeTHREE
+from tilescopethree.strategy_packs_v2 import point_placements
+from tilescopethree.symmetry import (SYMMETRIES, SymmetryIndex,
+                                     apply_symmetry, canonical_form,
+                                     inverse_symmetry, symmetric_tree,
+                                     symmetry_invariant)
+from tilings import Tiling
+
+pytest_plugins = [
+    'tests.fixtures.diverse_tiling',
+]
+
+
+def test_inverse_symmetry(diverse_tiling):
+    for name in SYMMETRIES:
+        assert apply_symmetry(inverse_symmetry(name),
+                              apply_symmetry(name, diverse_tiling)) == \
+            diverse_tiling
+
+
+def test_canonical_form(diverse_tiling):
+    canonical, name = canonical_form(diverse_tiling)
+    assert apply_symmetry(name, diverse_tiling) == canonical
+    for other in SYMMETRIES:
+        assert (canonical_form(apply_symmetry(other, diverse_tiling))[0] ==
+                canonical)
+    assert (canonical_form(Tiling.from_string('132'))[0] ==
+            canonical_form(Tiling.from_string('213'))[0])
+    assert (canonical_form(Tiling.from_string('132'))[0] !=
+            canonical_form(Tiling.from_string('123'))[0])
+
+
+def test_symmetric_tree(diverse_tiling):
+    child = ProofTreeNode(1, [1], [Tiling.from_string('12')],
+                          strategy_verified=True)
+    root = ProofTreeNode(0, [0], [diverse_tiling], children=[child],
+                         disjoint_union=True, formal_step="step")
+    tree = symmetric_tree(ProofTree(root), 'rotate90')
+    assert tree.root.eqv_path_comb_classes == [diverse_tiling.rotate90()]
+    assert tree.root.formal_step == "step"
+    assert tree.root.disjoint_union
+    (sym_child,) = tree.root.children
+    assert sym_child.eqv_path_comb_classes == [Tiling.from_string('21')]
+    assert sym_child.strategy_verified
+
+
+def test_symmetry_invariant(diverse_tiling):
+    invariant = symmetry_invariant(diverse_tiling)
+    for name in SYMMETRIES:
+        assert (symmetry_invariant(apply_symmetry(name, diverse_tiling)) ==
+                invariant)
+    assert (symmetry_invariant(Tiling.from_string('132')) ==
+            symmetry_invariant(Tiling.from_string('123')))
+    assert (symmetry_invariant(Tiling.from_string('132')) !=
+            symmetry_invariant(Tiling.from_string('1234')))
+
+
+def test_symmetry_index():
+    index = SymmetryIndex()
+    t132 = Tiling.from_string('132')
+    assert index.add(t132, 0) is None
+    # Nothing else has the same invariant, so no canonical form is needed.
+    assert index.add(Tiling.from_string('1234'), 1) is None
+    assert index.canonical_forms == 0
+    assert index.add(Tiling.from_string('123'), 2) is None
+    assert index.canonical_forms == 2
+    representative, explanation = index.add(Tiling.from_string('213'), 3)
+    assert representative == 0
+    assert explanation.startswith("Symmetry: ")
+    assert index.add(t132, 0) is None
+    representative, _ = index.add(Tiling.from_string('321'), 4)
+    assert representative == 2
+
+
+def test_tilescope_symmetry_index():
+    pack = point_placements.add_symmetry()
+    assert TileScopeTHREE('132', pack).symmetry_index is None
+    searcher = TileScopeTHREE('132', pack, canonical_symmetries=True)
+    assert searcher.symmetry_index is not None
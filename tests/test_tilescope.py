@@ -67,3 +67,35 @@ def test_1324():
     assert num_fusion == 1
     assert num_comp_fusion == 1
     assert isinstance(t, ProofTree)
+
+
+@pytest.mark.timeout(60)
+def test_parallel_expansion_matches_serial():
+    serial = TileScopeTHREE('132', point_placements)
+    serial.expand_classes(50)
+    parallel = TileScopeTHREE('132', point_placements, workers=2)
+    parallel.expand_classes(50)
+    parallel.close_pool()
+    assert serial.ruledb == parallel.ruledb
+    assert serial.equivdb == parallel.equivdb
+    assert ([serial.classdb.get_class(label)
+             for label in serial.classdb] ==
+            [parallel.classdb.get_class(label)
+             for label in parallel.classdb])
+
+
+@pytest.mark.timeout(60)
+def test_checkpoint_resume(tmpdir):
+    filename = str(tmpdir.join('132.log'))
+    searcher = TileScopeTHREE('132', point_placements, checkpoint=filename)
+    for _ in range(3):
+        searcher.expand_classes(10)
+        searcher.checkpoint()
+    resumed = TileScopeTHREE.resume(filename, point_placements)
+    assert resumed.ruledb == searcher.ruledb
+    assert resumed.equivdb == searcher.equivdb
+    assert resumed.classqueue.to_dict() == searcher.classqueue.to_dict()
+    assert ([resumed.classdb.get_class(label) for label in resumed.classdb] ==
+            [searcher.classdb.get_class(label) for label in searcher.classdb])
+    t = resumed.auto_search(smallest=True)
+    assert isinstance(t, ProofTree)
@@ -0,0 +1,113 @@
+import pytest
+
+from comb_spec_searcher import ProofTree, VerificationRule
+from comb_spec_searcher.proof_tree import ProofTreeNode
+from permuta import Perm
+from tilescopethree import TileScopeTHREE
+from tilescopethree.counting import count_terms
+from tilescopethree.strategies import all_cell_insertions
+from tilescopethree.strategy_packs_v2 import TileScopePack, point_placements
+from tilescopethree.tree_library import (FORMAL_STEP, TreeLibrary,
+                                         library_verified)
+from tilings import Obstruction, Requirement, Tiling
+
+epsilon = Tiling(obstructions=[Obstruction(Perm((0,)), [(0, 0)])])
+atom = Tiling(obstructions=[Obstruction(Perm((0, 1)), [(0, 0), (0, 0)]),
+                            Obstruction(Perm((1, 0)), [(0, 0), (0, 0)])],
+              requirements=[[Requirement(Perm((0,)), [(0, 0)])]])
+av132 = Tiling.from_string('132')
+catalan = [1, 1, 2, 5, 14, 42, 132, 429]
+
+
+def catalan_tree(atom_step="atom"):
+    return ProofTree(ProofTreeNode(
+        0, [0], [av132], disjoint_union=True, formal_step="split",
+        children=[
+            ProofTreeNode(1, [1], [epsilon], strategy_verified=True,
+                          formal_step="epsilon"),
+            ProofTreeNode(2, [2], [av132], decomposition=True, children=[
+                ProofTreeNode(0, [0], [av132], recursion=True),
+                ProofTreeNode(3, [3], [atom], strategy_verified=True,
+                              formal_step=atom_step),
+                ProofTreeNode(0, [0], [av132], recursion=True)])]))
+
+
+def test_add_and_lookup(tmpdir):
+    library = TreeLibrary(str(tmpdir.join('library.db')))
+    # Only the root does not recurse outside of its subtree.
+    assert library.add_tree(catalan_tree()) == 1
+    assert library.add_tree(catalan_tree()) == 0
+    assert len(library) == 1
+    tree = library.lookup(av132)
+    assert tree.root.eqv_path_comb_classes[0] == av132
+    assert count_terms(tree, 8) == catalan
+    # The symmetries of a tiling are found too.
+    av231 = Tiling.from_string('231')
+    tree = library.lookup(av231)
+    assert tree.root.eqv_path_comb_classes[0] == av231
+    assert count_terms(tree, 8) == catalan
+    assert library.lookup(Tiling.from_string('123')) is None
+    assert library_verified(av231, library=library.path) is not None
+    assert library_verified(epsilon, library=library.path) is None
+
+
+def test_basis_dependent(tmpdir):
+    library = TreeLibrary(str(tmpdir.join('library.db')))
+    basis = [Perm((0, 2, 1))]
+    library.add_tree(catalan_tree("one by one"), basis, {"one by one"})
+    assert library.lookup(av132, basis) is not None
+    assert library.lookup(av132) is None
+    assert library.lookup(av132, [Perm((0, 1, 2))]) is None
+    assert library.lookup(Tiling.from_string('231'), basis) is None
+
+
+def test_graft(tmpdir):
+    library = TreeLibrary(str(tmpdir.join('library.db')))
+    library.add_tree(catalan_tree())
+    av231 = Tiling.from_string('231')
+    tree = ProofTree(ProofTreeNode(
+        0, [0, 5], [av132, av231], eqv_explanations=["reverse"],
+        strategy_verified=True, formal_step=FORMAL_STEP))
+    tree = library.graft(tree)
+    assert tree.root.eqv_path_comb_classes[:2] == [av132, av231]
+    assert tree.root.eqv_explanations[0] == "reverse"
+    assert tree.root.disjoint_union
+    assert count_terms(tree, 8) == catalan
+
+
+@pytest.mark.timeout(60)
+def test_tilescope_library(tmpdir):
+    path = str(tmpdir.join('library.db'))
+    searcher = TileScopeTHREE('132', point_placements, library=path)
+    tree = searcher.auto_search(smallest=True)
+    assert tree is not None
+    assert len(searcher.library) > 0
+    again = TileScopeTHREE('132', point_placements, library=path)
+    tree = again.auto_search()
+    assert tree is not None
+    assert all(node.formal_step != FORMAL_STEP for node in tree.nodes())
+
+
+def one_by_one_verified(tiling, **kwargs):
+    """Stands in for the strategy of that name, which depends on the basis."""
+    if tiling.dimensions == (1, 1):
+        return VerificationRule("one by one")
+
+
+def test_dependent_steps_with_verification_cache(tmpdir):
+    cache = str(tmpdir.join('cache.db'))
+    library = str(tmpdir.join('library.db'))
+    pack = TileScopePack(initial_strats=[],
+                         inferral_strats=[],
+                         expansion_strats=[[all_cell_insertions]],
+                         ver_strats=[one_by_one_verified],
+                         name="one by one")
+    av123 = Tiling.from_string('123')
+    for _ in range(2):
+        searcher = TileScopeTHREE('132', pack, verification_cache=cache,
+                                  library=library)
+        searcher.try_verify(av123, searcher.classdb.get_label(av123))
+        searcher.verification_cache.flush()
+        # Also when the rule is found in the cache.
+        assert searcher._dependent_steps == {"one by one"}
+    assert searcher.verification_cache.hits == 1
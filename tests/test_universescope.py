@@ -0,0 +1,110 @@
+import json
+from itertools import combinations
+
+import pytest
+
+from permuta import PermSet
+from tilescopethree.strategy_packs_v2 import point_placements
+from tilescopethree.symmetry import canonical_form
+from tilescopethree.universescope import UniveralScope
+from tilings import Obstruction, Tiling
+
+
+def test_window_is_lazy():
+    taken = []
+
+    def bases():
+        for basis in ['123_321', '132_312', '12', '21', '1']:
+            taken.append(basis)
+            yield basis
+
+    scope = UniveralScope(strategy_pack=point_placements, bases=bases(),
+                          window=2)
+    assert len(scope.start_tilings) == 2
+    assert len(scope.start_labels) == 2
+    assert taken == ['123_321', '132_312']
+
+
+@pytest.mark.timeout(60)
+def test_stream_search(tmpdir):
+    output = str(tmpdir.join('trees.jsonl'))
+    bases = ['12', '21', '1', '123_321', '132_231_312']
+    scope = UniveralScope(strategy_pack=point_placements, bases=bases,
+                          window=2, output=output, max_classes=200)
+    solved = scope.stream_search(expansions=10)
+    with open(output) as f:
+        lines = [json.loads(line) for line in f]
+    assert sorted(line['basis'] for line in lines) == sorted(
+        ['01', '10', '0', '012_210', '021_120_201'])
+    assert solved == sum(1 for line in lines if line['tree'] is not None)
+    assert solved + scope.unsolved == len(bases)
+
+
+@pytest.mark.timeout(60)
+def test_stream_search_gives_up(tmpdir):
+    output = str(tmpdir.join('trees.jsonl'))
+    bases = ['123_321', '132_312', '1234']
+    scope = UniveralScope(strategy_pack=point_placements, bases=bases,
+                          window=2, output=output, max_classes=3)
+    # The windows do not fit in three classes, and clearing the universe
+    # would only repeat the same search.
+    assert scope.stream_search(expansions=10) == 0
+    assert scope.unsolved == len(bases)
+    with open(output) as f:
+        assert len(f.readlines()) == len(bases)
+
+
+def test_prune_queue():
+    scope = UniveralScope(strategy_pack=point_placements,
+                          bases=['123_321', '132_312'], window=2)
+    scope.expand_classes(20)
+    queue = scope.classqueue
+    labels = set(scope.classdb.label_to_info)
+    for label in sorted(labels):
+        queue.add_to_next(label)
+    # Retire the first start tiling.
+    scope.start_tilings.pop(0)
+    first = scope.start_labels.pop(0)
+    scope._prune_queue()
+    reached = scope._reachable()
+    assert first not in reached
+    assert set(queue.next_level) == labels & reached
+    assert scope._pruned == labels - reached
+    # The labels taken out are put back when they can be reached again.
+    scope.start_labels.append(first)
+    scope._prune_queue()
+    assert not scope._pruned
+    assert first in queue.curr_level
+
+
+def test_symmetry_classes():
+    scope = UniveralScope(n=3, k=2, strategy_pack=point_placements,
+                          symmetries=True)
+    assert len(scope.start_tilings) == 5
+    assert sum(scope.class_sizes.values()) == 5
+    assert scope.symmetry_report().startswith(
+        "15 bases in 5 symmetry classes")
+    members = set()
+    for representative in scope.start_tilings:
+        for member, tree in scope.member_trees(representative, None):
+            assert tree is None
+            members.add(member)
+    assert members == set(
+        Tiling([Obstruction.single_cell(patt, (0, 0)) for patt in basis])
+        for basis in combinations(PermSet(3), 2))
+
+
+def test_symmetries_are_lazy():
+    taken = []
+
+    def bases():
+        for basis in ['12', '21', '123_321', '132_312']:
+            taken.append(basis)
+            yield basis
+
+    scope = UniveralScope(strategy_pack=point_placements, bases=bases(),
+                          window=1, symmetries=True)
+    # Only the bases up to the first canonical representative are taken.
+    assert len(taken) < 4
+    [start_tiling] = scope.start_tilings
+    assert canonical_form(start_tiling)[0] == start_tiling
@@ -0,0 +1,70 @@
+from functools import partial
+
+import pytest
+
+from comb_spec_searcher import VerificationRule
+from permuta import Perm
+from permuta.descriptors import Basis
+from tilescopethree import TileScopeTHREE
+from tilescopethree.strategy_packs_v2 import point_placements
+from tilescopethree.verification_cache import VerificationCache
+from tilings import Tiling
+
+calls = []
+
+
+def verify(tiling, basis, small=True, **kwargs):
+    calls.append(tiling)
+    if small == (len(tiling.obstructions) == 1):
+        return VerificationRule("verified with {}".format(basis))
+
+
+def test_cache(tmpdir):
+    del calls[:]
+    path = str(tmpdir.join('verified.db'))
+    basis = Basis([Perm((0, 2, 1))])
+    cache = VerificationCache(path)
+    strategy = cache.wrap(verify)
+    assert strategy.__name__ == 'verify'
+    small, large = Tiling.from_string('132'), Tiling.from_string('123_321')
+    assert strategy(small, basis=basis).formal_step == (
+        "verified with {}".format(basis))
+    assert strategy(large, basis=basis) is None
+    assert strategy(small, basis=basis) is not None
+    assert strategy(large, basis=basis) is None
+    assert len(calls) == 2
+    # The keyword arguments are part of the key.
+    assert cache.wrap(partial(verify, small=False))(large, basis=basis)
+    assert len(calls) == 3
+    assert cache.hits == 2 and cache.misses == 3
+    cache.close()
+    # The results are kept between runs.
+    cache = VerificationCache(path)
+    assert cache.wrap(verify)(small, basis=basis) is not None
+    assert len(calls) == 3
+
+
+def test_eviction(tmpdir):
+    cache = VerificationCache(str(tmpdir.join('verified.db')), maxsize=2)
+    strategy = cache.wrap(verify)
+    tilings = [Tiling.from_string(basis) for basis in ('1', '12', '21')]
+    for tiling in tilings:
+        strategy(tiling, basis=[])
+    cache.flush()
+    assert cache.evictions == 1
+    del calls[:]
+    strategy(tilings[2], basis=[])
+    strategy(tilings[0], basis=[])
+    assert calls == [tilings[0]]
+
+
+@pytest.mark.timeout(20)
+def test_tilescope_verification_cache(tmpdir):
+    path = str(tmpdir.join('verified.db'))
+    searcher = TileScopeTHREE('132', point_placements,
+                              verification_cache=path)
+    assert searcher.auto_search(smallest=True) is not None
+    again = TileScopeTHREE('132', point_placements, verification_cache=path)
+    assert again.auto_search(smallest=True) is not None
+    assert again.verification_cache.misses == 0
+    assert again.verification_cache.hits > 0
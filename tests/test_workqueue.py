@@ -0,0 +1,88 @@
+import json
+import time
+
+import pytest
+
+from tilescopethree.strategies import verify_atoms
+from tilescopethree.strategy_packs_v2 import TileScopePack, point_placements
+from tilescopethree.workqueue import CLAIMED, DONE, FAILED, PENDING, \
+    WorkQueue, coordinate, run_worker
+
+
+def test_claim_and_complete(tmpdir):
+    queue = WorkQueue(str(tmpdir.join('queue.db')))
+    queue.add(['123_321', '132', '123_321'])
+    assert queue.counts() == {PENDING: 2, CLAIMED: 0, DONE: 0, FAILED: 0}
+    first = queue.claim('a')
+    second = queue.claim('b')
+    assert {first, second} == {'123_321', '132'}
+    assert queue.claim('c') is None
+    assert not queue.finished()
+    queue.complete('a', first, None, "status")
+    queue.complete('b', second, None, "status")
+    assert queue.finished()
+    assert sorted(queue.results()) == [('123_321', None), ('132', None)]
+
+
+def test_expired_claims_return(tmpdir):
+    queue = WorkQueue(str(tmpdir.join('queue.db')), lease=0.5)
+    queue.add(['132'])
+    assert queue.claim('dead') == '132'
+    assert queue.claim('alive') is None
+    time.sleep(0.6)
+    assert queue.claim('alive') == '132'
+    queue.renew('alive', '132')
+    assert queue.claim('other') is None
+
+
+def test_max_attempts(tmpdir):
+    queue = WorkQueue(str(tmpdir.join('queue.db')), lease=0.5,
+                      max_attempts=2)
+    queue.add(['132'])
+    assert queue.claim('a') == '132'
+    queue.fail('a', '132', "boom")
+    assert queue.claim('b') == '132'
+    time.sleep(0.6)
+    assert queue.claim('c') is None
+    assert queue.finished()
+    assert queue.counts()[FAILED] == 1
+    assert queue.failed() == [('132', "The claim of b expired.")]
+    assert list(queue.results()) == [('132', None)]
+
+
+def crash(tiling, **kwargs):
+    raise RuntimeError("crashed on {}".format(tiling))
+
+
+def test_worker_gives_up(tmpdir):
+    path = str(tmpdir.join('queue.db'))
+    WorkQueue(path).add(['132'])
+    pack = TileScopePack(initial_strats=[],
+                         inferral_strats=[],
+                         expansion_strats=[[crash]],
+                         ver_strats=[verify_atoms],
+                         name="crash")
+    assert run_worker(path, pack, poll=0.1, max_attempts=3) == 3
+    [(basis, error)] = WorkQueue(path).failed()
+    assert basis == '132'
+    assert "RuntimeError: crashed" in error
+
+
+def test_symmetries(tmpdir):
+    queue = WorkQueue(str(tmpdir.join('queue.db')))
+    queue.add(['132', '213', '231', '312', '123', '321'], symmetries=True)
+    assert queue.counts()[PENDING] == 2
+
+
+@pytest.mark.timeout(120)
+def test_coordinate(tmpdir):
+    path = str(tmpdir.join('queue.db'))
+    output = str(tmpdir.join('trees.jsonl'))
+    bases = ['12', '21', '132', '231']
+    solved = coordinate(path, bases, point_placements, workers=2,
+                        symmetries=True, output=output, max_time=5, poll=0.1)
+    with open(output) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['basis'] for line in lines] == bases
+    assert solved == sum(1 for line in lines if line['tree'] is not None)
+    assert WorkQueue(path).finished()
@@ -0,0 +1,113 @@
+"""
+A bounded cache of the permutations of each length avoiding a basis.
+
+The cell insertion strategies enumerate Av(basis).of_length(length) for the
+basis of every cell of every tiling, but the same few cell bases occur over
+and over. The avoiders are stored for the most recently used (basis, length)
+pairs, together with which of them are contained in, or contain, the
+requirements seen so far, so that filtering the candidates is not repeated
+either.
+"""
+from collections import OrderedDict
+
+from permuta import Av
+
+
+class Avoiders(object):
+    """The avoiders of a basis of some length, with containment filters."""
+
+    def __init__(self, perms):
+        self.perms = perms
+        self._contained_in = {}
+        self._containing = {}
+
+    def contained_in(self, perm):
+        """Return the set of avoiders contained in perm."""
+        res = self._contained_in.get(perm)
+        if res is None:
+            res = frozenset(patt for patt in self.perms if patt in perm)
+            self._contained_in[perm] = res
+        return res
+
+    def containing(self, perm):
+        """Return the tuple of avoiders containing perm."""
+        res = self._containing.get(perm)
+        if res is None:
+            res = tuple(patt for patt in self.perms if perm in patt)
+            self._containing[perm] = res
+        return res
+
+    def __len__(self):
+        return (len(self.perms) + sum(map(len, self._contained_in.values())) +
+                sum(map(len, self._containing.values())))
+
+
+class AvoidersCache(object):
+    """A least recently used cache of avoiders by basis and length."""
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, basis, length):
+        """Return the Avoiders of the given length for the basis."""
+        key = (tuple(sorted(set(basis))), length)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            entry = Avoiders(tuple(Av(list(key[0])).of_length(length)))
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return entry
+
+    def not_contained_in(self, basis, length, perms):
+        """
+        Return the avoiders of the given length for the basis that are not
+        contained in any of perms, in the order Av generates them.
+        """
+        entry = self.get(basis, length)
+        if not perms:
+            return entry.perms
+        contained = frozenset().union(*(entry.contained_in(perm)
+                                        for perm in perms))
+        return tuple(patt for patt in entry.perms if patt not in contained)
+
+    def containing(self, basis, length, perm):
+        """
+        Return the avoiders of the given length for the basis that contain
+        perm, in the order Av generates them.
+        """
+        return self.get(basis, length).containing(perm)
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+    def size(self):
+        """Return the number of permutations stored."""
+        return sum(len(entry) for entry in self._entries.values())
+
+    def status(self):
+        """Return a string of the size and hit rate of the cache."""
+        total = self.hits + self.misses
+        return ("Avoiders cache: {} entries storing {} permutations, {} hits "
+                "of {} ({:.0f}%), {} evictions\n"
+                "".format(len(self._entries), self.size(), self.hits, total,
+                          100 * self.hits / total if total else 0,
+                          self.evictions))
+
+
+_cache = AvoidersCache()
+
+
+def avoiders_cache():
+    """Return the cache shared by all insertion strategies."""
+    return _cache
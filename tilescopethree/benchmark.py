@@ -0,0 +1,239 @@
+"""
+Benchmarks for the strategies and for whole searches.
+
+The strategies are timed on a fixed corpus of tilings, and the searches are
+TileScopeTHREE.auto_search runs for a list of bases and strategy packs. The
+results are written as JSON, and two results can be compared to find the
+benchmarks that got slower.
+
+    python -m tilescopethree.benchmark corpus corpus.json
+    python -m tilescopethree.benchmark run results.json --corpus corpus.json
+    python -m tilescopethree.benchmark compare old.json new.json
+
+The corpus should be made once and kept, so that the strategies are timed on
+the same tilings even when the strategies that found them change.
+"""
+import json
+import platform
+import sys
+import time
+
+from comb_spec_searcher.utils import get_func_name
+from permuta import Perm
+from permuta.descriptors import Basis
+from tilescopethree import strategy_packs_v2
+from tilescopethree.encoding import decode_tiling
+from tilescopethree.strategies import (all_cell_insertions, all_placements,
+                                       database_verified, deflation,
+                                       elementary_verified, factor, fusion,
+                                       globally_verified, one_by_one_verified,
+                                       point_placement,
+                                       requirement_corroboration,
+                                       requirement_placement,
+                                       row_and_col_placements,
+                                       subclass_verified, subset_verified,
+                                       verify_atoms)
+from tilescopethree.tilescope import TileScopeTHREE
+from tilings import Tiling
+
+STRATEGIES = [all_cell_insertions, fusion, factor, deflation,
+              requirement_corroboration, point_placement,
+              requirement_placement, row_and_col_placements, all_placements,
+              verify_atoms, subset_verified, one_by_one_verified,
+              globally_verified, elementary_verified, subclass_verified,
+              database_verified]
+
+# The bases and packs whose tilings make the corpus, with the number of
+# classes to expand for each.
+CORPUS = [('132', 'point_placements', 50),
+          ('123', 'row_and_col_placements', 50),
+          ('1234', 'point_placements', 50),
+          ('1342_1423', 'point_placements_fusion', 50),
+          ('1324', 'row_and_col_placements_fusion', 50)]
+
+SEARCHES = [('132', 'point_placements'),
+            ('123', 'all_the_strategies_database_verified'),
+            ('123', 'point_placements_fusion'),
+            ('1342_1423', 'point_placements_fusion_with_interleaving'),
+            ('1324', 'row_and_col_placements_fusion_with_interleaving_fusion'),
+            ('1234_1243', 'insertion_row_and_col_placements'),
+            ('2413_3142', 'point_placements')]
+
+
+def make_corpus(corpus=CORPUS):
+    """
+    Return a list of (basis, tiling) pairs, found by expanding the bases
+    with the packs.
+    """
+    tilings = []
+    for basis, pack, expansions in corpus:
+        searcher = TileScopeTHREE(basis, getattr(strategy_packs_v2, pack))
+        searcher.expand_classes(expansions)
+        for info in searcher.classdb.label_to_info.values():
+            tilings.append((basis, decode_tiling(info.comb_class)))
+    return tilings
+
+
+def save_corpus(tilings, filename):
+    with open(filename, 'w') as f:
+        json.dump([{'basis': basis, 'tiling': tiling.to_jsonable()}
+                   for basis, tiling in tilings], f)
+
+
+def load_corpus(filename):
+    with open(filename) as f:
+        return [(item['basis'], Tiling.from_dict(item['tiling']))
+                for item in json.load(f)]
+
+
+def _basis(basis):
+    return Basis([Perm.to_standard([int(c) for c in p])
+                  for p in basis.split('_')])
+
+
+def _consume(result):
+    """Strategies return a rule, None or a generator of rules."""
+    if result is not None and not hasattr(result, 'formal_step'):
+        for _ in result:
+            pass
+
+
+def time_strategy(strategy, tilings, repeat=3):
+    """
+    Return the least time, over the repeats, to apply the strategy to each
+    tiling of the corpus and generate all its rules.
+    """
+    bases = {basis: _basis(basis) for basis, _ in tilings}
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for basis, tiling in tilings:
+            _consume(strategy(tiling, basis=bases[basis]))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def time_search(basis, pack, max_time=None):
+    """
+    Return the time to find a proof tree for the basis with the pack, and
+    whether one was found.
+    """
+    searcher = TileScopeTHREE(basis, getattr(strategy_packs_v2, pack))
+    start = time.perf_counter()
+    tree = searcher.auto_search(smallest=True, max_time=max_time)
+    return time.perf_counter() - start, tree is not None
+
+
+def run(tilings, strategies=STRATEGIES, searches=SEARCHES, repeat=3,
+        max_time=None, verbose=False):
+    """Run the benchmarks and return the results as a dictionary."""
+    results = {'meta': {'python': platform.python_version(),
+                        'machine': platform.machine(),
+                        'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+                        'tilings': len(tilings),
+                        'repeat': repeat},
+               'strategies': {},
+               'searches': {}}
+    for strategy in strategies:
+        name = get_func_name(strategy)
+        results['strategies'][name] = time_strategy(strategy, tilings,
+                                                    repeat)
+        if verbose:
+            print("{:<40} {:>10.3f}".format(
+                name, results['strategies'][name]))
+    for basis, pack in searches:
+        name = "{} {}".format(basis, pack)
+        elapsed, found = time_search(basis, pack, max_time)
+        results['searches'][name] = {'time': elapsed, 'found': found}
+        if verbose:
+            print("{:<40} {:>10.3f} {}".format(
+                name, elapsed, "" if found else "not found"))
+    return results
+
+
+def _times(results):
+    times = dict(('strategy ' + name, t)
+                 for name, t in results.get('strategies', {}).items())
+    times.update(('search ' + name, search['time'])
+                 for name, search in results.get('searches', {}).items())
+    return times
+
+
+def compare(old, new, threshold=0.1, minimum=0.01):
+    """
+    Return a list of (benchmark, old time, new time) for the benchmarks in
+    both results that are more than threshold slower in the new results.
+    Benchmarks taking less than minimum seconds are ignored, as their times
+    are mostly noise.
+    """
+    old_times, new_times = _times(old), _times(new)
+    regressions = []
+    for name in sorted(old_times):
+        if name not in new_times:
+            continue
+        before, after = old_times[name], new_times[name]
+        if max(before, after) < minimum:
+            continue
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    for name in sorted(new.get('searches', {})):
+        # A search that no longer finds a tree is always a regression.
+        if (old.get('searches', {}).get(name, {}).get('found') and
+                not new['searches'][name]['found']):
+            regressions.append((name + " (no tree found)",
+                                old_times['search ' + name],
+                                new_times['search ' + name]))
+    return regressions
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the strategies and searches.")
+    subparsers = parser.add_subparsers(dest='command')
+    corpus_parser = subparsers.add_parser(
+        'corpus', help="make a corpus of tilings")
+    corpus_parser.add_argument('output')
+    run_parser = subparsers.add_parser('run', help="run the benchmarks")
+    run_parser.add_argument('output')
+    run_parser.add_argument('--corpus', help="a corpus made by 'corpus'")
+    run_parser.add_argument('--repeat', type=int, default=3)
+    run_parser.add_argument('--max-time', type=int, default=None)
+    compare_parser = subparsers.add_parser(
+        'compare', help="compare the results of two runs")
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help="the relative slowdown to report")
+    args = parser.parse_args(argv)
+
+    if args.command == 'corpus':
+        save_corpus(make_corpus(), args.output)
+    elif args.command == 'run':
+        tilings = (load_corpus(args.corpus) if args.corpus
+                   else make_corpus())
+        results = run(tilings, repeat=args.repeat, max_time=args.max_time,
+                      verbose=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    elif args.command == 'compare':
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        for name, before, after in regressions:
+            print("{:<60} {:>10.3f} {:>10.3f} {:>+7.0%}".format(
+                name, before, after, after / before - 1 if before else 0))
+        if regressions:
+            return 1
+        print("No regressions above {:.0%}".format(args.threshold))
+    else:
+        parser.print_help()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
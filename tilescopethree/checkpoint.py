@@ -0,0 +1,246 @@
+"""
+An append-only, incremental checkpoint log for searchers.
+
+The class database, equivalence database, rule database and class queue of a
+searcher are replaced by subclasses that record every change made to them.
+Each checkpoint appends a single line to the log, containing only the changes
+made since the previous checkpoint, so the cost of a checkpoint is bounded by
+the work done since the last one. The searcher is recovered by replaying the
+log onto a freshly initialised searcher.
+
+The first line of the log is a header describing the start class and the
+strategies used. Every other line is a JSON object with the keys
+- 'events': the changes, in the order they were made,
+- 'infos': the current information about every label touched,
+- 'stats': the times and counts reported by the status of the searcher.
+"""
+import json
+from base64 import b64decode, b64encode
+
+from comb_spec_searcher.class_queue import ClassQueue
+from comb_spec_searcher.equiv_db import EquivalenceDB
+from comb_spec_searcher.rule_db import RuleDB
+from comb_spec_searcher.utils import get_module_and_func_names
+from tilescopethree.encoding import CompactClassDB
+
+INFO_FLAGS = ('expanded', 'symmetry_expanded', 'initial_expanded',
+              'expanding_children_only', 'expanding_other_sym', 'expandable',
+              'inferrable', 'inferral_expanded', 'verified',
+              'verification_reason', 'empty', 'strategy_verified')
+
+STATS = ('symmetry_time', 'tree_search_time', 'prep_for_tree_search_time',
+         'queue_time', '_time_taken', '_has_proof_tree')
+
+
+class CheckpointLog(object):
+    """The changes made to a searcher since the last checkpoint."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.events = []
+        self.touched = set()
+
+    def record(self, *event):
+        """Record a change."""
+        self.events.append(event)
+
+    def write_header(self, searcher):
+        """Start a new log for the searcher."""
+        header = {
+            'start_class': b64encode(searcher.start_class.compress()).decode(),
+            'initial_strategies': [get_module_and_func_names(f)
+                                   for f in searcher.initial_strategies],
+            'strategy_generators': [[get_module_and_func_names(f)
+                                     for f in strategies]
+                                    for strategies in
+                                    searcher.strategy_generators],
+            'inferral_strategies': [get_module_and_func_names(f)
+                                    for f in searcher.inferral_strategies],
+            'verification_strategies': [
+                get_module_and_func_names(f)
+                for f in searcher.verification_strategies],
+            'iterative': searcher.iterative,
+            'forward_equivalence': searcher.forward_equivalence,
+        }
+        with open(self.filename, 'w') as f:
+            f.write(json.dumps(header) + "\n")
+
+    def flush(self, searcher):
+        """Append the changes since the last checkpoint to the log."""
+        label_to_info = searcher.classdb.label_to_info
+        line = {
+            'events': self.events,
+            'infos': [[label] + [getattr(label_to_info[label], flag)
+                                 for flag in INFO_FLAGS]
+                      for label in sorted(self.touched)],
+            'stats': dict({stat: getattr(searcher, stat) for stat in STATS},
+                          strategy_times=dict(searcher.strategy_times),
+                          strategy_expansions=dict(
+                              searcher.strategy_expansions)),
+        }
+        with open(self.filename, 'a') as f:
+            f.write(json.dumps(line) + "\n")
+        self.events = []
+        self.touched = set()
+
+
+def read_log(filename):
+    """Return the header and an iterator of the checkpoints in the log."""
+    f = open(filename, 'r')
+    header = json.loads(f.readline())
+
+    def checkpoints():
+        with f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # The last line may be incomplete if the process died
+                    # while writing it.
+                    return
+    return header, checkpoints()
+
+
+def replay(searcher, checkpoints):
+    """
+    Apply the checkpoints to the databases of a freshly initialised searcher.
+    Nothing is recorded while replaying.
+    """
+    classdb = searcher.classdb
+    equivdb = searcher.equivdb
+    ruledb = searcher.ruledb
+    classqueue = searcher.classqueue
+    for checkpoint in checkpoints:
+        for event in checkpoint['events']:
+            kind, args = event[0], event[1:]
+            if kind == 'c':
+                label, comb_class = args
+                comb_class = b64decode(comb_class.encode())
+                classdb.add(comb_class, compressed=True)
+                assert classdb.class_to_info[comb_class].label == label
+            elif kind == 'e':
+                equivdb[args[0]]
+            elif kind == 'u':
+                equivdb.union(*args)
+            elif kind == 'v':
+                equivdb.update_verified(args[0])
+            elif kind == 'r':
+                start, end, explanation, constructor = args
+                ruledb.add(start, end, explanation, constructor)
+            elif kind == 'rr':
+                ruledb.remove(args[0], tuple(args[1]))
+            elif kind == 'qw':
+                classqueue.add_to_working(args[0])
+            elif kind == 'qn':
+                classqueue.add_to_next(args[0])
+            elif kind == 'qc':
+                classqueue.add_to_curr(args[0])
+            elif kind == 'qp':
+                classqueue.next()
+            elif kind == 'qi':
+                classqueue.ignore.add(args[0])
+            else:
+                raise ValueError("Unknown checkpoint event {}.".format(kind))
+        for info in checkpoint['infos']:
+            label, values = info[0], info[1:]
+            for flag, value in zip(INFO_FLAGS, values):
+                setattr(classdb.label_to_info[label], flag, value)
+        stats = checkpoint['stats']
+        for stat in STATS:
+            setattr(searcher, stat, stats[stat])
+        searcher.strategy_times.clear()
+        searcher.strategy_times.update(stats['strategy_times'])
+        searcher.strategy_expansions.clear()
+        searcher.strategy_expansions.update(stats['strategy_expansions'])
+
+
+def logged(database, log=None):
+    """
+    Return a copy of the database which records its changes to the log,
+    sharing the underlying data.
+    """
+    logged_class = {CompactClassDB: LoggedClassDB,
+                    EquivalenceDB: LoggedEquivalenceDB,
+                    RuleDB: LoggedRuleDB,
+                    ClassQueue: LoggedClassQueue}[type(database)]
+    logged_database = logged_class.__new__(logged_class)
+    logged_database.__dict__.update(database.__dict__)
+    logged_database.log = log
+    return logged_database
+
+
+class LoggedClassDB(CompactClassDB):
+    """A class database recording new classes and the labels touched."""
+
+    def add(self, comb_class, *args, **kwargs):
+        number_of_classes = len(self.class_to_info)
+        super().add(comb_class, *args, **kwargs)
+        if (self.log is not None and
+                len(self.class_to_info) > number_of_classes):
+            label = number_of_classes
+            compressed = self.label_to_info[label].comb_class
+            self.log.record('c', label, b64encode(compressed).decode())
+            self.log.touched.add(label)
+
+    def _get_info(self, key):
+        info = super()._get_info(key)
+        if self.log is not None:
+            self.log.touched.add(info.label)
+        return info
+
+
+class LoggedEquivalenceDB(EquivalenceDB):
+    """An equivalence database recording unions and verifications."""
+
+    def __getitem__(self, comb_class):
+        if self.log is not None and comb_class not in self.parents:
+            self.log.record('e', comb_class)
+        return super().__getitem__(comb_class)
+
+    def union(self, t1, t2, explanation):
+        if self.log is not None:
+            self.log.record('u', t1, t2, explanation)
+        super().union(t1, t2, explanation)
+
+    def update_verified(self, comb_class):
+        if self.log is not None and not self.is_verified(comb_class):
+            self.log.record('v', comb_class)
+        super().update_verified(comb_class)
+
+
+class LoggedRuleDB(RuleDB):
+    """A rule database recording rules added and removed."""
+
+    def add(self, start, end, explanation, constructor):
+        super().add(start, end, explanation, constructor)
+        if self.log is not None:
+            self.log.record('r', start, sorted(end), explanation, constructor)
+
+    def remove(self, start, end):
+        super().remove(start, end)
+        if self.log is not None:
+            self.log.record('rr', start, list(end))
+
+
+class LoggedClassQueue(ClassQueue):
+    """A class queue recording every label added and every label taken."""
+
+    def add_to_working(self, comb_class):
+        if self.log is not None:
+            self.log.record('qw', comb_class)
+        super().add_to_working(comb_class)
+
+    def add_to_next(self, comb_class):
+        if self.log is not None:
+            self.log.record('qn', comb_class)
+        super().add_to_next(comb_class)
+
+    def add_to_curr(self, comb_class):
+        if self.log is not None:
+            self.log.record('qc', comb_class)
+        super().add_to_curr(comb_class)
+
+    def next(self):
+        if self.log is not None:
+            self.log.record('qp')
+        return super().next()
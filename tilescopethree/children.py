@@ -0,0 +1,119 @@
+"""
+Building the children of insertion rules only when the searcher needs them.
+
+The batch strategies that insert gridded perms into a tiling yield
+InsertionRules, whose children are not built until comb_classes is asked
+for. The searcher wraps those strategies so that:
+- the rules of a tiling whose equivalence class is already verified are
+  dropped without building their children, and
+- a rule with the same parent and fingerprint as one already yielded in
+  the same expansion, by any strategy, e.g., a row insertion into a row
+  with a single cell and a point insertion into that cell, or the same
+  factor inserted by all_factor_insertions and targeted_cell_insertion, is
+  dropped before its children are built, and
+- the labels of the children of a rule are remembered by the label of the
+  parent and the fingerprint of the rule, so when a later expansion makes
+  an insertion with the same children, they are taken from the class
+  database instead of being built again.
+"""
+from collections import OrderedDict
+
+from comb_spec_searcher.utils import get_func_name
+
+
+class ChildCache(object):
+    """The labels of the children of the most recent insertion rules."""
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._labels = OrderedDict()
+        # The rules yielded in the current expansion.
+        self._seen = set()
+        self.built = 0
+        self.reused = 0
+        self.duplicates = 0
+        self.dropped = 0
+
+    def new_expansion(self):
+        """Forget the rules yielded in the last expansion."""
+        self._seen = set()
+
+    def get(self, key):
+        labels = self._labels.get(key)
+        if labels is not None:
+            self._labels.move_to_end(key)
+        return labels
+
+    def put(self, key, labels):
+        self._labels[key] = labels
+        if len(self._labels) > self.maxsize:
+            self._labels.popitem(last=False)
+
+    def wrap(self, strategy, searcher, label):
+        """Return the strategy, building the children of its insertion rules
+        only when needed."""
+        return LazyChildrenStrategy(strategy, self, searcher, label)
+
+    def status(self):
+        return ("Insertion rules: {} built, {} reused, {} duplicates and {} "
+                "for verified parents dropped\n".format(
+                    self.built, self.reused, self.duplicates, self.dropped))
+
+
+class LazyChildrenStrategy(object):
+    """
+    A strategy whose insertion rules are dropped when the parent is verified
+    or they were already yielded in the expansion, and whose children are
+    reused when they are known. It has the same name
+    as the strategy it wraps.
+    """
+
+    def __init__(self, strategy, cache, searcher, label):
+        self.strategy = strategy
+        self.cache = cache
+        self.searcher = searcher
+        self.label = label
+        self.__name__ = get_func_name(strategy)
+
+    def __call__(self, tiling, **kwargs):
+        rules = self.strategy(tiling, **kwargs)
+        if rules is None or hasattr(rules, 'formal_step'):
+            return rules
+        return self._generate(rules)
+
+    def _generate(self, rules):
+        cache, searcher = self.cache, self.searcher
+        for rule in rules:
+            fingerprint = getattr(rule, 'fingerprint', None)
+            if fingerprint is None:
+                yield rule
+                continue
+            # Also for the rules found by a worker, so that the same rules
+            # are added as when searching serially.
+            if searcher.equivdb.is_verified(self.label):
+                cache.dropped += 1
+                continue
+            # A rule that ignores the parent is not the same as one that
+            # does not.
+            seen = (self.label, fingerprint, rule.ignore_parent)
+            if seen in cache._seen:
+                cache.duplicates += 1
+                continue
+            cache._seen.add(seen)
+            # The rules found by a worker have their children built.
+            if getattr(rule, 'built', True):
+                yield rule
+                continue
+            key = (self.label, fingerprint)
+            labels = cache.get(key)
+            if labels is not None:
+                cache.reused += 1
+                rule.comb_classes = [searcher.classdb.get_class(label)
+                                     for label in labels]
+                yield rule
+                continue
+            cache.built += 1
+            comb_classes = rule.comb_classes
+            yield rule
+            cache.put(key, tuple(searcher.classdb.get_label(comb_class)
+                                 for comb_class in comb_classes))
@@ -0,0 +1,296 @@
+"""
+Batched containment of gridded permutations.
+
+A tiling checks that a gridded permutation avoids its obstructions one pair
+at a time with GriddedPerm.__contains__, which looks at every occurrence of
+the pattern of the obstruction in the permutation and then compares the
+cells. When many gridded permutations are checked against the same
+obstructions, e.g., when every gridded permutation of a tiling up to some
+length is generated, it is faster to pack the gridded permutations of the
+same length into two NumPy arrays, the values and the cells of their points,
+and to test an obstruction against all of them at once: for every choice of
+as many points as the obstruction has, the cells are compared and the values
+checked to be in the order of the pattern of the obstruction.
+
+Without NumPy, or for small batches, the same functions fall back to
+GriddedPerm containment.
+"""
+from itertools import combinations
+
+from permuta import Perm
+from tilings import GriddedPerm
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Batches with fewer (pattern, gridded perm) pairs are checked in Python.
+MIN_BATCH = 64
+# The most (gridded perm, occurrence) pairs looked at in one array operation.
+CHUNK = 2**18
+
+_combinations = {}
+
+
+def _choices(n, k, last=False):
+    """
+    Return an array with a row for every k-subset of range(n), or for every
+    k-subset containing n - 1 if last is True.
+    """
+    key = (n, k, last)
+    res = _combinations.get(key)
+    if res is None:
+        if last:
+            rows = [c + (n - 1,) for c in combinations(range(n - 1), k - 1)]
+        else:
+            rows = list(combinations(range(n), k))
+        res = numpy.array(rows, dtype=numpy.intp).reshape(len(rows), k)
+        _combinations[key] = res
+    return res
+
+
+class CellIndex(object):
+    """Numbers the cells, so that a gridded perm is an array of numbers."""
+
+    def __init__(self, cells=()):
+        self.cells = []
+        self.index = {}
+        for cell in cells:
+            self.add(cell)
+
+    def add(self, cell):
+        i = self.index.get(cell)
+        if i is None:
+            i = len(self.cells)
+            self.index[cell] = i
+            self.cells.append(cell)
+        return i
+
+    def pattern(self, gp):
+        """
+        Return the cells of the gridded perm as numbers, in the order of the
+        values of its points, and the values of the cells, or None if it
+        uses a cell without a number.
+        """
+        if any(cell not in self.index for cell in gp.pos):
+            return None
+        order = gp.patt.inverse()
+        return (numpy.array(order, dtype=numpy.intp),
+                numpy.array([self.index[cell] for cell in gp.pos],
+                            dtype=numpy.int32))
+
+
+def pack(gridded_perms, cell_index):
+    """
+    Return the values and the cells of the gridded perms, which must all
+    have the same length, as two arrays with a row for each gridded perm.
+    """
+    length = len(gridded_perms[0]) if gridded_perms else 0
+    values = numpy.array([tuple(gp.patt) for gp in gridded_perms],
+                         dtype=numpy.int16).reshape(len(gridded_perms),
+                                                    length)
+    cells = numpy.array([[cell_index.add(cell) for cell in gp.pos]
+                         for gp in gridded_perms],
+                        dtype=numpy.int32).reshape(len(gridded_perms), length)
+    return values, cells
+
+
+def unpack(values, cells, cell_index):
+    """Return the gridded perms with the values and cells given."""
+    cell_list = cell_index.cells
+    return [GriddedPerm(Perm(v), (cell_list[c] for c in cs))
+            for v, cs in zip(values.tolist(), cells.tolist())]
+
+
+def occurs(pattern, values, cells, last=False):
+    """
+    Return a boolean array, True for each row of values and cells that
+    contains the pattern, as returned by CellIndex.pattern. If last is True,
+    only occurrences using the last point are looked for.
+    """
+    order, pattern_cells = pattern
+    count, length = values.shape
+    k = len(order)
+    if k > length or (last and k == 0):
+        return numpy.zeros(count, dtype=bool)
+    choices = _choices(length, k, last)
+    # The cells of the occurrence are compared in the order of the points.
+    # The values are looked at in the order of the values of the pattern,
+    # and must be increasing.
+    value_choices = choices[:, order]
+    res = numpy.zeros(count, dtype=bool)
+    step = max(1, CHUNK // max(1, len(choices)))
+    for start in range(0, count, step):
+        stop = min(count, start + step)
+        found = (cells[start:stop][:, choices] == pattern_cells).all(axis=2)
+        if k > 1:
+            chosen = values[start:stop][:, value_choices]
+            found &= (chosen[:, :, 1:] > chosen[:, :, :-1]).all(axis=2)
+        res[start:stop] = found.any(axis=1)
+    return res
+
+
+def _by_length(gridded_perms):
+    lengths = {}
+    for i, gp in enumerate(gridded_perms):
+        lengths.setdefault(len(gp), []).append(i)
+    return lengths
+
+
+def containment_matrix(patterns, gridded_perms):
+    """
+    Return a list with a list for every pattern, whose j-th entry is True if
+    the pattern is contained in the j-th gridded perm.
+    """
+    patterns, gridded_perms = list(patterns), list(gridded_perms)
+    if numpy is None or len(patterns) * len(gridded_perms) < MIN_BATCH:
+        return [[patt in gp for gp in gridded_perms] for patt in patterns]
+    cell_index = CellIndex()
+    res = [[False] * len(gridded_perms) for _ in patterns]
+    for indices in _by_length(gridded_perms).values():
+        values, cells = pack([gridded_perms[i] for i in indices], cell_index)
+        for row, patt in zip(res, patterns):
+            pattern = cell_index.pattern(patt)
+            if pattern is None:
+                continue
+            for i, found in zip(indices, occurs(pattern, values,
+                                                cells).tolist()):
+                row[i] = found
+    return res
+
+
+def avoiding(obstructions, gridded_perms):
+    """Return the gridded perms that avoid all of the obstructions."""
+    obstructions, gridded_perms = list(obstructions), list(gridded_perms)
+    if numpy is None or len(obstructions) * len(gridded_perms) < MIN_BATCH:
+        return [gp for gp in gridded_perms
+                if not any(ob in gp for ob in obstructions)]
+    cell_index = CellIndex()
+    keep = [True] * len(gridded_perms)
+    for indices in _by_length(gridded_perms).values():
+        values, cells = pack([gridded_perms[i] for i in indices], cell_index)
+        contained = _contained(obstructions, values, cells, cell_index)
+        for i, found in zip(indices, contained.tolist()):
+            keep[i] = not found
+    return [gp for gp, k in zip(gridded_perms, keep) if k]
+
+
+def _contained(obstructions, values, cells, cell_index, last=False):
+    """
+    Return a boolean array, True for each row containing one of the
+    obstructions. Rows already known to contain one are not checked again.
+    """
+    contained = numpy.zeros(len(values), dtype=bool)
+    for ob in obstructions:
+        pattern = cell_index.pattern(ob)
+        if pattern is None:
+            continue
+        rows = numpy.flatnonzero(~contained)
+        if not len(rows):
+            break
+        contained[rows] = occurs(pattern, values[rows], cells[rows], last)
+    return contained
+
+
+def _obstruction_cells(obstructions):
+    """The cells that are not empty on a tiling with the obstructions."""
+    return sorted(set(cell for ob in obstructions
+                      if ob.is_point_obstr() is None for cell in ob.pos))
+
+
+def gridded_perms(obstructions, maxlen, cells=None):
+    """
+    Return a list whose i-th entry is the list of gridded perms of length i
+    on the tiling with the obstructions, and no requirements, for i up to
+    maxlen. The points are in the given cells, by default the cells of the
+    obstructions that are not points.
+
+    A gridded perm of length n + 1 avoiding the obstructions is a gridded perm
+    of length n avoiding them, with a point added to the right in one of the
+    cells, so the gridded perms are found length by length. A new gridded
+    perm is only checked for occurrences of the obstructions using its new
+    point.
+    """
+    obstructions = list(obstructions)
+    if any(ob.is_empty() for ob in obstructions):
+        return [[] for _ in range(maxlen + 1)]
+    cells = (_obstruction_cells(obstructions) if cells is None
+             else sorted(cells))
+    if numpy is None:
+        return _gridded_perms_python(obstructions, cells, maxlen)
+    cell_index = CellIndex(cells)
+    cols = numpy.array([x for x, _ in cells], dtype=numpy.int32)
+    rows = numpy.array([y for _, y in cells], dtype=numpy.int32)
+    values = numpy.zeros((1, 0), dtype=numpy.int16)
+    gp_cells = numpy.zeros((1, 0), dtype=numpy.int32)
+    res = [[GriddedPerm.empty_perm()]]
+    for length in range(maxlen):
+        values, gp_cells = _extend(values, gp_cells, cols, rows)
+        contained = _contained(obstructions, values, gp_cells, cell_index,
+                               last=True)
+        values, gp_cells = values[~contained], gp_cells[~contained]
+        res.append(unpack(values, gp_cells, cell_index))
+    return res
+
+
+def _extend(values, cells, cols, rows):
+    """
+    Return the arrays of all the ways of adding a point to the right of the
+    rows of values and cells, ordered by row, then cell and then value.
+    """
+    count, length = values.shape
+    last_col = (cols[cells[:, -1]] if length
+                else numpy.full(count, -1, dtype=numpy.int32))
+    point_rows = rows[cells]
+    parents, new_cells, new_values = [], [], []
+    for i, (x, y) in enumerate(zip(cols.tolist(), rows.tolist())):
+        selected = numpy.flatnonzero(last_col <= x)
+        if not len(selected):
+            continue
+        # The new point is above the points in lower rows, and below those
+        # in higher rows.
+        low = (point_rows[selected] < y).sum(axis=1)
+        high = (point_rows[selected] <= y).sum(axis=1)
+        ways = high - low + 1
+        parent = numpy.repeat(selected, ways)
+        first = numpy.cumsum(ways) - ways
+        offset = numpy.arange(len(parent)) - numpy.repeat(first, ways)
+        parents.append(parent)
+        new_cells.append(numpy.full(len(parent), i, dtype=numpy.int32))
+        new_values.append(numpy.repeat(low, ways) + offset)
+    if not parents:
+        return (numpy.zeros((0, length + 1), dtype=numpy.int16),
+                numpy.zeros((0, length + 1), dtype=numpy.int32))
+    parent = numpy.concatenate(parents)
+    new_cell = numpy.concatenate(new_cells)
+    new_value = numpy.concatenate(new_values).astype(numpy.int16)
+    order = numpy.lexsort((new_value, new_cell, parent))
+    parent, new_cell, new_value = (parent[order], new_cell[order],
+                                   new_value[order])
+    old = values[parent]
+    old = old + (old >= new_value[:, None])
+    return (numpy.concatenate([old, new_value[:, None]], axis=1),
+            numpy.concatenate([cells[parent], new_cell[:, None]], axis=1))
+
+
+def _gridded_perms_python(obstructions, cells, maxlen):
+    res = [[GriddedPerm.empty_perm()]]
+    for length in range(maxlen):
+        level = []
+        for gp in res[-1]:
+            last_col = gp.pos[-1][0] if gp.pos else -1
+            for cell in cells:
+                if cell[0] < last_col:
+                    continue
+                low = sum(1 for _, y in gp.pos if y < cell[1])
+                high = sum(1 for _, y in gp.pos if y <= cell[1])
+                for val in range(low, high + 1):
+                    new = GriddedPerm(
+                        Perm(tuple(v + 1 if v >= val else v for v in gp.patt)
+                             + (val,)),
+                        gp.pos + (cell,))
+                    if not any(ob in new for ob in obstructions):
+                        level.append(new)
+        res.append(level)
+    return res
@@ -0,0 +1,371 @@
+"""
+Count the objects in the classes of a proof tree, term by term.
+
+Every node of the proof tree is turned into a power series whose
+coefficients are computed in increasing order:
+- a disjoint union is the sum of the series of its children,
+- a decomposition is the product of the series of its children, i.e., the
+  truncated convolution of their coefficients, where each atom shifts the
+  product by one,
+- a recursion is the series of the node with the same label,
+- a verified node is the series of the generating function of its class.
+The coefficient of x^n of every node only depends on coefficients of x^m
+with m <= n, so the first N coefficients are found by computing the n-th
+coefficient of every node for n = 0, 1, ..., N - 1. The partial products of
+a decomposition are kept, so each new coefficient costs a single pass over
+the coefficients found so far.
+
+If a modulus is given, all arithmetic is done modulo it. Very long
+sequences are best counted modulo many primes that fit in a machine word,
+one process per prime, and then reconstructed with the Chinese remainder
+theorem, see count_terms_crt. When NumPy is installed the convolutions
+modulo a prime are done with vectorised dot products.
+"""
+import multiprocessing
+
+import sympy
+import sympy.abc
+
+from comb_spec_searcher.utils import taylor_expand
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The primes used by count_terms_crt are below 2**PRIME_BITS, so that a
+# product of two residues fits in 52 bits and 2**(63 - 2 * PRIME_BITS) of
+# them can be summed in an int64 without overflowing.
+PRIME_BITS = 26
+
+
+class Series(object):
+    """The coefficients of the generating function of a node."""
+
+    def __init__(self, modulus=None):
+        self.modulus = modulus
+        self.terms = []
+        self._computing = False
+        self._buffer = None
+
+    def __getitem__(self, n):
+        if n < 0:
+            return 0
+        while len(self.terms) <= n:
+            if self._computing:
+                raise ValueError("The proof tree is not productive, the "
+                                 "coefficients of a node depend on "
+                                 "themselves.")
+            self._computing = True
+            try:
+                term = self._next_term(len(self.terms))
+            finally:
+                self._computing = False
+            if self.modulus is not None:
+                term %= self.modulus
+            buffer = self._buffer
+            if buffer is not None and len(self.terms) < len(buffer):
+                buffer[len(self.terms)] = term
+            self.terms.append(term)
+        return self.terms[n]
+
+    def array(self, start, stop):
+        """
+        Return the terms from start up to, but not including, stop as a NumPy
+        array. Only used for series modulo a prime below 2**PRIME_BITS.
+        """
+        if len(self.terms) < stop:
+            self[stop - 1]
+        if self._buffer is None or len(self._buffer) < stop:
+            self._buffer = numpy.zeros(max(2 * stop, 16), dtype=numpy.int64)
+            self._buffer[:len(self.terms)] = self.terms
+        return self._buffer[start:stop]
+
+    def _next_term(self, n):
+        raise NotImplementedError
+
+
+class SumSeries(Series):
+    """The series of a disjoint union."""
+
+    def __init__(self, children, modulus=None):
+        super().__init__(modulus)
+        self.children = children
+
+    def _next_term(self, n):
+        return sum(child[n] for child in self.children)
+
+
+class ProductSeries(Series):
+    """The series of a decomposition, with some atoms among the children."""
+
+    def __init__(self, children, atoms, modulus=None):
+        super().__init__(modulus)
+        self.atoms = atoms
+        # The product of the children, as a chain of partial products.
+        product = children[0] if children else None
+        for child in children[1:]:
+            product = _Convolution(product, child, modulus)
+        self.product = product
+
+    def _next_term(self, n):
+        if n < self.atoms:
+            return 0
+        if self.product is None:
+            return 1 if n == self.atoms else 0
+        return self.product[n - self.atoms]
+
+
+class _Convolution(Series):
+    """The product of two series."""
+
+    def __init__(self, left, right, modulus=None):
+        super().__init__(modulus)
+        self.left = left
+        self.right = right
+
+        self.vectorised = (numpy is not None and modulus is not None and
+                           modulus < 2**PRIME_BITS)
+
+    def _next_term(self, n):
+        left, right = self.left, self.right
+        if n == 0:
+            # The product is zero if either constant term is, and the other
+            # might depend on this term.
+            try:
+                constant = left[0]
+            except ValueError:
+                if right[0]:
+                    raise
+                return 0
+            return constant * right[0] if constant else 0
+        # The terms left[n] and right[n] are only needed if the other
+        # constant term is non-zero, as they might depend on this term.
+        total = 0
+        if left[0]:
+            total += left[0] * right[n]
+        if right[0]:
+            total += left[n] * right[0]
+        if self.vectorised and n > 1:
+            block = 2**(63 - 2 * PRIME_BITS)
+            for start in range(1, n, block):
+                stop = min(start + block, n)
+                total += int(numpy.dot(left.array(start, stop),
+                                       right.array(n - stop + 1,
+                                                   n - start + 1)[::-1])
+                             % self.modulus)
+            return total
+        for i in range(1, n):
+            a = left[i]
+            if a:
+                total += a * right[n - i]
+        return total
+
+
+class FixedSeries(Series):
+    """A series whose terms are known in advance, and zero after those."""
+
+    def __init__(self, terms, modulus=None):
+        super().__init__(modulus)
+        self.known = terms
+
+    def _next_term(self, n):
+        return self.known[n] if n < len(self.known) else 0
+
+
+class GenfSeries(Series):
+    """
+    The series of a generating function, in the variable x. If it is not a
+    rational function, it is Taylor expanded, at once up to the given length
+    if the number of terms needed is known.
+    """
+
+    def __init__(self, genf, modulus=None, length=0):
+        super().__init__(modulus)
+        self.genf = genf
+        self.length = length
+        self.known = []
+        numer, denom = sympy.fraction(sympy.together(genf))
+        x = sympy.abc.x
+        self.numer = self.denom = None
+        if numer.is_polynomial(x) and denom.is_polynomial(x):
+            numer = sympy.Poly(numer, x).all_coeffs()[::-1]
+            denom = sympy.Poly(denom, x).all_coeffs()[::-1]
+            if (all(c.is_integer for c in numer + denom) and
+                    denom[0] in (1, -1)):
+                self.numer = [int(c) for c in numer]
+                self.denom = [int(c) for c in denom]
+
+    def _next_term(self, n):
+        if self.denom is not None:
+            # The coefficients of a rational function satisfy a recurrence.
+            term = self.numer[n] if n < len(self.numer) else 0
+            for i in range(1, min(n, len(self.denom) - 1) + 1):
+                term -= self.denom[i] * self[n - i]
+            return term * self.denom[0]
+        if n >= len(self.known):
+            self.known = [int(c) for c in
+                          taylor_expand(self.genf,
+                                        n=max(2 * n, self.length - 1, 10))]
+        return self.known[n]
+
+
+def tree_series(proof_tree, modulus=None, length=0):
+    """
+    Return a dictionary from labels to the series of the nodes, of which the
+    first length terms will be needed.
+    """
+    nodes = {node.label: node
+             for node in proof_tree.nodes() if not node.recursion}
+    series = {}
+
+    def get_series(node):
+        if node.recursion:
+            node = nodes[node.label]
+        if node.label in series:
+            return series[node.label]
+        if node.disjoint_union:
+            res = SumSeries([], modulus)
+            series[node.label] = res
+            res.children.extend(get_series(child) for child in node.children)
+        elif node.decomposition:
+            # Recursions to a product are only resolved when the terms are
+            # needed, as the product is built from its children.
+            res = _LazySeries()
+            series[node.label] = res
+            atoms = sum(1 for child in node.children if child.is_atom())
+            res.series = ProductSeries([get_series(child)
+                                        for child in node.children
+                                        if not child.is_atom()],
+                                       atoms, modulus)
+            res = series[node.label] = res.series
+        elif node.strategy_verified:
+            if node.is_epsilon():
+                res = FixedSeries([1], modulus)
+            elif node.is_atom():
+                res = FixedSeries([0, 1], modulus)
+            else:
+                comb_class = node.eqv_path_comb_classes[-1]
+                res = GenfSeries(comb_class.get_genf(), modulus, length)
+            series[node.label] = res
+        else:
+            raise NotImplementedError(("Counting is only implemented for "
+                                       "disjoint union, decomposition, "
+                                       "recursion and strategy verified."))
+        return res
+
+    get_series(proof_tree.root)
+    return series
+
+
+class _LazySeries(Series):
+    """A series standing in for one that is still being built."""
+
+    def __init__(self):
+        super().__init__()
+        self.series = None
+
+    def __getitem__(self, n):
+        return self.series[n]
+
+    def array(self, start, stop):
+        return self.series.array(start, stop)
+
+
+def count_terms(proof_tree, n, modulus=None):
+    """
+    Return the number of objects of each length 0, 1, ..., n - 1 in the root
+    class of the proof tree, modulo modulus if it is given.
+    """
+    series = tree_series(proof_tree, modulus, n)
+    root = series[proof_tree.root.label]
+    all_series = list(series.values())
+    for i in range(n):
+        # Computing every node in turn keeps the recursion shallow.
+        for s in all_series:
+            s[i]
+    return root.terms[:n]
+
+
+def primes(bits=PRIME_BITS):
+    """Yield the primes below 2**bits, in decreasing order."""
+    p = 2**bits
+    while p > 2:
+        p = sympy.prevprime(p)
+        yield p
+
+
+def _count_terms_modulo(args):
+    proof_tree, n, modulus = args
+    return count_terms(proof_tree, n, modulus)
+
+
+def count_terms_crt(proof_tree, n, processes=None, bits=None, prefix=64):
+    """
+    Return the number of objects of each length 0, 1, ..., n - 1 in the root
+    class of the proof tree, by counting modulo several primes below
+    2**PRIME_BITS and combining the residues with the Chinese remainder
+    theorem. The primes are counted in parallel, using the given number of
+    processes, by default one for each CPU.
+
+    The number of bits needed for the terms can be given. Otherwise, it is
+    estimated by counting the first 'prefix' terms exactly and extrapolating
+    their growth. The estimate is checked by counting modulo one more prime;
+    if that prime changes any term, the number of primes is doubled until the
+    terms no longer change.
+    """
+    if n <= 0:
+        return []
+    if bits is None:
+        exact = count_terms(proof_tree, min(n, prefix))
+        if len(exact) == n:
+            return exact
+        # The terms grow exponentially, so the number of bits grows linearly,
+        # at the rate seen over the second half of the prefix.
+        last, middle = len(exact) - 1, (len(exact) - 1) // 2
+        rate = ((exact[last].bit_length() - exact[middle].bit_length()) /
+                max(last - middle, 1))
+        bits = exact[last].bit_length() + int(rate * (n - 1 - last))
+        bits += bits // 16 + 64
+        check = True
+    else:
+        check = False
+    needed = bits // (PRIME_BITS - 1) + 1 + int(check)
+    prime_gen = primes()
+    moduli = [next(prime_gen) for _ in range(needed)]
+    pool = multiprocessing.Pool(processes)
+    try:
+        residues = pool.map(_count_terms_modulo,
+                            [(proof_tree, n, p) for p in moduli])
+        terms = _crt(residues[:-1], moduli[:-1]) if check else None
+        while check:
+            combined = _crt(residues, moduli)
+            if combined == terms:
+                break
+            terms = combined
+            more = [next(prime_gen) for _ in range(len(moduli))]
+            residues.extend(pool.map(_count_terms_modulo,
+                                     [(proof_tree, n, p) for p in more]))
+            moduli.extend(more)
+    finally:
+        pool.close()
+        pool.join()
+    return terms if check else _crt(residues, moduli)
+
+
+def _crt(residues, moduli):
+    """
+    Combine the lists of residues of the terms modulo each of the moduli into
+    the list of the least non-negative terms with those residues.
+    """
+    product = 1
+    for m in moduli:
+        product *= m
+    terms = [0] * len(residues[0])
+    for terms_modulo, m in zip(residues, moduli):
+        rest = product // m
+        factor = rest * pow(rest % m, m - 2, m)
+        for i, r in enumerate(terms_modulo):
+            if r:
+                terms[i] += r * factor
+    return [t % product for t in terms]
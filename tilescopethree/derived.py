@@ -0,0 +1,257 @@
+"""
+A cache of the data that strategies derive from the tiling they expand.
+
+When a tiling is expanded, each strategy in the pack is called with the same
+tiling, and many of them start by computing the same things from it, e.g.,
+the cell basis or the active cells. A strategy should instead ask for
+
+    derived(tiling).cell_basis
+
+which computes it the first time it is needed for the tiling, and hands the
+same value to every later strategy expanding the tiling. The values must not
+be modified. Only the most recently seen tilings are kept, so the cache lives
+for roughly one expansion.
+
+The number of hits and misses, and the time spent computing each kind of
+value, are recorded in order to estimate the time saved. These are per
+process, so the values computed by workers are not included.
+"""
+import time
+from collections import OrderedDict, defaultdict
+
+from tilescopethree.containment import containment_matrix, gridded_perms
+
+DERIVED = ('cell_basis', 'active_cells', 'positive_cells', 'possibly_empty',
+           'row_cells', 'col_cells', 'row_masks', 'components',
+           'small_gridded_perms', 'factors')
+
+# The longest gridded perms in small_gridded_perms.
+SMALL_LENGTH = 4
+
+
+class DerivedData(object):
+    """The values derived from a tiling, computed when first asked for."""
+
+    def __init__(self, tiling, stats):
+        self.tiling = tiling
+        self._values = {}
+        self._stats = stats
+
+    def _get(self, name, compute):
+        try:
+            value = self._values[name]
+        except KeyError:
+            start = time.time()
+            value = compute()
+            self._stats.missed(name, time.time() - start)
+            self._values[name] = value
+        else:
+            self._stats.hit(name)
+        return value
+
+    @property
+    def cell_basis(self):
+        """The cell basis of the tiling, as given by Tiling.cell_basis."""
+        return self._get('cell_basis', self.tiling.cell_basis)
+
+    @property
+    def active_cells(self):
+        """The set of active cells of the tiling."""
+        return self._get('active_cells', lambda: self.tiling.active_cells)
+
+    @property
+    def positive_cells(self):
+        """The set of positive cells of the tiling."""
+        return self._get('positive_cells',
+                         lambda: self.tiling.positive_cells)
+
+    @property
+    def possibly_empty(self):
+        """The set of active cells of the tiling that are not positive."""
+        return self._get('possibly_empty',
+                         lambda: self.active_cells - self.positive_cells)
+
+    @property
+    def row_cells(self):
+        """A dictionary from each row to the set of active cells in it."""
+        return self._get('row_cells',
+                         lambda: self._lines(1, self.tiling.dimensions[1]))
+
+    @property
+    def col_cells(self):
+        """A dictionary from each column to the set of active cells in it."""
+        return self._get('col_cells',
+                         lambda: self._lines(0, self.tiling.dimensions[0]))
+
+    def _lines(self, coordinate, number):
+        lines = defaultdict(set)
+        for cell in self.active_cells:
+            lines[cell[coordinate]].add(cell)
+        return {i: frozenset(lines[i]) for i in range(number)}
+
+    @property
+    def components(self):
+        """
+        The list of sets of active cells in each component of the tiling.
+        Two cells are in the same component if they are in the same row or
+        column.
+        """
+        return self._get('components', self._components)
+
+    def _components(self):
+        # A component is a set of rows and a set of columns, as bitmasks.
+        # Each row is added to the components using one of its columns.
+        components = []
+        for row, col_mask in self.row_masks.items():
+            row_mask = 1 << row
+            rest = []
+            for rows, cols in components:
+                if cols & col_mask:
+                    row_mask |= rows
+                    col_mask |= cols
+                else:
+                    rest.append((rows, cols))
+            components = rest + [(row_mask, col_mask)]
+        component_of_row = {}
+        for i, (rows, _) in enumerate(components):
+            row = 0
+            while rows:
+                if rows & 1:
+                    component_of_row[row] = i
+                rows >>= 1
+                row += 1
+        all_components = [set() for _ in components]
+        for cell in self.active_cells:
+            all_components[component_of_row[cell[1]]].add(cell)
+        return all_components
+
+    @property
+    def row_masks(self):
+        """
+        A dictionary from each row with an active cell to the bitmask of
+        the columns of the active cells in it.
+        """
+        return self._get('row_masks', self._row_masks)
+
+    def _row_masks(self):
+        masks = defaultdict(int)
+        for col, row in self.active_cells:
+            masks[row] |= 1 << col
+        return dict(masks)
+
+    @property
+    def small_gridded_perms(self):
+        """
+        The gridded perms on the tiling of length at most one more than the
+        longest minimal gridded perm, if that is at most SMALL_LENGTH, and
+        otherwise an empty list.
+        """
+        return self._get('small_gridded_perms', self._small_gridded_perms)
+
+    def _small_gridded_perms(self):
+        maxlen = self.tiling.maximum_length_of_minimum_gridded_perm() + 1
+        if maxlen > SMALL_LENGTH:
+            return []
+        perms = [gp for perms in gridded_perms(self.tiling.obstructions,
+                                               maxlen, self.active_cells)
+                 for gp in perms]
+        for reqs in self.tiling.requirements:
+            contains = containment_matrix(reqs, perms)
+            perms = [gp for gp, found in zip(perms, map(any, zip(*contains)))
+                     if found]
+        return perms
+
+    @property
+    def factors(self):
+        """
+        A dictionary from each obstruction and requirement of the tiling to
+        its factors.
+        """
+        return self._get('factors', self._factors)
+
+    def _factors(self):
+        return {gp: gp.factors()
+                for gp in self.tiling.obstructions + tuple(
+                    req for reqs in self.tiling.requirements for req in reqs)}
+
+
+class CacheStats(object):
+    """The hits, misses and time spent computing each derived value."""
+
+    def __init__(self):
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+        self.times = defaultdict(float)
+
+    def hit(self, name):
+        self.hits[name] += 1
+
+    def missed(self, name, time_taken):
+        self.misses[name] += 1
+        self.times[name] += time_taken
+
+    def time_saved(self, name):
+        """
+        Return an estimate of the time saved for the value, assuming each hit
+        would have taken the average time of a miss.
+        """
+        if not self.misses[name]:
+            return 0
+        return self.hits[name] * self.times[name] / self.misses[name]
+
+    def status(self):
+        """Return a string of the hit rates and time saved."""
+        status = "Derived tiling data cache:\n"
+        for name in DERIVED:
+            total = self.hits[name] + self.misses[name]
+            if not total:
+                continue
+            status += ("    {}: {} hits of {} ({:.0f}%), ~{:.2f} seconds "
+                       "saved\n".format(name, self.hits[name], total,
+                                        100 * self.hits[name] / total,
+                                        self.time_saved(name)))
+        return status
+
+
+class DerivedCache(object):
+    """
+    A cache of the derived data of the last few tilings seen.
+
+    Tilings are compared by identity, as every strategy expanding a tiling
+    is given the same object.
+    """
+
+    def __init__(self, size=8):
+        self.size = size
+        self.stats = CacheStats()
+        self._data = OrderedDict()
+
+    def get(self, tiling):
+        """Return the derived data of the tiling."""
+        key = id(tiling)
+        data = self._data.get(key)
+        if data is None:
+            data = DerivedData(tiling, self.stats)
+            self._data[key] = data
+            if len(self._data) > self.size:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+        return data
+
+    def clear(self):
+        """Forget all tilings, but not the statistics."""
+        self._data.clear()
+
+
+_cache = DerivedCache()
+
+
+def derived(tiling):
+    """Return the derived data of the tiling, shared by all strategies."""
+    return _cache.get(tiling)
+
+
+def cache_status():
+    """Return a string of the hit rates and time saved by the cache."""
+    return _cache.stats.status()
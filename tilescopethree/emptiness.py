@@ -0,0 +1,101 @@
+"""
+A cheap check of the children of insertion rules for emptiness.
+
+The insertion strategies mark both children of their rules as possibly
+empty, so the searcher checks each of them with Tiling.is_empty. Before an
+insertion rule is yielded, prefilter looks at it with what is cheap to know
+about the parent:
+- the child avoiding the new obstructions is empty if one of them is implied
+  by a requirement list of the parent, i.e., contained in every requirement
+  of the list, and the child containing the new requirement list is empty if
+  every requirement in it contains an obstruction of the parent. A rule with
+  an empty child is dropped, as its other child has the same gridded perms
+  as the parent.
+- a child is not empty if one of the gridded perms of the parent up to a
+  small length, computed once for the parent, is on the child, in which case
+  the searcher does not check it.
+
+The counts are per process, so the rules checked by workers are not
+included.
+"""
+from functools import wraps
+
+from tilescopethree.containment import containment_matrix
+from tilescopethree.derived import derived
+
+
+class PrefilterStats(object):
+    """The number of rules and children decided by the prefilter."""
+
+    def __init__(self):
+        self.rules = 0
+        self.dropped = 0
+        self.nonempty = 0
+
+    def status(self):
+        return ("Emptiness prefilter: {} rules of {} dropped, {} children "
+                "shown to be non-empty\n".format(self.dropped, self.rules,
+                                                 self.nonempty))
+
+
+stats = PrefilterStats()
+
+
+def implied(tiling, gp):
+    """Return True if every gridded perm on the tiling contains gp."""
+    cell = gp.is_single_cell()
+    if cell is not None and any(gp.patt in patt for patt in
+                                derived(tiling).cell_basis[cell][1]):
+        return True
+    return any(all(gp in req for req in reqs) for reqs in tiling.requirements)
+
+
+def prefilter(rule):
+    """
+    Return False if a child of the insertion rule is empty. Otherwise mark
+    the children shown to be non-empty as not possibly empty, and return
+    True.
+    """
+    stats.rules += 1
+    tiling = rule.tiling
+    if any(implied(tiling, ob) for ob in rule.obstructions):
+        stats.dropped += 1
+        return False
+    if all(any(ob in req for ob in tiling.obstructions)
+           for req in rule.requirement):
+        stats.dropped += 1
+        return False
+    if not any(rule.possibly_empty):
+        return True
+    perms = derived(tiling).small_gridded_perms
+    if not perms:
+        return True
+    inserted = list(rule.obstructions) + list(rule.requirement)
+    contains = containment_matrix(inserted, perms)
+    obstructed = [any(found) for found in
+                  zip(*contains[:len(rule.obstructions)])]
+    required = [any(found) for found in
+                zip(*contains[len(rule.obstructions):])]
+    witnessed = [not all(obstructed), any(required)]
+    for i, found in enumerate(witnessed):
+        if found and rule.possibly_empty[i]:
+            rule.possibly_empty[i] = False
+            stats.nonempty += 1
+    return True
+
+
+def prefiltered(strategy):
+    """
+    Return the insertion strategy with the rules with an empty child
+    dropped by prefilter.
+    """
+    @wraps(strategy)
+    def prefiltered_strategy(tiling, *args, **kwargs):
+        for rule in strategy(tiling, *args, **kwargs):
+            if prefilter(rule):
+                yield rule
+    return prefiltered_strategy
+
+
+def prefilter_status():
+    return stats.status()
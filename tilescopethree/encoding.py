@@ -0,0 +1,148 @@
+"""
+A compact, canonical byte encoding of tilings.
+
+The encoding starts with the dimensions of the tiling, followed by the
+obstructions and then the requirement lists. Every cell is stored as a single
+index into the grid and every gridded permutation is stored as
+- a byte whose top bit says if the gridded permutation is in a single cell
+  and whose other bits give its length,
+- the cell if it is in a single cell, otherwise the cell of each point,
+- the values of the pattern, two to a byte if the pattern has length at most
+  sixteen.
+As the obstructions and requirements of a tiling are sorted and minimised,
+two tilings are equal if and only if their encodings are equal.
+"""
+from array import array
+
+from comb_spec_searcher.class_db import ClassDB
+from permuta import Perm
+from tilings import Obstruction, Requirement, Tiling
+
+SINGLE_CELL = 0x80
+
+
+def _cell_width(dimensions):
+    """Return the number of bytes needed to store a cell index."""
+    return 1 if dimensions[0] * dimensions[1] <= 256 else 2
+
+
+def _write_int(result, n, width):
+    for i in range(width):
+        result.append((n >> (8 * i)) & 0xFF)
+
+
+def _read_int(arr, offset, width):
+    n = 0
+    for i in range(width):
+        n |= arr[offset + i] << (8 * i)
+    return n, offset + width
+
+
+def _write_gp(result, gp, rows, width):
+    n = len(gp)
+    if n >= SINGLE_CELL:
+        raise ValueError("Can only encode gridded perms of length below 128.")
+    single_cell = n > 0 and gp.is_single_cell()
+    result.append(n | SINGLE_CELL if single_cell else n)
+    cells = gp.pos[:1] if single_cell else gp.pos
+    for x, y in cells:
+        _write_int(result, x * rows + y, width)
+    values = tuple(gp.patt)
+    if n <= 16:
+        for i in range(0, n, 2):
+            high = values[i + 1] if i + 1 < n else 0
+            result.append(values[i] | (high << 4))
+    else:
+        result.extend(values)
+
+
+def _read_gp(gp_class, arr, offset, rows, width):
+    n = arr[offset] & ~SINGLE_CELL
+    single_cell = arr[offset] & SINGLE_CELL
+    offset += 1
+    pos = []
+    for _ in range(1 if single_cell else n):
+        index, offset = _read_int(arr, offset, width)
+        pos.append((index // rows, index % rows))
+    if single_cell:
+        pos = pos * n
+    if n <= 16:
+        values = []
+        for i in range(0, n, 2):
+            values.append(arr[offset] & 0x0F)
+            if i + 1 < n:
+                values.append(arr[offset] >> 4)
+            offset += 1
+    else:
+        values = arr[offset:offset + n]
+        offset += n
+    return gp_class(Perm(values), pos), offset
+
+
+def encode_tiling(tiling):
+    """Return the compact encoding of the tiling as bytes."""
+    cols, rows = tiling.dimensions
+    width = _cell_width(tiling.dimensions)
+    result = array('B')
+    _write_int(result, cols, 2)
+    _write_int(result, rows, 2)
+    _write_int(result, len(tiling.obstructions), 4)
+    for ob in tiling.obstructions:
+        _write_gp(result, ob, rows, width)
+    _write_int(result, len(tiling.requirements), 2)
+    for reqlist in tiling.requirements:
+        _write_int(result, len(reqlist), 2)
+        for req in reqlist:
+            _write_gp(result, req, rows, width)
+    return result.tobytes()
+
+
+def decode_tiling(encoded):
+    """Return the tiling with the given compact encoding."""
+    arr = array('B', encoded)
+    cols, offset = _read_int(arr, 0, 2)
+    rows, offset = _read_int(arr, offset, 2)
+    width = _cell_width((cols, rows))
+    nobs, offset = _read_int(arr, offset, 4)
+    obstructions = []
+    for _ in range(nobs):
+        ob, offset = _read_gp(Obstruction, arr, offset, rows, width)
+        obstructions.append(ob)
+    nreqs, offset = _read_int(arr, offset, 2)
+    requirements = []
+    for _ in range(nreqs):
+        reqlistlen, offset = _read_int(arr, offset, 2)
+        reqlist = []
+        for _ in range(reqlistlen):
+            req, offset = _read_gp(Requirement, arr, offset, rows, width)
+            reqlist.append(req)
+        requirements.append(reqlist)
+    return Tiling(obstructions=obstructions, requirements=requirements,
+                  remove_empty=False, derive_empty=False, minimize=False,
+                  sorted_input=True)
+
+
+class CompactClassDB(ClassDB):
+    """
+    A class database storing tilings in their compact encoding.
+
+    The encoding is the key of the database and the only form in which
+    tilings are stored. Tilings are only rebuilt when asked for.
+    """
+
+    def _compress(self, key):
+        return encode_tiling(key)
+
+    def _decompress(self, key):
+        return decode_tiling(key)
+
+
+def compact(classdb):
+    """Return a compact class database with the same information."""
+    compact_classdb = CompactClassDB(classdb.combinatorial_class)
+    for label in sorted(classdb.label_to_info):
+        info = classdb.label_to_info[label]
+        info.comb_class = encode_tiling(classdb.get_class(label))
+        compact_classdb.label_to_info[label] = info
+        compact_classdb.class_to_info[info.comb_class] = info
+    return compact_classdb
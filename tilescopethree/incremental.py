@@ -0,0 +1,128 @@
+"""
+Building the children of a tiling with obstructions or a requirement added.
+
+The Tiling constructor sorts and minimises all of the obstructions and
+requirements of a child, even though those of the parent are already
+minimal and only the new gridded perms can change anything. The functions
+here compare the new gridded perms with those of the parent, and if the
+only changes are new obstructions replacing the old ones containing them, or
+a new requirement list that neither implies nor is implied by the others,
+build the child from the parent's sorted and minimised gridded perms without
+minimising again. Otherwise, they use the Tiling constructor.
+
+The factors of the gridded perms of the parent are taken from its derived
+data, so they are computed once for all of its children.
+"""
+from tilescopethree.containment import containment_matrix
+from tilescopethree.derived import derived
+from tilings import Tiling
+
+
+class IncrementalStats(object):
+    """The number of children built incrementally and in full."""
+
+    def __init__(self):
+        self.incremental = 0
+        self.full = 0
+
+    def status(self):
+        return ("Children built incrementally: {} of {}\n"
+                "".format(self.incremental, self.incremental + self.full))
+
+
+stats = IncrementalStats()
+
+
+def _full(tiling, obstructions=(), requirements=()):
+    stats.full += 1
+    return Tiling(tiling.obstructions + tuple(obstructions),
+                  tiling.requirements + tuple(requirements))
+
+
+def _built(obstructions, requirements):
+    stats.incremental += 1
+    return Tiling(obstructions, requirements, minimize=False,
+                  sorted_input=True)
+
+
+def _is_empty(tiling):
+    return any(ob.is_empty() for ob in tiling.obstructions)
+
+
+def add_obstructions(tiling, obstructions):
+    """Return the tiling with the obstructions added."""
+    old = tiling.obstructions
+    new = sorted(set(obstructions) - set(old))
+    if _is_empty(tiling) or any(ob.is_empty() for ob in new):
+        return _full(tiling, obstructions)
+    # A new obstruction with a factor implied by a requirement list would
+    # have the factor removed.
+    for ob in new:
+        for reqs in tiling.requirements:
+            if any(all(f in req for req in reqs) for f in ob.factors()):
+                return _full(tiling, obstructions)
+    # A new obstruction containing an older one is not added, and an old
+    # one containing a new one is removed. The constructor keeps a gridded
+    # perm unless one before it in the sorted order is contained in it, so
+    # if the smaller one comes later, it is left to the constructor.
+    kept = []
+    for ob in new:
+        if any(other in ob for other in kept):
+            continue
+        kept.append(ob)
+    contained = containment_matrix(old, kept)
+    new = []
+    for ob, row in zip(kept, zip(*contained)):
+        smaller = [other for other, found in zip(old, row) if found]
+        if not smaller:
+            new.append(ob)
+        elif not all(other < ob for other in smaller):
+            return _full(tiling, obstructions)
+    if not new:
+        return _built(old, tiling.requirements)
+    contained = containment_matrix(new, old)
+    removed = set()
+    for ob, row in zip(new, contained):
+        for other, found in zip(old, row):
+            if found:
+                if other < ob:
+                    return _full(tiling, obstructions)
+                removed.add(other)
+    # The requirements containing a new obstruction would be removed.
+    for reqs in tiling.requirements:
+        if any(any(row) for row in containment_matrix(new, reqs)):
+            return _full(tiling, obstructions)
+    return _built(tuple(sorted([ob for ob in old if ob not in removed] +
+                               new)),
+                  tiling.requirements)
+
+
+def add_requirement(tiling, requirement):
+    """Return the tiling with the requirement list added."""
+    requirement = tuple(requirement)
+    if len(requirement) != 1 or _is_empty(tiling):
+        return _full(tiling, requirements=(requirement,))
+    req = requirement[0]
+    if req.is_empty() or len(req.factors()) != 1:
+        return _full(tiling, requirements=(requirement,))
+    factors = derived(tiling).factors
+    # No factor of an obstruction may be contained in the requirement, or
+    # the obstruction would lose it, and if every factor is, the requirement
+    # contains the obstruction.
+    if any(any(f in req for f in factors[ob]) for ob in tiling.obstructions):
+        return _full(tiling, requirements=(requirement,))
+    for reqs in tiling.requirements:
+        # The new list would be implied by an old one.
+        if all(req in r for r in reqs):
+            return _full(tiling, requirements=(requirement,))
+        # An old list, or a factor of one of its requirements, would be
+        # implied by the new one.
+        if any(f in req for r in reqs for f in factors[r]):
+            return _full(tiling, requirements=(requirement,))
+    return _built(tiling.obstructions,
+                  Tiling.sort_requirements(tiling.requirements +
+                                           (requirement,)))
+
+
+def incremental_status():
+    return stats.status()
@@ -0,0 +1,176 @@
+"""
+Inferring a tiling with its inferral strategies until nothing changes.
+
+The searcher applies the inferral strategies one after the other, and every
+time one of them changes the tiling, it starts again with all the others on
+the new tiling, stopping when none of them changes it. Most of those calls
+look at a part of the tiling the last change did not touch, e.g., the row
+and column separation and the obstruction transitivity only look at the
+cells, the positive cells and the length 2 obstructions in each row and
+column, and whether a cell is empty only changes when the cells of the
+tiling do.
+
+An InferralEngine applies the strategies in the same order, but remembers
+for each strategy the view of the tiling it depends on when it last ran, and
+does not run it again until that view changes. The chain of inferral rules
+found for a tiling, and for every tiling along it, is stored in an
+InferralMemo, which is looked in before any strategy is run, so that a
+tiling is only inferred once (see tilescopethree.inferral_memo).
+"""
+from comb_spec_searcher import InferralRule
+from comb_spec_searcher.utils import get_func_name
+from tilescopethree.derived import derived
+from tilescopethree.inferral_memo import InferralMemo, strategies_key
+
+
+def rows_and_columns(tiling):
+    """
+    The dimensions, the active and positive cells, and the length 2
+    obstructions in a single row or column of the tiling.
+    """
+    data = derived(tiling)
+    return (tiling.dimensions, frozenset(data.active_cells),
+            frozenset(data.positive_cells),
+            frozenset(ob for ob in tiling.obstructions
+                      if len(ob) == 2 and (ob.is_single_row() or
+                                           ob.pos[0][0] == ob.pos[1][0])))
+
+
+def cells(tiling):
+    """
+    The dimensions and the active and positive cells of the tiling. Tilings
+    with the same cells have the same gridded perms, so the same empty
+    cells.
+    """
+    data = derived(tiling)
+    return (tiling.dimensions, frozenset(data.active_cells),
+            frozenset(data.positive_cells))
+
+
+def whole(tiling):
+    """The obstructions and requirements of the tiling."""
+    return tiling
+
+
+# The view of the tiling that each inferral strategy depends on. Strategies
+# not in here depend on the whole tiling.
+DEPENDENCIES = {
+    'row_and_column_separation': rows_and_columns,
+    'obstruction_transitivity': rows_and_columns,
+    'empty_cell_inferral': cells,
+    'subobstruction_inferral': whole,
+}
+
+
+class InferredStrategy(object):
+    """
+    A stand in for an inferral strategy whose rule was already found by an
+    InferralEngine. It has the same name as the strategy it replaces.
+    """
+
+    def __init__(self, strategy, rule):
+        self.strategy = strategy
+        self.rule = rule
+        self.__name__ = get_func_name(strategy)
+
+    def __call__(self, tiling, **kwargs):
+        return self.rule
+
+
+def _call(strategy, tiling):
+    return strategy(tiling)
+
+
+class InferralEngine(object):
+    """
+    Infers tilings with the inferral strategies, rerunning a strategy only
+    when the view of the tiling it depends on has changed since it last ran,
+    and storing the inferral rules found in the memo, by default a new one
+    for each engine.
+    """
+
+    def __init__(self, strategies, dependencies=None, memo=None):
+        self.strategies = list(strategies)
+        if dependencies is None:
+            dependencies = DEPENDENCIES
+        self.views = [dependencies.get(get_func_name(strategy), whole)
+                      for strategy in self.strategies]
+        self.memo = memo if memo is not None else InferralMemo()
+        self._digest = strategies_key(self.strategies)
+        self.inferred = 0
+        self.hits = 0
+        self.calls = 0
+        self.skipped = 0
+
+    def _remember(self, path, steps):
+        for i, tiling in enumerate(path):
+            self.memo.put(self.memo.key(self._digest, tiling), steps[i:])
+
+    def _views(self, tiling):
+        views = {}
+        for view in self.views:
+            if view not in views:
+                views[view] = view(tiling)
+        return [views[view] for view in self.views]
+
+    def infer(self, tiling, record=None, call=None):
+        """
+        Return the tiling inferred with the strategies.
+
+        Every inferral rule applied is passed to record(strategy, rule),
+        which should return False to stop inferring the child of the rule.
+        The strategies are called with call(strategy, tiling), by default
+        strategy(tiling).
+        """
+        if call is None:
+            call = _call
+        self.inferred += 1
+        steps = self.memo.get(self.memo.key(self._digest, tiling))
+        if steps is not None:
+            self.hits += 1
+            for i, formal_step, child in steps:
+                rule = InferralRule(formal_step, child)
+                tiling = child
+                if record is not None and not record(self.strategies[i],
+                                                     rule):
+                    break
+            return tiling
+        n = len(self.strategies)
+        # The view each strategy depended on when it last ran.
+        last = [None] * n
+        current = self._views(tiling)
+
+        def up_to_date(j):
+            return last[j] is not None and last[j] == current[j]
+
+        path, steps = [tiling], []
+        i = 0
+        while not all(up_to_date(j) for j in range(n)):
+            if up_to_date(i):
+                self.skipped += 1
+                i = (i + 1) % n
+                continue
+            strategy = self.strategies[i]
+            self.calls += 1
+            rule = call(strategy, tiling)
+            last[i] = current[i]
+            if rule is not None and rule.comb_classes[0] != tiling:
+                tiling = rule.comb_classes[0]
+                steps.append((i, rule.formal_step, tiling))
+                if record is not None and not record(strategy, rule):
+                    return tiling
+                path.append(tiling)
+                current = self._views(tiling)
+                # Like the searcher, the strategy is not applied to its own
+                # child until the view of it changes again.
+                last[i] = current[i]
+            i = (i + 1) % n
+        self._remember(path, steps)
+        return tiling
+
+    def status(self):
+        n = max(1, len(self.strategies))
+        return ("Fixpoint inferral: {} tilings inferred, {} from the memo, "
+                "{} strategy calls, {} skipped ({:.1f} rounds saved)\n"
+                "".format(self.inferred, self.hits, self.calls, self.skipped,
+                          self.skipped / n))
@@ -0,0 +1,166 @@
+"""
+A memo of the inferral rules found for tilings.
+
+In a large search the same tiling is the child of many rules, and the same
+tilings come up in search after search, so the inferral strategies keep
+finding the same chains of inferral rules. An InferralEngine looks in an
+InferralMemo before it runs any inferral strategy, and stores the chain of
+rules it finds for every tiling along it.
+
+The chains are stored by the compact encoding of the tiling and the names
+and keyword arguments of the inferral strategies, which only depend on the
+tiling they are given, so the same memo can be passed to searches with
+different strategy packs. When there are more than maxsize chains, the
+least recently used ('lru') or the oldest ('fifo') are evicted.
+
+If a path is given, the memo is stored in an SQLite database, which is read
+when the memo is opened, and written to by flush, so that the chains found
+in one run are used by the next.
+"""
+import hashlib
+import sqlite3
+import time
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from functools import partial
+from json import dumps, loads
+
+from comb_spec_searcher.utils import get_module_and_func_names
+from tilescopethree.encoding import decode_tiling, encode_tiling
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS inferred (
+    key BLOB PRIMARY KEY,
+    steps TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inferred_used ON inferred (used);
+"""
+
+EVICTIONS = ('lru', 'fifo')
+
+
+def strategies_key(strategies):
+    """Return a digest of the modules, names and keyword arguments of the
+    strategies."""
+    names = []
+    for strategy in strategies:
+        keywords = (sorted(strategy.keywords.items())
+                    if isinstance(strategy, partial) else [])
+        names.append((get_module_and_func_names(strategy), keywords))
+    return hashlib.sha1(repr(names).encode()).digest()
+
+
+class InferralMemo(object):
+    """The chains of inferral rules found for the most recent tilings."""
+
+    def __init__(self, maxsize=100000, eviction='lru', path=None):
+        if eviction not in EVICTIONS:
+            raise ValueError("eviction must be one of {}".format(EVICTIONS))
+        self.maxsize = maxsize
+        self.eviction = eviction
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        # The keys added or used since the database was last written.
+        self._used = {}
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, timeout=60,
+                                         isolation_level=None)
+            self._conn.executescript(SCHEMA)
+            self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT key, steps FROM inferred ORDER BY used DESC LIMIT ?",
+            (self.maxsize,)).fetchall()
+        for key, steps in reversed(rows):
+            self._entries[bytes(key)] = tuple(
+                (i, formal_step, b64decode(child.encode()))
+                for i, formal_step, child in loads(steps))
+
+    @staticmethod
+    def key(digest, tiling):
+        """Return the key of the tiling inferred with the strategies whose
+        strategies_key is digest."""
+        return digest + encode_tiling(tiling)
+
+    def get(self, key):
+        """
+        Return the chain of inferral rules stored under the key, as a tuple
+        of (index of the strategy, formal step, child), or None.
+        """
+        steps = self._entries.get(key)
+        if steps is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == 'lru':
+            self._entries.move_to_end(key)
+            if self._conn is not None:
+                self._used[key] = time.time()
+        return tuple((i, formal_step, decode_tiling(child))
+                     for i, formal_step, child in steps)
+
+    def put(self, key, steps):
+        """Store the chain of inferral rules under the key."""
+        self._entries[key] = tuple((i, formal_step, encode_tiling(child))
+                                   for i, formal_step, child in steps)
+        self._entries.move_to_end(key)
+        if self._conn is not None:
+            self._used[key] = time.time()
+        while len(self._entries) > self.maxsize:
+            old, _ = self._entries.popitem(last=False)
+            self._used.pop(old, None)
+            self.evictions += 1
+
+    def flush(self):
+        """
+        Write the chains added or used to the database, and remove the least
+        recently used ones if there are too many.
+        """
+        if self._conn is None or not self._used:
+            return
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO inferred VALUES (?, ?, ?)",
+                ((key, dumps([(i, formal_step, b64encode(child).decode())
+                              for i, formal_step, child in
+                              self._entries[key]]), used)
+                 for key, used in self._used.items()))
+            size = conn.execute("SELECT COUNT(*) FROM inferred").fetchone()[0]
+            if size > self.maxsize:
+                conn.execute(
+                    "DELETE FROM inferred WHERE key IN (SELECT key FROM "
+                    "inferred ORDER BY used LIMIT ?)", (size - self.maxsize,))
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._used = {}
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def clear(self):
+        """Remove all entries from memory."""
+        self._entries.clear()
+        self._used = {}
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0
+
+    def status(self):
+        return ("Inferral memo: {} hits of {} ({:.0f}%), {} entries, {} "
+                "evicted\n".format(self.hits, self.hits + self.misses,
+                                   100 * self.hit_rate(),
+                                   len(self._entries), self.evictions))
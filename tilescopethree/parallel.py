@@ -0,0 +1,110 @@
+"""
+Helpers for expanding tilings in a pool of worker processes.
+
+The parent process keeps sole ownership of the class, equivalence and rule
+databases. Workers are only ever given an encoded tiling together with the
+key of a strategy in the pack, and send back a list of compact rule records.
+These are turned back into rules by the parent, which adds them to the
+databases in exactly the order the serial searcher would have.
+"""
+from comb_spec_searcher import Rule
+from comb_spec_searcher.utils import get_func_name
+from tilescopethree.encoding import decode_tiling, encode_tiling
+
+# The strategies and keyword arguments used by a worker process. These are set
+# once by the pool initializer so that they are not sent with every task.
+_strategies = None
+_kwargs = None
+# The last tiling decoded by a worker. Consecutive tasks are usually for the
+# same tiling, and reusing the object lets the strategies share its derived
+# data.
+_last_tiling = (None, None)
+
+
+def strategy_keys(strategy_pack):
+    """
+    Return a dictionary from keys to the strategies in the pack that can be
+    applied by a worker, i.e., the initial and expansion strategies.
+
+    The initial strategies have keys ('initial', i) and the strategies in the
+    j-th set of expansion strategies have keys ('expansion', j, i).
+    """
+    keys = {}
+    for i, strategy in enumerate(strategy_pack.initial_strats):
+        keys[('initial', i)] = strategy
+    for j, strategies in enumerate(strategy_pack.expansion_strats):
+        for i, strategy in enumerate(strategies):
+            keys[('expansion', j, i)] = strategy
+    return keys
+
+
+def init_worker(strategies, kwargs):
+    """Initialise a worker process with the strategies it can apply."""
+    global _strategies, _kwargs
+    _strategies = strategies
+    _kwargs = kwargs
+
+
+def expand_tiling(key, encoded):
+    """
+    Apply the strategy with the given key to the encoded tiling and return a
+    list of rule records.
+    """
+    global _last_tiling
+    if _last_tiling[0] != encoded:
+        _last_tiling = (encoded, decode_tiling(encoded))
+    tiling = _last_tiling[1]
+    strategy = _strategies[key]
+    return [rule_to_record(rule) for rule in strategy(tiling, **_kwargs)]
+
+
+def rule_to_record(rule):
+    """
+    Return a compact, picklable record of a rule. The fingerprint of an
+    insertion rule is kept, so the parent can drop duplicate rules.
+    """
+    if not isinstance(rule, Rule):
+        raise TypeError("Attempting to add non Rule type.")
+    return (rule.formal_step,
+            tuple(encode_tiling(comb_class)
+                  for comb_class in rule.comb_classes),
+            tuple(rule.inferable),
+            tuple(rule.possibly_empty),
+            tuple(rule.workable),
+            rule.ignore_parent,
+            rule.constructor,
+            getattr(rule, 'fingerprint', None))
+
+
+def record_to_rule(record):
+    """Return the rule described by a record from `rule_to_record`."""
+    (formal_step, comb_classes, inferable, possibly_empty, workable,
+     ignore_parent, constructor, fingerprint) = record
+    rule = Rule(formal_step=formal_step,
+                comb_classes=[decode_tiling(c) for c in comb_classes],
+                inferable=inferable,
+                possibly_empty=possibly_empty,
+                workable=workable,
+                ignore_parent=ignore_parent,
+                constructor=constructor)
+    if fingerprint is not None:
+        rule.fingerprint = fingerprint
+    return rule
+
+
+class PrefetchedStrategy(object):
+    """
+    A stand in for a strategy whose rules were already computed by a worker.
+
+    It has the same name as the strategy it replaces so that the time spent is
+    recorded against the original strategy.
+    """
+
+    def __init__(self, strategy, records):
+        self.strategy = strategy
+        self.records = records
+        self.__name__ = get_func_name(strategy)
+
+    def __call__(self, tiling, **kwargs):
+        for record in self.records:
+            yield record_to_rule(record)
@@ -0,0 +1,136 @@
+"""
+Profiling of the strategies used by a search.
+
+A Profiler keeps a StrategyProfile for every strategy it has wrapped. The
+profile counts the calls to the strategy, the time spent in it, the rules it
+returned and the classes on the right hand side of those rules, only counting
+the children of an insertion rule that have been built. When a proof
+tree is found, the steps of the tree are counted against the strategies that
+made them, so strategies that never contribute to proof trees can be taken
+out of a pack.
+
+The time is only the time spent inside the strategy, not the time the
+searcher spends adding its rules to the databases. Rules computed by a worker
+process are counted, but the time is that of the parent process.
+"""
+import json
+import time
+from collections import OrderedDict
+
+from comb_spec_searcher.utils import get_func_name
+
+
+class StrategyProfile(object):
+    """The counts for a single strategy."""
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.time = 0
+        self.rules = 0
+        self.children = 0
+        self.used = 0
+
+    def to_jsonable(self):
+        return OrderedDict([('calls', self.calls),
+                            ('time', self.time),
+                            ('rules', self.rules),
+                            ('children', self.children),
+                            ('used', self.used)])
+
+
+class ProfiledStrategy(object):
+    """
+    A strategy that updates a profile when it is called. It has the same
+    name as the strategy it wraps.
+    """
+
+    def __init__(self, strategy, profile, steps):
+        self.strategy = strategy
+        self.profile = profile
+        self.steps = steps
+        self.__name__ = get_func_name(strategy)
+
+    def __call__(self, tiling, **kwargs):
+        profile = self.profile
+        profile.calls += 1
+        start = time.time()
+        result = self.strategy(tiling, **kwargs)
+        profile.time += time.time() - start
+        if result is None:
+            return None
+        if hasattr(result, 'formal_step'):
+            # Inferral and verification strategies return a single rule.
+            self._count(result)
+            return result
+        return self._generate(result)
+
+    def _generate(self, rules):
+        profile = self.profile
+        rules = iter(rules)
+        while True:
+            start = time.time()
+            try:
+                rule = next(rules)
+            except StopIteration:
+                profile.time += time.time() - start
+                return
+            profile.time += time.time() - start
+            self._count(rule)
+            yield rule
+
+    def _count(self, rule):
+        self.profile.rules += 1
+        # Asking for the children of an insertion rule would build them.
+        if getattr(rule, 'built', True):
+            self.profile.children += len(getattr(rule, 'comb_classes', ()))
+        self.steps[rule.formal_step] = self.profile.name
+
+
+class Profiler(object):
+    """The profiles of the strategies used by a search."""
+
+    def __init__(self):
+        self.profiles = OrderedDict()
+        # The name of the strategy that made each formal step.
+        self.steps = {}
+
+    def wrap(self, strategy):
+        """Return the strategy wrapped to update its profile."""
+        name = get_func_name(strategy)
+        if name not in self.profiles:
+            self.profiles[name] = StrategyProfile(name)
+        return ProfiledStrategy(strategy, self.profiles[name], self.steps)
+
+    def record_tree(self, proof_tree):
+        """Count the steps of the proof tree against their strategies."""
+        for node in proof_tree.nodes():
+            if node.recursion:
+                continue
+            for step in list(node.eqv_explanations) + [node.formal_step]:
+                name = self.steps.get(step)
+                if name is not None:
+                    self.profiles[name].used += 1
+
+    def to_jsonable(self):
+        return OrderedDict((name, profile.to_jsonable())
+                           for name, profile in self.profiles.items())
+
+    def dump(self, filename):
+        """Write the profiles to the file as JSON."""
+        with open(filename, 'w') as f:
+            json.dump(self.to_jsonable(), f, indent=2)
+
+    def status(self):
+        """Return a table of the profiles, slowest strategy first."""
+        status = "Strategy profiles:\n"
+        row = "    {:<40} {:>8} {:>10} {:>8} {:>9} {:>6}\n"
+        status += row.format("strategy", "calls", "time", "rules",
+                             "children", "used")
+        for profile in sorted(self.profiles.values(),
+                              key=lambda p: p.time, reverse=True):
+            status += row.format(profile.name, profile.calls,
+                                 "{:.2f}".format(profile.time),
+                                 profile.rules, profile.children,
+                                 profile.used)
+        return status
@@ -3,11 +3,17 @@ point"""
 
 from itertools import chain
 
-from comb_spec_searcher import Rule
-from permuta import Av, Perm
+from permuta import Perm
+from tilescopethree.avoiders import avoiders_cache
+from tilescopethree.containment import gridded_perms
+from tilescopethree.derived import derived
+from tilescopethree.emptiness import prefiltered
 from tilings import Obstruction, Requirement, Tiling
 
+from .insertion_rule import InsertionRule
 
+
+@prefiltered
 def all_cell_insertions(tiling, **kwargs):
     """
     The cell insertion strategy.
@@ -36,28 +42,25 @@ def all_cell_insertions(tiling, **kwargs):
     if not maxreqnum:
         maxreqnum = 1
 
-    active = tiling.active_cells
-    bdict = tiling.cell_basis()
+    active = derived(tiling).active_cells
+    bdict = derived(tiling).cell_basis
     for cell in active:
         if len(bdict[cell][1]) >= maxreqnum:
             continue
         for length in range(1, maxreqlen + 1):
-            for patt in Av(bdict[cell][0] + extra_basis).of_length(length):
-                if not any(patt in perm for perm in bdict[cell][1]):
-                    if (tiling.dimensions != (1, 1) or
-                            all(patt > perm for perm in bdict[cell][1])):
-                        yield Rule(
-                            formal_step=("Insert {} into cell {}.|{}|{}|{}|"
-                                         "".format(patt, cell, cell[0],
-                                                   cell[1],
-                                                   "".join(str(i)
-                                                           for i in patt))),
-                            comb_classes=cell_insertion(tiling, patt, cell),
-                            ignore_parent=ignore_parent,
-                            inferable=[True for _ in range(2)],
-                            possibly_empty=[True for _ in range(2)],
-                            workable=[True for _ in range(2)],
-                            constructor='disjoint')
+            for patt in avoiders_cache().not_contained_in(
+                    bdict[cell][0] + extra_basis, length, bdict[cell][1]):
+                if (tiling.dimensions != (1, 1) or
+                        all(patt > perm for perm in bdict[cell][1])):
+                    yield InsertionRule(
+                        formal_step=("Insert {} into cell {}.|{}|{}|{}|"
+                                     "".format(patt, cell, cell[0], cell[1],
+                                               "".join(str(i)
+                                                       for i in patt))),
+                        tiling=tiling,
+                        obstructions=[Obstruction.single_cell(patt, cell)],
+                        requirement=[Requirement.single_cell(patt, cell)],
+                        ignore_parent=ignore_parent)
 
 
 def cell_insertion(tiling, patt, cell, regions=False):
@@ -66,8 +69,8 @@ def cell_insertion(tiling, patt, cell, regions=False):
     if regions:
         return ([tiling.add_single_cell_obstruction(patt, cell),
                  tiling.add_single_cell_requirement(patt, cell)],
-                [{c: frozenset([c]) for c in tiling.active_cells},
-                 {c: frozenset([c]) for c in tiling.active_cells}])
+                [{c: frozenset([c]) for c in derived(tiling).active_cells},
+                 {c: frozenset([c]) for c in derived(tiling).active_cells}])
     else:
         return [tiling.add_single_cell_obstruction(patt, cell),
                 tiling.add_single_cell_requirement(patt, cell)]
@@ -79,8 +82,8 @@ def cell_insertion(tiling, patt, cell, regions=False):
     if regions:
         return ([tiling.add_single_cell_obstruction(patt, cell),
                  tiling.add_single_cell_requirement(patt, cell)],
-                [{c: frozenset([c]) for c in tiling.active_cells},
-                 {c: frozenset([c]) for c in tiling.active_cells}])
+                [{c: frozenset([c]) for c in derived(tiling).active_cells},
+                 {c: frozenset([c]) for c in derived(tiling).active_cells}])
     else:
         return [tiling.add_single_cell_obstruction(patt, cell),
                 tiling.add_single_cell_requirement(patt, cell)]
@@ -98,6 +101,7 @@ def all_point_insertions(tiling, **kwargs):
     yield from all_cell_insertions(tiling, maxreqlen=1, **kwargs)
 
 
+@prefiltered
 def all_requirement_extensions(tiling, **kwargs):
     """Insert longer requirements in to cells which contain a requirement"""
     maxreqlen = kwargs.get('maxreqlen')
@@ -110,8 +114,8 @@ def all_requirement_extensions(tiling, **kwargs):
             not all(isinstance(p, Perm) for p in extra_basis)):
         raise TypeError("'extra_basis' flag should be a list of Perm to avoid")
 
-    active = tiling.active_cells
-    bdict = tiling.cell_basis()
+    active = derived(tiling).active_cells
+    bdict = derived(tiling).cell_basis
     for cell in active:
         basis = bdict[cell][0]
         reqs = bdict[cell][1]
@@ -119,44 +123,39 @@ def all_requirement_extensions(tiling, **kwargs):
             continue
         curr_req = reqs[0]
         for length in range(len(curr_req) + 1, maxreqlen + 1):
-            for patt in Av(bdict[cell][0] + extra_basis).of_length(length):
-                if curr_req in patt:
-                    yield Rule(
-                        formal_step=("Insert {} into cell {}."
-                                     "".format(patt, cell)),
-                        comb_classes=[
-                            tiling.add_single_cell_obstruction(patt, cell),
-                            tiling.add_single_cell_requirement(patt, cell)],
-                        ignore_parent=False,
-                        possibly_empty=[any(len(r) > 1
-                                            for r in tiling.requirements),
-                                        True],
-                        inferable=[True for _ in range(2)],
-                        workable=[True for _ in range(2)],
-                        constructor='disjoint')
-
-
+            for patt in avoiders_cache().containing(basis + extra_basis,
+                                                    length, curr_req):
+                yield InsertionRule(
+                    formal_step=("Insert {} into cell {}."
+                                 "".format(patt, cell)),
+                    tiling=tiling,
+                    obstructions=[Obstruction.single_cell(patt, cell)],
+                    requirement=[Requirement.single_cell(patt, cell)],
+                    possibly_empty=[any(len(r) > 1
+                                        for r in tiling.requirements),
+                                    True])
+
+
+@prefiltered
 def all_row_insertions(tiling, **kwargs):
     """Insert a list requirement into every possibly empty row."""
-    positive_cells = tiling.positive_cells
+    positive_cells = derived(tiling).positive_cells
     for row in range(tiling.dimensions[1]):
-        row_cells = tiling.cells_in_row(row)
+        row_cells = derived(tiling).row_cells[row]
         if any(c in positive_cells for c in row_cells):
             continue
-        yield Rule(
+        yield InsertionRule(
             formal_step="Either row {} is empty or not.".format(row),
-            comb_classes=row_insertion_helper(tiling, row, row_cells),
-            ignore_parent=False,
-            inferable=[True for _ in range(2)],
-            possibly_empty=[True,
-                            True],
-            workable=[True for _ in range(2)],
-            constructor='disjoint')
+            tiling=tiling,
+            obstructions=[Obstruction.single_cell(Perm((0, )), c)
+                          for c in row_cells],
+            requirement=[Requirement.single_cell(Perm((0, )), c)
+                         for c in row_cells])
 
 
 def row_insertion_helper(tiling, row, row_cells, regions=False):
     if row_cells is None:
-        row_cells = tiling.cells_in_row(row)
+        row_cells = derived(tiling).row_cells[row]
     row_req = tuple(Requirement.single_cell(Perm((0, )), c)
                     for c in row_cells)
     row_obs = tuple(Obstruction.single_cell(Perm((0, )), c)
@@ -166,35 +165,34 @@ def row_insertion_helper(tiling, row, row_cells, regions=False):
             Tiling(tiling.obstructions + row_obs, tiling.requirements),
             Tiling(tiling.obstructions, tiling.requirements + (row_req,))
         ], [
-            {c: frozenset([c]) for c in tiling.active_cells},
-            {c: frozenset([c]) for c in tiling.active_cells}
+            {c: frozenset([c]) for c in derived(tiling).active_cells},
+            {c: frozenset([c]) for c in derived(tiling).active_cells}
         ])
     else:
         return [Tiling(tiling.obstructions + row_obs, tiling.requirements),
                 Tiling(tiling.obstructions, tiling.requirements + (row_req,))]
 
 
+@prefiltered
 def all_col_insertions(tiling, **kwargs):
     """Insert a list requirement into every possibly empty column."""
-    positive_cells = tiling.positive_cells
+    positive_cells = derived(tiling).positive_cells
     for col in range(tiling.dimensions[0]):
-        col_cells = tiling.cells_in_col(col)
+        col_cells = derived(tiling).col_cells[col]
         if any(c in positive_cells for c in col_cells):
             continue
-        yield Rule(
+        yield InsertionRule(
             formal_step="Either col {} is empty or not.".format(col),
-            comb_classes=col_insertion_helper(tiling, col, col_cells),
-            ignore_parent=False,
-            inferable=[True for _ in range(2)],
-            possibly_empty=[True,
-                            True],
-            workable=[True for _ in range(2)],
-            constructor='disjoint')
+            tiling=tiling,
+            obstructions=[Obstruction.single_cell(Perm((0, )), c)
+                          for c in col_cells],
+            requirement=[Requirement.single_cell(Perm((0, )), c)
+                         for c in col_cells])
 
 
 def col_insertion_helper(tiling, col, col_cells, regions=False):
     if col_cells is None:
-        col_cells = tiling.cells_in_col(col)
+        col_cells = derived(tiling).col_cells[col]
     col_req = tuple(Requirement.single_cell(Perm((0, )), c)
                     for c in col_cells)
     col_obs = tuple(Obstruction.single_cell(Perm((0, )), c)
@@ -204,8 +202,8 @@ def col_insertion_helper(tiling, col, col_cells, regions=False):
                         tiling.requirements),
                  Tiling(tiling.obstructions,
                         tiling.requirements + (col_req,))],
-                [{c: frozenset([c]) for c in tiling.active_cells},
-                 {c: frozenset([c]) for c in tiling.active_cells}])
+                [{c: frozenset([c]) for c in derived(tiling).active_cells},
+                 {c: frozenset([c]) for c in derived(tiling).active_cells}])
     else:
         return [Tiling(tiling.obstructions + col_obs,
                        tiling.requirements),
@@ -213,49 +211,35 @@ def col_insertion_helper(tiling, col, col_cells, regions=False):
                        tiling.requirements + (col_req,))]
 
 
+@prefiltered
 def all_requirement_insertions(tiling, **kwargs):
     """Insert all possible requirements the obstruction allow."""
     if kwargs.get("no_reqs", True) and tiling.requirements:
         return
     maxlen = kwargs.get("maxlen", 2)
     ignore_parent = kwargs.get("ignore_parent", False)
-    obs_tiling = Tiling(tiling.obstructions,
-                        remove_empty=False, derive_empty=False,
-                        minimize=False, sorted_input=True)
+    perms = gridded_perms(tiling.obstructions, maxlen)
     for length in range(1, maxlen + 1):
-        for gp in obs_tiling.gridded_perms_of_length(length):
+        for gp in perms[length]:
             if len(gp.factors()) == 1:
-                av = Tiling((tiling.obstructions +
-                             (Obstruction(gp.patt, gp.pos),)),
-                            tiling.requirements)
-                co = Tiling(tiling.obstructions,
-                            (tiling.requirements) +
-                            ((Requirement(gp.patt, gp.pos),),))
-                yield Rule(formal_step="Insert {}.".format(str(gp)),
-                           comb_classes=[av, co],
-                           ignore_parent=ignore_parent,
-                           inferable=[True for _ in range(2)],
-                           possibly_empty=[True for _ in range(2)],
-                           workable=[True for _ in range(2)],
-                           constructor='disjoint')
+                yield InsertionRule(
+                    formal_step="Insert {}.".format(str(gp)),
+                    tiling=tiling,
+                    obstructions=[Obstruction(gp.patt, gp.pos)],
+                    requirement=[Requirement(gp.patt, gp.pos)],
+                    ignore_parent=ignore_parent)
 
 
+@prefiltered
 def all_factor_insertions(tiling, **kwargs):
     ignore_parent = kwargs.get("ignore_parent", False)
     for gp in sorted(set(chain(tiling.obstructions, *tiling.requirements))):
         factors = gp.factors()
         if len(factors) != 1:
             for gp in factors:
-                av = Tiling((tiling.obstructions +
-                             (Obstruction(gp.patt, gp.pos),)),
-                            tiling.requirements)
-                co = Tiling(tiling.obstructions,
-                            (tiling.requirements) +
-                            ((Requirement(gp.patt, gp.pos),),))
-                yield Rule(formal_step="Insert {}.".format(str(gp)),
-                           comb_classes=[av, co],
-                           ignore_parent=ignore_parent,
-                           inferable=[True for _ in range(2)],
-                           possibly_empty=[True for _ in range(2)],
-                           workable=[True for _ in range(2)],
-                           constructor='disjoint')
+                yield InsertionRule(
+                    formal_step="Insert {}.".format(str(gp)),
+                    tiling=tiling,
+                    obstructions=[Obstruction(gp.patt, gp.pos)],
+                    requirement=[Requirement(gp.patt, gp.pos)],
+                    ignore_parent=ignore_parent)
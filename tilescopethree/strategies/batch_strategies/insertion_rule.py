@@ -0,0 +1,66 @@
+"""
+The rules of the batch strategies that insert gridded perms into a tiling.
+
+Such a rule has two children, the tiling with some obstructions added and the
+tiling with a requirement list added. Each child costs a full run of the
+Tiling constructor, so an InsertionRule only keeps the parent and the gridded
+perms inserted, and builds the children the first time comb_classes is asked
+for, from the minimised gridded perms of the parent when it can. Two
+insertions into the same tiling with the same fingerprint have the same
+children, which the searcher can use without building them again.
+"""
+from comb_spec_searcher import Rule
+from tilescopethree.incremental import add_obstructions, add_requirement
+
+
+def insertion_children(tiling, obstructions, requirement):
+    """
+    Return the tiling with the obstructions added and the tiling with the
+    requirement list added.
+    """
+    return [add_obstructions(tiling, obstructions),
+            add_requirement(tiling, requirement)]
+
+
+class InsertionRule(Rule):
+    """
+    A disjoint union rule whose children avoid the obstructions and contain
+    the requirement list, built when first needed.
+    """
+
+    def __init__(self, formal_step, tiling, obstructions, requirement,
+                 ignore_parent=False, inferable=(True, True),
+                 possibly_empty=(True, True), workable=(True, True)):
+        self.formal_step = formal_step
+        self.tiling = tiling
+        self.obstructions = tuple(obstructions)
+        self.requirement = tuple(requirement)
+        self.inferable = list(inferable)
+        self.possibly_empty = list(possibly_empty)
+        self.workable = list(workable)
+        self.ignore_parent = ignore_parent
+        self.constructor = 'disjoint'
+        self._comb_classes = None
+
+    @property
+    def fingerprint(self):
+        """The gridded perms inserted, the same for rules with the same
+        children of the same parent."""
+        return (frozenset((ob.patt, ob.pos) for ob in self.obstructions),
+                frozenset((req.patt, req.pos) for req in self.requirement))
+
+    @property
+    def built(self):
+        """True if the children have been built."""
+        return self._comb_classes is not None
+
+    @property
+    def comb_classes(self):
+        if self._comb_classes is None:
+            self._comb_classes = insertion_children(
+                self.tiling, self.obstructions, self.requirement)
+        return self._comb_classes
+
+    @comb_classes.setter
+    def comb_classes(self, comb_classes):
+        self._comb_classes = list(comb_classes)
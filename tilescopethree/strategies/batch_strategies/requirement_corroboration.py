@@ -1,10 +1,13 @@
 """
     Module containing the requirement corroboration strategy.
 """
-from comb_spec_searcher import Rule
+from tilescopethree.emptiness import prefiltered
 from tilings import Obstruction, Requirement, Tiling
 
+from .insertion_rule import InsertionRule
 
+
+@prefiltered
 def requirement_corroboration(tiling, basis, **kwargs):
     """
     The requirement corroboration strategy.
@@ -25,14 +28,12 @@ def requirement_corroboration(tiling, basis, **kwargs):
         if len(reqs) == 1:
             continue
         for req in reqs:
-            yield Rule(
+            yield InsertionRule(
                 formal_step="Inserting requirement {}.".format(str(req)),
-                comb_classes=gp_insertion(tiling, req),
-                ignore_parent=True,
-                possibly_empty=[True, True],
-                workable=[True for _ in range(2)],
-                inferable=[True for _ in range(2)],
-                constructor='disjoint')
+                tiling=tiling,
+                obstructions=[Obstruction(req.patt, req.pos)],
+                requirement=[Requirement(req.patt, req.pos)],
+                ignore_parent=True)
 
 
 def pos_str(pos):
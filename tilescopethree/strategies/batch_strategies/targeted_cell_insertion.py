@@ -1,51 +1,29 @@
-from comb_spec_searcher import Rule
-from permuta.misc import UnionFind
+from permuta import Perm
+from tilescopethree.derived import derived
+from tilescopethree.emptiness import prefiltered
+from tilings import Obstruction, Requirement
 
+from .insertion_rule import InsertionRule
 
+
+@prefiltered
 def targeted_cell_insertion(tiling, **kwargs):
     """Return combintorial rules formed by inserting """
     factors = factors_of_gridded_perm(tiling)
     if not factors:
         return
-    for f in factors:
-        yield Rule("Insert {}.".format(repr(f)),
-                   [tiling.add_obstruction(f.patt, f.pos),
-                    tiling.add_requirement(f.patt, f.pos)],
-                   inferable=[True, True],
-                   workable=[True, True],
-                   ignore_parent=True,
-                   constructor='disjoint')
+    for f in sorted(factors):
+        yield InsertionRule("Insert {}.".format(repr(f)),
+                            tiling=tiling,
+                            obstructions=[Obstruction(f.patt, f.pos)],
+                            requirement=[Requirement(f.patt, f.pos)],
+                            ignore_parent=True)
 
 
 def components(tiling):
     """Return the component of a tiling. Two cells are in the same component if
     they are in the same row or column."""
-    n, m = tiling.dimensions
-
-    def cell_to_int(cell):
-        return cell[0] * m + cell[1]
-
-    def int_to_cell(i):
-        return (i // m, i % m)
-
-    cells = list(tiling.active_cells)
-    uf = UnionFind(n * m)
-    for i in range(len(cells)):
-        for j in range(i + 1, len(cells)):
-            c1, c2 = cells[i], cells[j]
-            if c1[0] == c2[0] or c1[1] == c2[1]:
-                uf.unite(cell_to_int(c1), cell_to_int(c2))
-
-    # Collect the connected components of the cells
-    all_components = {}
-    for cell in cells:
-        i = uf.find(cell_to_int(cell))
-        if i in all_components:
-            all_components[i].append(cell)
-        else:
-            all_components[i] = [cell]
-    component_cells = list(set(cells) for cells in all_components.values())
-    return component_cells
+    return derived(tiling).components
 
 
 def factors_of_gridded_perm(tiling):
@@ -54,10 +32,18 @@ def factors_of_gridded_perm(tiling):
     comps = components(tiling)
     if len(comps) <= 1:
         return
+    component = {cell: i for i, comp in enumerate(comps) for cell in comp}
     factors = set()
     for ob in tiling.obstructions:
-        subperms = [ob.get_gridded_perm_in_cells(c) for c in comps]
-        subperms = [p for p in subperms if p]
-        if len(subperms) > 1:
-            factors.update(subperms)
+        # The points of the obstruction in each component, in one pass.
+        points = {}
+        for i, cell in enumerate(ob.pos):
+            comp = component.get(cell)
+            if comp is not None:
+                points.setdefault(comp, []).append(i)
+        if len(points) > 1:
+            factors.update(
+                ob.__class__(Perm.to_standard([ob.patt[i] for i in indices]),
+                             [ob.pos[i] for i in indices])
+                for indices in points.values())
     return factors
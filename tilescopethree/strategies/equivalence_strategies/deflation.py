@@ -1,6 +1,7 @@
 """The deflation strategy."""
 from comb_spec_searcher import Rule
 from permuta import Perm
+from tilescopethree.derived import derived
 from tilings import Obstruction, Tiling
 
 
@@ -9,8 +10,8 @@ def deflation(tiling, **kwargs):
     TODO: Think about how this works with requirements."""
     if tiling.requirements:
         return
-    bases = tiling.cell_basis()
-    for cell in tiling.possibly_empty:
+    bases = derived(tiling).cell_basis
+    for cell in derived(tiling).possibly_empty:
         cell_basis = bases[cell][0]
         if sum_closed(cell_basis):
             if can_deflate(tiling, cell, True):
@@ -37,8 +38,8 @@ def skew_closed(basis):
 
 
 def can_deflate(tiling, cell, sum_decomp):
-    alone_in_row = tiling.only_cell_in_row(cell)
-    alone_in_col = tiling.only_cell_in_col(cell)
+    alone_in_row = len(derived(tiling).row_cells[cell[1]]) == 1
+    alone_in_col = len(derived(tiling).col_cells[cell[0]]) == 1
 
     if alone_in_row and alone_in_col:
         return False
@@ -82,8 +83,8 @@ def can_deflate(tiling, cell, sum_decomp):
             # you can interleave with components
             return False
     # check that do not interleave with any cells in row or column.
-    return (cells_not_interleaving >= tiling.cells_in_row(cell[1]) and
-            cells_not_interleaving >= tiling.cells_in_col(cell[0]))
+    return (cells_not_interleaving >= derived(tiling).row_cells[cell[1]] and
+            cells_not_interleaving >= derived(tiling).col_cells[cell[0]])
 
 
 # def can_deflate(tiling, cell, sum_decomp):
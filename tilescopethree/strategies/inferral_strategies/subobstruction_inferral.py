@@ -1,5 +1,6 @@
 from comb_spec_searcher import InferralRule
 from permuta import Perm
+from tilescopethree.derived import SMALL_LENGTH, derived
 from tilings import Obstruction, Tiling
 from tilings.algorithms import EmptyCellInferral, SubobstructionInferral
 
@@ -9,9 +10,28 @@ def empty_cell_inferral(tiling, **kwargs):
 
     The strategy considers each active but non-positive cell and inserts a
     point requirement. If the resulting tiling is empty, then a point
-    obstruction can be added into the cell, i.e. the cell is empty."""
-    eci = EmptyCellInferral(tiling)
-    return eci.rule()
+    obstruction can be added into the cell, i.e. the cell is empty.
+
+    A gridded perm with a point in the cell can be shrunk to the point and
+    an occurrence of a requirement of each list, so the cell is empty if
+    none of the gridded perms on the tiling up to that length uses it. These
+    are computed once for all cells, unless they are too long."""
+    maxlen = tiling.maximum_length_of_minimum_gridded_perm() + 1
+    if (maxlen > SMALL_LENGTH or
+            any(ob.is_empty() for ob in tiling.obstructions)):
+        eci = EmptyCellInferral(tiling)
+        return eci.rule()
+    data = derived(tiling)
+    used = set(cell for gp in data.small_gridded_perms for cell in gp.pos)
+    empty_cells = tuple(sorted(data.possibly_empty - used))
+    if not empty_cells:
+        return None
+    return InferralRule(
+        "The cells {} are empty".format(empty_cells),
+        Tiling(tiling.obstructions +
+               tuple(Obstruction.single_cell(Perm((0,)), cell)
+                     for cell in empty_cells),
+               tiling.requirements))
 
 
 def subobstruction_inferral(tiling, **kwargs):
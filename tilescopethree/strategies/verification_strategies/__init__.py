@@ -1,4 +1,5 @@
 from .database_verification import database_verified
 from .globally_verified import elementary_verified, globally_verified
+from .subclass_verified import subclass_verified
 from .subset_verified import one_by_one_verified, subset_verified
 from .verify_atoms import verify_atoms
@@ -1,10 +1,76 @@
 """A strategy for checking if a tiling is contained in a subclass."""
 
-from itertools import chain
+from collections import OrderedDict
 
 from comb_spec_searcher import VerificationRule
-from permuta import Av
 from permuta.descriptors import Basis
+from tilescopethree.avoiders import avoiders_cache
+
+# The patterns left for the most recently checked tilings, by tiling, basis
+# and maximum pattern length.
+_results = OrderedDict()
+_RESULTS_SIZE = 4096
+
+
+class SubclassPatterns(object):
+    """
+    The patterns of Av(basis) up to a length, in increasing length, and the
+    superpatterns of each of them among those patterns.
+    """
+
+    def __init__(self, basis, maxlen):
+        self.patterns = tuple(patt
+                              for length in range(maxlen + 1)
+                              for patt in avoiders_cache().get(basis,
+                                                               length).perms)
+        self.superpatterns = {
+            patt: tuple(other for other in self.patterns
+                        if len(other) > len(patt) and patt in other)
+            for patt in self.patterns}
+
+    def avoided_by_all(self, perms):
+        """
+        Return the set of patterns avoided by every perm, or None as soon as
+        there are none left.
+        """
+        remaining = set(self.patterns)
+        seen = set()
+        for perm in perms:
+            if perm in seen:
+                continue
+            seen.add(perm)
+            # A perm avoiding a pattern avoids all of its superpatterns, so
+            # those are not checked.
+            avoided = set()
+            for patt in self.patterns:
+                if patt not in remaining or patt in avoided:
+                    continue
+                if patt in perm:
+                    remaining.discard(patt)
+                else:
+                    avoided.update(self.superpatterns[patt])
+            if not remaining:
+                return None
+        return remaining
+
+
+_subclass_patterns = {}
+
+
+def subclass_patterns(basis, maxlen):
+    """Return the SubclassPatterns for the basis, computed once."""
+    key = (tuple(sorted(set(basis))), maxlen)
+    res = _subclass_patterns.get(key)
+    if res is None:
+        res = SubclassPatterns(basis, maxlen)
+        _subclass_patterns[key] = res
+    return res
+
+
+def _perms(tiling, maxlen):
+    for i in range(maxlen + 1):
+        for g in tiling.objects_of_length(i):
+            yield g.patt
 
 
 def subclass_verified(tiling, basis, **kwargs):
@@ -12,22 +78,28 @@ def subclass_verified(tiling, basis, **kwargs):
 
     A tiling is subclass verified if it only generates permutations in a
     proper subclass of Av(basis).
+
+    The gridded perms are generated lazily and the search stops as soon as
+    every pattern of Av(basis) is contained in one of them. The result is
+    remembered for the most recently checked tilings.
     """
     if tiling.dimensions == (1, 1):
         return None
+    maxpattlen = kwargs.get('maxpattlen', 4)
+    key = (tiling, tuple(basis), maxpattlen)
+    if key in _results:
+        _results.move_to_end(key)
+        patterns = _results[key]
     else:
-        maxlen = kwargs.get('maxpattlen', 4)
-        patterns = set(perm for perm in chain(*[Av(basis).of_length(i)
-                                                for i in range(maxlen + 1)]))
-        maxlen += tiling.maximum_length_of_minimum_gridded_perm()
-        for i in range(maxlen + 1):
-            for g in tiling.objects_of_length(i):
-                perm = g.patt
-                patterns = set(pattern for pattern in patterns
-                               if perm.avoids(pattern))
-                if not patterns:
-                    return None
-        return VerificationRule(formal_step=("The tiling belongs to the "
-                                             "subclass obtained by adding"
-                                             " the patterns {}."
-                                             "".format(Basis(patterns))))
+        maxlen = maxpattlen + tiling.maximum_length_of_minimum_gridded_perm()
+        patterns = subclass_patterns(basis, maxpattlen).avoided_by_all(
+            _perms(tiling, maxlen))
+        _results[key] = patterns
+        if len(_results) > _RESULTS_SIZE:
+            _results.popitem(last=False)
+    if not patterns:
+        return None
+    return VerificationRule(formal_step=("The tiling belongs to the "
+                                         "subclass obtained by adding"
+                                         " the patterns {}."
+                                         "".format(Basis(patterns))))
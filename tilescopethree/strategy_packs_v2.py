@@ -22,7 +22,8 @@ from tilescopethree.strategies import (database_verified, elementary_verified,
                                        row_and_column_separation)
 from tilescopethree.strategies import row_placements as row_placements_strat
 from tilescopethree.strategies import (subobstruction_inferral,
-                                       subset_verified, verify_atoms)
+                                       subset_verified,
+                                       targeted_cell_insertion, verify_atoms)
 from tilings import Tiling
 
 
@@ -126,7 +127,8 @@ class TileScopePack(StrategyPack):
                              obstruction_transitivity],
             expansion_strats=[[partial(all_cell_insertions,
                                        maxreqlen=length),
-                               all_requirement_insertions],
+                               all_requirement_insertions,
+                               targeted_cell_insertion],
                               [all_placements]],
             name="all_the_strategies")
 
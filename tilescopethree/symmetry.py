@@ -0,0 +1,146 @@
+"""
+The eight symmetries of tilings, canonical representatives of symmetry
+classes and the symmetries of proof trees.
+"""
+from comb_spec_searcher import ProofTree
+from comb_spec_searcher.proof_tree import ProofTreeNode
+from tilescopethree.encoding import decode_tiling, encode_tiling
+from tilings import Tiling
+
+# The symmetries, and the inverse of each of them.
+SYMMETRIES = {
+    'identity': (lambda tiling: tiling, 'identity'),
+    'inverse': (Tiling.inverse, 'inverse'),
+    'reverse': (Tiling.reverse, 'reverse'),
+    'complement': (Tiling.complement, 'complement'),
+    'antidiagonal': (Tiling.antidiagonal, 'antidiagonal'),
+    'rotate90': (Tiling.rotate90, 'rotate270'),
+    'rotate180': (Tiling.rotate180, 'rotate180'),
+    'rotate270': (Tiling.rotate270, 'rotate90'),
+}
+
+
+def apply_symmetry(name, tiling):
+    """Return the tiling after applying the named symmetry."""
+    return SYMMETRIES[name][0](tiling)
+
+
+def inverse_symmetry(name):
+    """Return the name of the inverse of the named symmetry."""
+    return SYMMETRIES[name][1]
+
+
+def canonical_form(tiling):
+    """
+    Return the canonical representative of the symmetry class of the tiling,
+    and the name of a symmetry taking the tiling to it.
+
+    The representative is the symmetry with the smallest encoding.
+    """
+    best = None
+    for name in SYMMETRIES:
+        sym_tiling = apply_symmetry(name, tiling)
+        key = encode_tiling(sym_tiling)
+        if best is None or key < best[0]:
+            best = (key, sym_tiling, name)
+    return best[1], best[2]
+
+
+def symmetry_class(tiling):
+    """
+    Return a list of the distinct symmetries of the tiling, each with the
+    name of a symmetry taking the tiling to it.
+    """
+    members = {}
+    for name in sorted(SYMMETRIES):
+        members.setdefault(apply_symmetry(name, tiling), name)
+    return sorted(members.items(), key=lambda item: encode_tiling(item[0]))
+
+
+def symmetric_tree(proof_tree, name):
+    """
+    Return the proof tree after applying the named symmetry to every tiling
+    in it. The labels and formal steps are those of the original tree.
+    """
+    if name == 'identity':
+        return proof_tree
+
+    def symmetric_node(node):
+        return ProofTreeNode(
+            label=node.label,
+            eqv_path_labels=list(node.eqv_path_labels),
+            eqv_path_comb_classes=[apply_symmetry(name, tiling)
+                                   for tiling in node.eqv_path_comb_classes],
+            eqv_explanations=list(node.eqv_explanations),
+            children=[symmetric_node(child) for child in node.children],
+            strategy_verified=node.strategy_verified,
+            decomposition=node.decomposition,
+            disjoint_union=node.disjoint_union,
+            recursion=node.recursion,
+            formal_step=node.formal_step)
+
+    return ProofTree(symmetric_node(proof_tree.root))
+
+
+def symmetry_invariant(tiling):
+    """
+    Return a key that is the same for every symmetry of the tiling and is
+    cheap to compute. Tilings with different keys are not symmetric.
+    """
+    return (tuple(sorted(tiling.dimensions)),
+            tuple(sorted((len(ob.patt), len(set(ob.pos)))
+                         for ob in tiling.obstructions)),
+            tuple(sorted(tuple(sorted((len(req.patt), len(set(req.pos)))
+                                      for req in reqs))
+                         for reqs in tiling.requirements)))
+
+
+class SymmetryIndex(object):
+    """
+    The symmetry classes of the tilings added, each with the label of its
+    first tiling as representative.
+
+    The canonical form of a tiling is only computed once another tiling with
+    the same symmetry_invariant has been added, so most tilings, which are
+    not symmetric to any other tiling seen, never need it.
+    """
+
+    def __init__(self):
+        # The encoded tilings whose canonical form is not known yet, by
+        # invariant. An empty list means all are in _canonical.
+        self._pending = {}
+        # The label and symmetry of the representative, by canonical form.
+        self._canonical = {}
+        self.canonical_forms = 0
+
+    def _canonical_key(self, tiling):
+        self.canonical_forms += 1
+        canonical, name = canonical_form(tiling)
+        return encode_tiling(canonical), name
+
+    def add(self, tiling, label):
+        """
+        Add the tiling with the given label. Return None if it is the first
+        tiling of its symmetry class, and otherwise the label of the
+        representative and an explanation of the symmetry.
+        """
+        invariant = symmetry_invariant(tiling)
+        pending = self._pending.get(invariant)
+        if pending is None:
+            self._pending[invariant] = [(label, encode_tiling(tiling))]
+            return None
+        for other_label, encoded in pending:
+            key, name = self._canonical_key(decode_tiling(encoded))
+            self._canonical.setdefault(key, (other_label, name))
+        self._pending[invariant] = []
+        key, name = self._canonical_key(tiling)
+        if key not in self._canonical:
+            self._canonical[key] = (label, name)
+            return None
+        representative, representative_name = self._canonical[key]
+        if representative == label:
+            return None
+        steps = [step for step in (name,
+                                   inverse_symmetry(representative_name))
+                 if step != 'identity']
+        return representative, "Symmetry: {}".format(", then ".join(steps))
@@ -6,11 +6,36 @@
                           |
                           '
 """
+import multiprocessing
+import time
+from base64 import b64decode
+from collections import OrderedDict
+from copy import copy
+from itertools import chain, islice
+
 from logzero import logger
 
 from comb_spec_searcher import CombinatorialSpecificationSearcher
+from comb_spec_searcher.strategies.strategy_pack import StrategyPack
+from comb_spec_searcher.utils import get_func
 from permuta import Perm
 from permuta.descriptors import Basis
+from tilescopethree.avoiders import avoiders_cache
+from tilescopethree.checkpoint import CheckpointLog, logged, read_log, replay
+from tilescopethree.children import ChildCache
+from tilescopethree.derived import cache_status
+from tilescopethree.emptiness import prefilter_status
+from tilescopethree.encoding import CompactClassDB, compact
+from tilescopethree.incremental import incremental_status
+from tilescopethree.inferral import InferralEngine, InferredStrategy
+from tilescopethree.inferral_memo import InferralMemo
+from tilescopethree.parallel import (PrefetchedStrategy, expand_tiling,
+                                     init_worker, strategy_keys)
+from tilescopethree.profiling import Profiler
+from tilescopethree.symmetry import SymmetryIndex
+from tilescopethree.tree_library import (library_verified, open_library,
+                                         record_dependent)
+from tilescopethree.verification_cache import VerificationCache
 from tilings import Obstruction, Tiling
 
 
@@ -26,8 +51,60 @@ class TileScopeTHREE(CombinatorialSpecificationSearcher):
                  # symmetry=False,
                  forward_equivalence=False,
                  logger_kwargs={'processname': 'runner'},
+                 workers=None,
+                 lookahead=None,
+                 checkpoint=None,
+                 profile=False,
+                 verification_cache=None,
+                 library=None,
+                 canonical_symmetries=False,
+                 fixpoint_inferral=False,
+                 inferral_memo=None,
                  **kwargs):
-        """Initialise TileScope."""
+        """
+        Initialise TileScope.
+
+        The tilings are stored in the class database in the compact encoding
+        of tilescopethree.encoding, and only rebuilt when they are needed.
+
+        If workers is greater than one, the initial and expansion strategies
+        are applied in a pool of that many processes. The searcher looks ahead
+        at the next 'lookahead' labels in the queue (default four per worker)
+        and expands them speculatively. The rules are still added to the
+        databases in the same order as when searching serially, so the same
+        universe is found.
+
+        If checkpoint is a filename, a new incremental checkpoint log is
+        started in that file. A checkpoint is appended every time the status
+        is reported, and the search can be recovered with
+        TileScopeTHREE.resume.
+
+        If profile is True, the calls, time and rules of every strategy are
+        counted, together with the number of steps of the proof trees found
+        that each strategy made (see tilescopethree.profiling).
+
+        If verification_cache is the filename of an SQLite database, or a
+        VerificationCache, the results of the verification strategies are
+        looked up in it before verifying and stored in it afterwards.
+
+        If library is the filename of an SQLite database, the tilings with a
+        proof tree in that tree library are verified by library_verified, and
+        the proof trees found are grafted together and added to the library
+        (see tilescopethree.tree_library).
+
+        If the strategy pack uses symmetries and canonical_symmetries is
+        True, each new tiling is looked up in a SymmetryIndex and, if it is
+        symmetric to a tiling seen before, marked as equivalent to it, instead
+        of adding all symmetries of every tiling to the class database.
+
+        If fixpoint_inferral is True, tilings are inferred with an
+        InferralEngine, which only reruns an inferral strategy when the part
+        of the tiling it depends on has changed (see
+        tilescopethree.inferral). The inferral rules found are stored in
+        inferral_memo, which is either an InferralMemo, the filename of an
+        SQLite database to keep them in between runs, or None for a new memo
+        used by this search only (see tilescopethree.inferral_memo).
+        """
         if isinstance(start_class, str):
             basis = Basis([Perm.to_standard([int(c) for c in p])
                            for p in start_class.split('_')])
@@ -56,6 +133,12 @@ class TileScopeTHREE(CombinatorialSpecificationSearcher):
 
         function_kwargs = {"basis": basis}
         function_kwargs.update(kwargs.get('kwargs', dict()))
+        if library is not None:
+            function_kwargs['library'] = library
+            if library_verified not in strategy_pack.ver_strats:
+                strategy_pack = copy(strategy_pack)
+                strategy_pack.ver_strats = (strategy_pack.ver_strats +
+                                            [library_verified])
 
         CombinatorialSpecificationSearcher.__init__(
             self,
@@ -67,6 +150,329 @@ class TileScopeTHREE(CombinatorialSpecificationSearcher):
             logger_kwargs=logger_kwargs,
             **kwargs)
 
+        self.workers = workers if workers is not None and workers > 1 else None
+        if lookahead is None:
+            lookahead = 4 * (self.workers or 0)
+        self.lookahead = lookahead
+        self._pool = None
+        self._prefetched = OrderedDict()
+
+        self.classdb = logged(compact(self.classdb))
+        self.equivdb = logged(self.equivdb)
+        self.ruledb = logged(self.ruledb)
+        self.classqueue = logged(self.classqueue)
+        self.profiler = Profiler() if profile else None
+        if isinstance(verification_cache, str):
+            verification_cache = VerificationCache(verification_cache)
+        self.verification_cache = verification_cache
+        self.library = open_library(library) if library is not None else None
+        self.symmetry_index = None
+        if symmetries and canonical_symmetries:
+            self.symmetry_index = SymmetryIndex()
+            self._index_symmetries()
+        # The formal steps of verifications depending on the basis.
+        self._dependent_steps = set()
+        self.child_cache = ChildCache()
+        self.inferral_engine = None
+        if fixpoint_inferral:
+            if isinstance(inferral_memo, str):
+                inferral_memo = InferralMemo(path=inferral_memo)
+            self.inferral_engine = InferralEngine(self.inferral_strategies,
+                                                  memo=inferral_memo)
+        self.checkpoint_log = None
+        if checkpoint is not None:
+            self.checkpoint_log = CheckpointLog(checkpoint)
+            self.checkpoint_log.write_header(self)
+            self._start_logging()
+
+    def _start_logging(self):
+        """Record all changes to the databases in the checkpoint log."""
+        for database in (self.classdb, self.equivdb, self.ruledb,
+                         self.classqueue):
+            database.log = self.checkpoint_log
+
+    def checkpoint(self):
+        """Append the changes since the last checkpoint to the log."""
+        if self.checkpoint_log is not None:
+            self.checkpoint_log.flush(self)
+
+    @classmethod
+    def resume(cls, filename, strategy_pack=None, **kwargs):
+        """
+        Return the searcher recovered from the checkpoint log, which will
+        continue appending to the log.
+
+        The strategy pack should be the one the search was started with. If
+        it is not given, it is recovered from the names of the strategies,
+        forgetting any keyword arguments given to partial functions.
+        """
+        header, checkpoints = read_log(filename)
+        start_class = Tiling.decompress(
+            b64decode(header['start_class'].encode()))
+        if strategy_pack is None:
+            strategy_pack = StrategyPack(
+                initial_strats=[get_func(*names)
+                                for names in header['initial_strategies']],
+                ver_strats=[get_func(*names)
+                            for names in header['verification_strategies']],
+                inferral_strats=[get_func(*names)
+                                 for names in header['inferral_strategies']],
+                expansion_strats=[[get_func(*names) for names in strategies]
+                                  for strategies in
+                                  header['strategy_generators']],
+                name="recovered strategy pack",
+                iterative=header['iterative'],
+                forward_equivalence=header['forward_equivalence'])
+        scope = cls(start_class, strategy_pack, **kwargs)
+        replay(scope, checkpoints)
+        if scope.symmetry_index is not None:
+            scope.symmetry_index = SymmetryIndex()
+            scope._index_symmetries()
+        scope.checkpoint_log = CheckpointLog(filename)
+        scope._start_logging()
+        return scope
+
+    def status(self):
+        """
+        Return the status of the search, including the derived data and
+        avoiders caches and the strategy profiles, after writing a
+        checkpoint.
+        """
+        self.checkpoint()
+        status = (super().status() + cache_status() +
+                  avoiders_cache().status() + prefilter_status() +
+                  incremental_status() + self.child_cache.status())
+        if self.inferral_engine is not None:
+            self.inferral_engine.memo.flush()
+            status += (self.inferral_engine.status() +
+                       self.inferral_engine.memo.status())
+        if self.verification_cache is not None:
+            self.verification_cache.flush()
+            status += self.verification_cache.status()
+        if self.library is not None:
+            status += self.library.status()
+        if self.profiler is not None:
+            status += self.profiler.status()
+        return status
+
+    def _index_symmetries(self):
+        """Add the representatives in the class database to the symmetry
+        index."""
+        for label, info in self.classdb.label_to_info.items():
+            if label == self.start_label or (info.symmetry_expanded and
+                                             not info.expanding_other_sym):
+                self.symmetry_index.add(self.classdb.get_class(label), label)
+                self.classdb.set_symmetry_expanded(label)
+
+    def _symmetry_expand(self, comb_class):
+        """
+        Mark the class as equivalent to the representative of its symmetry
+        class, if it is not the first class of its symmetry class.
+        """
+        if self.symmetry_index is None:
+            return super()._symmetry_expand(comb_class)
+        start = time.time()
+        label = self.classdb.get_label(comb_class)
+        if not self.classdb.is_symmetry_expanded(label):
+            self.classdb.set_symmetry_expanded(label)
+            symmetric = self.symmetry_index.add(comb_class, label)
+            if symmetric is not None:
+                representative, explanation = symmetric
+                self.classdb.set_expanding_other_sym(label)
+                self.equivdb.union(representative, label, explanation)
+        self.symmetry_time += time.time() - start
+
+    def _initial_expand(self, comb_class, label):
+        super()._initial_expand(comb_class, label)
+        if self.checkpoint_log is not None:
+            # The class queue ignores the label until the next level.
+            self.checkpoint_log.record('qi', label)
+
+    def _get_pool(self):
+        """Return the pool of workers, starting it if needed."""
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                processes=self.workers,
+                initializer=init_worker,
+                initargs=(strategy_keys(self.strategy_pack), self.kwargs))
+        return self._pool
+
+    def close_pool(self):
+        """Stop the worker processes, if any are running."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self._prefetched = OrderedDict()
+
+    def _next_strategy_keys(self, label):
+        """
+        Return the keys of the strategies that the next call to expand with
+        label will apply, or an empty list if they can not be applied by a
+        worker.
+        """
+        if (self.is_expanded(label) or
+                self.equivdb.is_verified(label) or
+                self.classdb.is_expanding_children_only(label) or
+                not self.classdb.is_expandable(label) or
+                self.classdb.is_expanding_other_sym(label)):
+            return []
+        if (self.classdb.is_inferrable(label) and
+                not self.classdb.is_inferral_expanded(label)):
+            return []
+        if not self.classdb.is_initial_expanded(label):
+            return [('initial', i)
+                    for i in range(len(self.initial_strategies))]
+        expanding = self.classdb.number_times_expanded(label)
+        return [('expansion', expanding, i)
+                for i in range(len(self.strategy_generators[expanding]))]
+
+    def _prefetch(self, label):
+        """Send the next expansion of label to the workers."""
+        if label in self._prefetched:
+            return
+        keys = self._next_strategy_keys(label)
+        if not keys:
+            return
+        encoded = self.classdb.label_to_info[label].comb_class
+        pool = self._get_pool()
+        self._prefetched[label] = {
+            key: pool.apply_async(expand_tiling, (key, encoded))
+            for key in keys}
+        # Labels looked ahead at may never be expanded, e.g. if they are
+        # verified first, so forget the oldest ones.
+        while len(self._prefetched) > 2 * self.lookahead + 1:
+            self._prefetched.popitem(last=False)
+
+    def expand(self, label):
+        """
+        Expand the label. If using workers, the next labels in the queue are
+        sent to the workers before expanding.
+        """
+        self.child_cache.new_expansion()
+        if self.workers is None:
+            return super().expand(label)
+        self._prefetch(label)
+        queue = chain(self.classqueue.working, self.classqueue.curr_level)
+        for next_label in islice(queue, self.lookahead):
+            self._prefetch(next_label)
+        super().expand(label)
+        self._prefetched.pop(label, None)
+
+    def _expand_class_with_strategy(self, comb_class, strategy_function,
+                                    label, initial=False, inferral=False):
+        """
+        Expand the class with the given strategy, using the rules found by a
+        worker if they were prefetched. The children of insertion rules are
+        only built when needed (see tilescopethree.children).
+        """
+        if self.workers is not None and not inferral:
+            if initial:
+                key = ('initial',
+                       self.initial_strategies.index(strategy_function))
+            else:
+                expanding = self.classdb.number_times_expanded(label)
+                key = ('expansion', expanding,
+                       self.strategy_generators[expanding].index(
+                           strategy_function))
+            result = self._prefetched.get(label, {}).pop(key, None)
+            if result is not None:
+                strategy_function = PrefetchedStrategy(strategy_function,
+                                                       result.get())
+        if not inferral:
+            strategy_function = self.child_cache.wrap(strategy_function,
+                                                      self, label)
+        if (self.profiler is not None and
+                not isinstance(strategy_function, InferredStrategy)):
+            strategy_function = self.profiler.wrap(strategy_function)
+        return super()._expand_class_with_strategy(comb_class,
+                                                   strategy_function, label,
+                                                   initial=initial,
+                                                   inferral=inferral)
+
+    def _inferral_expand(self, comb_class, label, inferral_strategies=None,
+                         skip=None, start_index=None):
+        """
+        Infer the class with the inferral engine, adding the inferral rules
+        it applies to the databases in the same way as the searcher.
+        """
+        if self.inferral_engine is None or inferral_strategies is not None:
+            return super()._inferral_expand(comb_class, label,
+                                            inferral_strategies, skip,
+                                            start_index)
+        if self.classdb.is_inferral_expanded(label):
+            return
+        current = [comb_class, label]
+
+        def record(strategy, rule):
+            tiling, label = current
+            inf_class, inf_label = self._expand_class_with_strategy(
+                tiling, InferredStrategy(strategy, rule), label,
+                inferral=True)
+            self.classdb.set_inferral_expanded(label)
+            if inf_class is None:
+                return False
+            current[:] = [inf_class, inf_label]
+            return not self.classdb.is_inferral_expanded(inf_label)
+
+        self.inferral_engine.infer(comb_class, record, self._call_inferral)
+        self.classdb.set_inferral_expanded(current[1])
+
+    def _call_inferral(self, strategy, tiling):
+        """Apply the inferral strategy, profiling it."""
+        if self.profiler is not None:
+            strategy = self.profiler.wrap(strategy)
+        return strategy(tiling, **self.kwargs)
+
+    def try_verify(self, comb_class, label, force=False):
+        """
+        Try to verify the class, using the verification cache and profiling
+        the verification strategies.
+        """
+        if (self.profiler is None and self.verification_cache is None and
+                self.library is None):
+            return super().try_verify(comb_class, label, force=force)
+        strategies = self.verification_strategies
+        wrapped = strategies
+        if self.verification_cache is not None:
+            wrapped = [self.verification_cache.wrap(strategy)
+                       for strategy in wrapped]
+        # Outside of the cache, so the rules found in it are recorded too.
+        if self.library is not None:
+            wrapped = [record_dependent(strategy, self._dependent_steps)
+                       for strategy in wrapped]
+        if self.profiler is not None:
+            wrapped = [self.profiler.wrap(strategy) for strategy in wrapped]
+        self.verification_strategies = wrapped
+        try:
+            return super().try_verify(comb_class, label, force=force)
+        finally:
+            self.verification_strategies = strategies
+
+    def auto_search(self, *args, **kwargs):
+        """
+        Run the auto search, stopping the workers and writing a checkpoint
+        when it returns. The steps of the proof tree found are counted in the
+        strategy profiles, and the tree is grafted and added to the library.
+        """
+        try:
+            tree = super().auto_search(*args, **kwargs)
+            if self.profiler is not None and tree is not None:
+                self.profiler.record_tree(tree)
+            if self.library is not None and tree is not None:
+                basis = self.kwargs['basis']
+                tree = self.library.graft(tree, basis,
+                                          self._dependent_steps)
+                self.library.add_tree(tree, basis, self._dependent_steps)
+            return tree
+        finally:
+            self.close_pool()
+            self.checkpoint()
+            if self.verification_cache is not None:
+                self.verification_cache.flush()
+            if self.inferral_engine is not None:
+                self.inferral_engine.memo.flush()
+
     def to_dict(self):
         """Return dictionary object of self."""
         dict = super().to_dict()
@@ -81,6 +487,14 @@ class TileScopeTHREE(CombinatorialSpecificationSearcher):
     def from_dict(cls, dict):
         """Return TileScopeTHREE object from dictionary."""
         scope = super(cls, TileScopeTHREE).from_dict(dict, Tiling)
+        scope.classdb = logged(CompactClassDB.from_dict(dict['classdb'],
+                                                        Tiling))
+        scope.equivdb = logged(scope.equivdb)
+        scope.ruledb = logged(scope.ruledb)
+        scope.classqueue = logged(scope.classqueue)
         basis = Basis([ob.patt for ob in scope.start_class.obstructions])
         scope.kwargs['basis'] = basis
+        if scope.symmetry_index is not None:
+            scope.symmetry_index = SymmetryIndex()
+            scope._index_symmetries()
         return scope
@@ -0,0 +1,268 @@
+"""
+A library of proof trees of tilings, kept between runs.
+
+When a search finds a proof tree, every node whose subtree does not recurse
+outside of itself is stored in an SQLite database, indexed by the canonical
+form of the tiling (see tilescopethree.symmetry), so a tiling is found if it
+or any of its symmetries has been solved before. The verification strategy
+library_verified verifies the tilings that are in the library, and the
+searcher grafts the stored subtrees into the proof tree it returns.
+
+Some verification strategies, e.g. one_by_one_verified, depend on the basis
+of the search. A subtree using them is only stored for that basis, and is
+only used for the exact same tiling.
+"""
+import json
+import sqlite3
+
+from comb_spec_searcher import ProofTree, VerificationRule
+from comb_spec_searcher.proof_tree import ProofTreeNode
+from comb_spec_searcher.utils import get_func_name
+from tilescopethree.encoding import encode_tiling
+from tilescopethree.symmetry import (canonical_form, inverse_symmetry,
+                                     symmetric_tree)
+from tilings import Tiling
+
+FORMAL_STEP = "The tiling has a proof tree in the library."
+
+# The verification strategies whose proof depends on the basis.
+BASIS_DEPENDENT = ('one_by_one_verified', 'subclass_verified')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trees (
+    canonical BLOB NOT NULL,
+    symmetry TEXT NOT NULL,
+    basis TEXT NOT NULL,
+    tree TEXT NOT NULL,
+    PRIMARY KEY (canonical, symmetry, basis)
+);
+"""
+
+
+def basis_key(basis):
+    """Return a string for the basis, the same in every run."""
+    return repr(sorted(basis)) if basis else ''
+
+
+class TreeLibrary(object):
+    """The proof trees in the database at path."""
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.executescript(SCHEMA)
+
+    def add_tree(self, proof_tree, basis=None, dependent_steps=()):
+        """
+        Store the subtrees of the proof tree that do not recurse outside of
+        themselves. The subtrees verified by one of the dependent_steps are
+        stored for the given basis only. Return the number of tilings added.
+        """
+        rows = []
+        self._subtrees(proof_tree.root, basis_key(basis),
+                       set(dependent_steps), rows)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            added = 0
+            for row in rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO trees VALUES (?, ?, ?, ?)", row)
+                added += cursor.rowcount
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        return added
+
+    def _subtrees(self, node, basis, dependent_steps, rows):
+        """
+        Add the rows for the subtrees below node, and return the labels
+        defined and recursed to in the subtree of node, and if it depends on
+        the basis.
+        """
+        if node.recursion:
+            return set(), {node.label}, False
+        defined, recursed = {node.label}, set()
+        dependent = (node.strategy_verified and
+                     node.formal_step in dependent_steps)
+        for child in node.children:
+            child_defined, child_recursed, child_dependent = self._subtrees(
+                child, basis, dependent_steps, rows)
+            defined |= child_defined
+            recursed |= child_recursed
+            dependent = dependent or child_dependent
+        if node.children and recursed <= defined:
+            tree = json.dumps(ProofTree(node).to_jsonable())
+            tiling = node.eqv_path_comb_classes[0]
+            canonical, symmetry = canonical_form(tiling)
+            rows.append((encode_tiling(canonical), symmetry,
+                         basis if dependent else '', tree))
+        return defined, recursed, dependent
+
+    def lookup(self, tiling, basis=None):
+        """Return a proof tree for the tiling, or None if there is none."""
+        return self._lookup(tiling, basis)[0]
+
+    def _lookup(self, tiling, basis):
+        """
+        Return a proof tree for the tiling, or None, and True if the tree
+        depends on the basis.
+        """
+        canonical, symmetry = canonical_form(tiling)
+        rows = self._conn.execute(
+            "SELECT symmetry, basis, tree FROM trees WHERE canonical = ? "
+            "AND basis IN ('', ?)",
+            (encode_tiling(canonical), basis_key(basis))).fetchall()
+        for stored_symmetry, stored_basis, tree in rows:
+            # A tree depending on the basis is only used for the same tiling.
+            if stored_basis and stored_symmetry != symmetry:
+                continue
+            tree = ProofTree.from_dict(Tiling, json.loads(tree))
+            if stored_symmetry != symmetry:
+                tree = symmetric_tree(symmetric_tree(tree, stored_symmetry),
+                                      inverse_symmetry(symmetry))
+            self.hits += 1
+            return tree, bool(stored_basis)
+        self.misses += 1
+        return None, False
+
+    def contains(self, tiling, basis=None):
+        """Return True if there is a proof tree for the tiling."""
+        canonical, symmetry = canonical_form(tiling)
+        rows = self._conn.execute(
+            "SELECT symmetry, basis FROM trees WHERE canonical = ? "
+            "AND basis IN ('', ?)",
+            (encode_tiling(canonical), basis_key(basis))).fetchall()
+        found = any(not stored_basis or stored_symmetry == symmetry
+                    for stored_symmetry, stored_basis in rows)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found
+
+    def graft(self, proof_tree, basis=None, dependent_steps=None):
+        """
+        Return the proof tree with the nodes verified by library_verified
+        replaced by the proof trees in the library. The nodes of the given
+        proof tree are reused.
+
+        The formal steps of the verified nodes in trees depending on the basis
+        are added to the set dependent_steps, if given.
+        """
+        labels = [max(node.label for node in proof_tree.nodes()) + 1]
+
+        def relabel(node, mapping):
+            if node.label not in mapping:
+                mapping[node.label] = labels[0]
+                labels[0] += 1
+            eqv_path_labels = []
+            for label in node.eqv_path_labels:
+                if label not in mapping:
+                    mapping[label] = labels[0]
+                    labels[0] += 1
+                eqv_path_labels.append(mapping[label])
+            return ProofTreeNode(
+                label=mapping[node.label],
+                eqv_path_labels=eqv_path_labels,
+                eqv_path_comb_classes=list(node.eqv_path_comb_classes),
+                eqv_explanations=list(node.eqv_explanations),
+                children=[relabel(child, mapping)
+                          for child in node.children],
+                strategy_verified=node.strategy_verified,
+                decomposition=node.decomposition,
+                disjoint_union=node.disjoint_union,
+                recursion=node.recursion,
+                formal_step=node.formal_step)
+
+        def rebuild(node):
+            if not (node.strategy_verified and
+                    node.formal_step == FORMAL_STEP):
+                node.children = [rebuild(child) for child in node.children]
+                return node
+            tree, dependent = self._lookup(node.eqv_path_comb_classes[-1],
+                                           basis)
+            if tree is None:
+                raise ValueError("The tiling {} is not in the library."
+                                 "".format(repr(
+                                     node.eqv_path_comb_classes[-1])))
+            if dependent and dependent_steps is not None:
+                dependent_steps.update(n.formal_step for n in tree.nodes()
+                                       if n.strategy_verified)
+            root = relabel(tree.root, {tree.root.label: node.label})
+            root.eqv_path_labels = (node.eqv_path_labels[:-1] +
+                                    root.eqv_path_labels)
+            root.eqv_path_comb_classes = (node.eqv_path_comb_classes[:-1] +
+                                          root.eqv_path_comb_classes)
+            root.eqv_explanations = (node.eqv_explanations +
+                                     root.eqv_explanations)
+            return root
+
+        return ProofTree(rebuild(proof_tree.root))
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM trees").fetchone()[0]
+
+    def close(self):
+        self._conn.close()
+
+    def status(self):
+        total = self.hits + self.misses
+        return ("Proof tree library: {} hits of {} ({:.0f}%), {} tilings\n"
+                "".format(self.hits, total,
+                          100 * self.hits / total if total else 0, len(self)))
+
+
+_libraries = {}
+
+
+def open_library(path):
+    """Return the TreeLibrary at path, opened once in each process."""
+    library = _libraries.get(path)
+    if library is None:
+        library = TreeLibrary(path)
+        _libraries[path] = library
+    return library
+
+
+def library_verified(tiling, library=None, basis=None, **kwargs):
+    """
+    Verify the tiling if it, or one of its symmetries, has a proof tree in
+    the library at the path given by the keyword argument library.
+    """
+    if library is None:
+        return None
+    if open_library(library).contains(tiling, basis):
+        return VerificationRule(FORMAL_STEP)
+
+
+# The library grows while searching, so its answers must not be cached.
+library_verified.cacheable = False
+
+
+class RecordingVerification(object):
+    """
+    A verification strategy that records the formal steps of its rules if
+    it depends on the basis. It has the same name as the strategy it wraps.
+    """
+
+    def __init__(self, strategy, dependent_steps):
+        self.strategy = strategy
+        self.dependent_steps = dependent_steps
+        self.__name__ = get_func_name(strategy)
+
+    def __call__(self, tiling, **kwargs):
+        rule = self.strategy(tiling, **kwargs)
+        if rule is not None:
+            self.dependent_steps.add(rule.formal_step)
+        return rule
+
+
+def record_dependent(strategy, dependent_steps):
+    """Return the strategy, recording its formal steps if it depends on the
+    basis."""
+    if get_func_name(strategy) in BASIS_DEPENDENT:
+        return RecordingVerification(strategy, dependent_steps)
+    return strategy
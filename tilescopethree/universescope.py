@@ -1,8 +1,14 @@
 import json
 import time
+from collections import defaultdict, deque
+from copy import copy
 from itertools import combinations
 
 from comb_spec_searcher import CombinatorialSpecificationSearcher, ProofTree
+from comb_spec_searcher.class_db import ClassDB
+from comb_spec_searcher.class_queue import ClassQueue
+from comb_spec_searcher.equiv_db import EquivalenceDB
+from comb_spec_searcher.rule_db import RuleDB
 from comb_spec_searcher.tree_searcher import (iterative_proof_tree_finder,
                                               iterative_prune,
                                               proof_tree_generator_bfs,
@@ -12,10 +18,44 @@ from permuta import PermSet
 from tilescopethree.strategies import verify_atoms
 from tilescopethree.strategy_packs_v2 import (row_and_col_placements,
                                               row_placements)
+from tilescopethree.symmetry import (canonical_form, symmetric_tree,
+                                     symmetry_class)
 from tilings import Obstruction, Tiling
 
 
+def basis_string(tiling):
+    """Return the basis of a 1x1 tiling in the form 'p1_p2'."""
+    return "_".join("".join(str(i) for i in ob.patt)
+                    for ob in tiling.obstructions)
+
+
 class UniveralScope(CombinatorialSpecificationSearcher):
+    """
+    A searcher for many start tilings at once, sharing a single universe.
+
+    The start tilings are the 1x1 tilings with bases given by the bases
+    iterable, by the lines of the file filename, or all k-subsets of the
+    permutations of length n.
+
+    If window is given, the start tilings are taken lazily and at most window
+    of them are searched for at a time. Once a start tiling is verified its
+    proof tree is written to output, and it is replaced by the next one. The
+    classes in the queue that can no longer be reached from the start tilings
+    still being searched for are then not expanded, unless they can be
+    reached again later. They are still kept in the universe, so only if
+    max_classes is also given is the memory used bounded: the universe is
+    cleared and started again from the start tilings still being searched
+    for whenever it grows beyond that many classes. Start tilings that need
+    more than max_classes classes between them are written out as unsolved.
+
+    If symmetries, only the bases that are the canonical representative of
+    their class under the eight symmetries of tilings are searched for, so
+    the bases must be closed under the symmetries, as all k-subsets of the
+    permutations of length n are. The proof trees for the other bases in the
+    class are found by applying the symmetry to the proof tree found when it
+    is written out.
+    """
+
     def __init__(
             self,
             n=None,
@@ -23,21 +63,35 @@ class UniveralScope(CombinatorialSpecificationSearcher):
             strategy_pack=None,
             flogger_kwargs={
                 'processname': 'runner'},
+            filename=None,
+            bases=None,
+            window=None,
+            output=None,
+            max_classes=None,
+            symmetries=False,
             **kwargs):
-        self.start_tilings = []
-        if filename is not None:
-            assert n is None and k is None
-            f = open(filename, 'r')
-            for line in f:
-                line = line.strip()
-                self.start_tilings.append(Tiling.from_string(line))
-            f.close()
+        self.window = window
+        self.output = output
+        self.max_classes = max_classes
+        self.solved = 0
+        self.unsolved = 0
+        # The labels taken out of the queue as they could not be reached.
+        self._pruned = set()
+        self._start_tilings = self._get_start_tilings(n, k, filename, bases)
+        self.use_symmetries = symmetries
+        # The number of symmetry classes of each size taken so far.
+        self.class_sizes = {}
+        if symmetries:
+            self._start_tilings = self._representatives(self._start_tilings)
+        if window is None:
+            self.start_tilings = list(self._start_tilings)
         else:
-            for basis in combinations(PermSet(n), k):
-                self.start_tilings.append(
-                    Tiling([Obstruction.single_cell(patt, (0, 0))
-                            for patt in basis]))
+            self.start_tilings = []
+            self._fill_window(add=False)
 
+        # Copy the pack, rather than changing the verification strategies of
+        # the pack given.
+        strategy_pack = copy(strategy_pack)
         strategy_pack.ver_strats = [verify_atoms]
 
         function_kwargs = {"basis": []}
@@ -50,13 +104,222 @@ class UniveralScope(CombinatorialSpecificationSearcher):
             function_kwargs=function_kwargs,
             **kwargs)
 
+        self._add_start_tilings()
+
+    @staticmethod
+    def _get_start_tilings(n, k, filename, bases):
+        """Yield the start tilings, one at a time."""
+        if bases is not None:
+            assert n is None and k is None and filename is None
+            for basis in bases:
+                if isinstance(basis, str):
+                    yield Tiling.from_string(basis)
+                else:
+                    yield Tiling([Obstruction.single_cell(patt, (0, 0))
+                                  for patt in basis])
+        elif filename is not None:
+            assert n is None and k is None
+            with open(filename, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield Tiling.from_string(line)
+        else:
+            for basis in combinations(PermSet(n), k):
+                yield Tiling([Obstruction.single_cell(patt, (0, 0))
+                              for patt in basis])
+
+    def _representatives(self, start_tilings):
+        """Yield the start tilings that are their own canonical form."""
+        for start_tiling in start_tilings:
+            if canonical_form(start_tiling)[0] == start_tiling:
+                size = len(symmetry_class(start_tiling))
+                self.class_sizes[size] = self.class_sizes.get(size, 0) + 1
+                yield start_tiling
+
+    def symmetry_report(self):
+        """
+        Return a string describing the sizes of the symmetry classes taken
+        so far.
+        """
+        if not self.use_symmetries:
+            return "Not using symmetries.\n"
+        sizes = self.class_sizes
+        report = "{} bases in {} symmetry classes\n".format(
+            sum(size * number for size, number in sizes.items()),
+            sum(sizes.values()))
+        for size in sorted(sizes):
+            report += "    {} classes of size {}\n".format(sizes[size], size)
+        return report
+
+    def member_trees(self, start_tiling, proof_tree):
+        """
+        Yield each start tiling in the symmetry class of the given start
+        tiling with its proof tree, found by applying a symmetry to the
+        proof tree given, which may be None.
+        """
+        if not self.use_symmetries:
+            yield start_tiling, proof_tree
+            return
+        for member, symmetry in symmetry_class(start_tiling):
+            if proof_tree is None:
+                yield member, None
+            else:
+                yield member, symmetric_tree(proof_tree, symmetry)
+
+    def _add_start_tilings(self):
+        """Add the start tilings to the databases and the working queue."""
         self.start_labels = []
         for start_tiling in self.start_tilings:
             self.classdb.add(start_tiling, expandable=True)
-            self.start_labels.append(self.classdb.get_label(start_tiling))
-        for label in self.start_labels:
+            label = self.classdb.get_label(start_tiling)
+            self.start_labels.append(label)
             self.classqueue.add_to_working(label)
 
+    def _fill_window(self, add=True):
+        """
+        Take start tilings until window of them are being searched for.
+        Return True if there are no more start tilings to take.
+        """
+        while len(self.start_tilings) < self.window:
+            start_tiling = next(self._start_tilings, None)
+            if start_tiling is None:
+                return True
+            self.start_tilings.append(start_tiling)
+            if add:
+                self.classdb.add(start_tiling, expandable=True)
+                label = self.classdb.get_label(start_tiling)
+                self.start_labels.append(label)
+                self.classqueue.add_to_working(label)
+        return False
+
+    def _restart(self):
+        """Clear the universe, keeping the start tilings being searched for."""
+        self.classdb = ClassDB(Tiling)
+        self.equivdb = EquivalenceDB()
+        self.classqueue = ClassQueue()
+        self.ruledb = RuleDB()
+        self._pruned = set()
+        self._add_start_tilings()
+        self.start_label = self.start_labels[0]
+
+    def _write_tree(self, start_tiling, proof_tree):
+        """
+        Write the proof tree, or None, for the start tiling, and the other
+        start tilings in its symmetry class, to output.
+        """
+        for member, member_tree in self.member_trees(start_tiling,
+                                                     proof_tree):
+            if member_tree is None:
+                self.unsolved += 1
+            else:
+                self.solved += 1
+            if self.output is None:
+                continue
+            line = {'basis': basis_string(member),
+                    'tree': (member_tree.to_jsonable()
+                             if member_tree is not None else None)}
+            with open(self.output, 'a') as f:
+                f.write(json.dumps(line) + "\n")
+
+    def _retire(self, all_remaining=False):
+        """
+        Write out and stop searching for the start tilings with a proof tree,
+        or all of them if all_remaining. Return the number retired.
+        """
+        trees = self.get_proof_trees()
+        remaining = []
+        for start_tiling, label, tree in zip(self.start_tilings,
+                                             self.start_labels, trees):
+            if tree is not None or all_remaining:
+                self._write_tree(start_tiling, tree)
+            else:
+                remaining.append((start_tiling, label))
+        retired = len(self.start_tilings) - len(remaining)
+        self.start_tilings = [t for t, _ in remaining]
+        self.start_labels = [label for _, label in remaining]
+        return retired
+
+    def _reachable(self):
+        """
+        Return the set of labels reached from the start labels by the rules
+        and equivalences found so far.
+        """
+        equivdb = self.equivdb
+        members = defaultdict(list)
+        for label in list(equivdb.parents):
+            members[equivdb[label]].append(label)
+        reached = set()
+        stack = list(self.start_labels)
+        while stack:
+            label = stack.pop()
+            if label in reached:
+                continue
+            reached.add(label)
+            stack.extend(members[equivdb[label]])
+            for ends in self.ruledb.rules_dict.get(label, ()):
+                stack.extend(ends)
+        return reached
+
+    def _prune_queue(self):
+        """
+        Take the labels that can not be reached from the start tilings being
+        searched for out of the queue, and put back those taken out before
+        that can be reached again.
+        """
+        reached = self._reachable()
+        queue = self.classqueue
+        for name in ('working', 'curr_level', 'next_level'):
+            kept = deque()
+            for label in getattr(queue, name):
+                if label in reached:
+                    kept.append(label)
+                else:
+                    self._pruned.add(label)
+            setattr(queue, name, kept)
+        for label in sorted(self._pruned & reached):
+            queue.add_to_curr(label)
+        self._pruned -= reached
+
+    def stream_search(self, expansions=100, verbose=False):
+        """
+        Search for proof trees for all of the start tilings, keeping only a
+        window of them at a time. Return the number of start tilings with a
+        proof tree.
+
+        After every 'expansions' many expansions the start tilings that are
+        verified are retired and replaced. If the universe grows beyond
+        max_classes before any start tiling is retired since it was last
+        cleared, clearing it would only repeat the same search, so the start
+        tilings being searched for are written out as unsolved instead.
+        """
+        assert self.window is not None
+        # Whether a start tiling was retired since the universe was cleared.
+        progress = False
+        while self.start_tilings:
+            no_more_classes = self.expand_classes(expansions)
+            too_big = (self.max_classes is not None and
+                       len(self.classdb.label_to_info) > self.max_classes)
+            retired = self._retire(
+                all_remaining=no_more_classes or (too_big and not progress))
+            progress = progress or retired > 0
+            self._fill_window()
+            if not self.start_tilings:
+                break
+            if too_big:
+                self._restart()
+                progress = False
+            else:
+                self.start_label = self.start_labels[0]
+                if retired:
+                    self._prune_queue()
+            if verbose:
+                print("Solved {}, unsolved {}, searching for {}".format(
+                    self.solved, self.unsolved, len(self.start_tilings)))
+        if verbose and self.use_symmetries:
+            print(self.symmetry_report())
+        return self.solved
+
     def has_proof_tree(self):
         return all(self.equivdb.is_verified(label)
                    for label in self.start_labels)
@@ -79,7 +342,7 @@ class UniveralScope(CombinatorialSpecificationSearcher):
             self.equivdb.update_verified(label)
         trees = []
         for label in self.start_labels:
-            if label in rules_dict:
+            if self.equivdb[label] in rules_dict:
                 if self.iterative:
                     proof_tree = iterative_proof_tree_finder(
                         rules_dict,
@@ -124,7 +387,7 @@ class UniveralScope(CombinatorialSpecificationSearcher):
             if status_update is not None:
                 kwargs['max_time'] = self._time_taken + status_update
             if verbose:
-                print(scope.status())
+                print(self.status())
 
         if verbose:
             print("PROOF TREES FOUND")
@@ -132,6 +395,20 @@ class UniveralScope(CombinatorialSpecificationSearcher):
                 print(start_tiling)
                 print(json.dumps(tree.to_jsonable()))
 
+    def get_proof_trees(self):
+        """
+        Return a list with a proof tree, or None, for each start tiling being
+        searched for.
+        """
+        proof_trees = []
+        for proof_tree_node in self.find_trees():
+            if proof_tree_node is None:
+                proof_trees.append(None)
+            else:
+                proof_trees.append(ProofTree.from_comb_spec_searcher(
+                    proof_tree_node, self))
+        return proof_trees
+
     def get_proof_tree(self):
         proof_tree_nodes = self.find_trees()
         if all(node is not None for node in proof_tree_nodes):
@@ -148,13 +425,74 @@ class UniveralScope(CombinatorialSpecificationSearcher):
         return UniveralScope(filename=filename)
 
 
+def main(argv):
+    """
+    Run a universe. The bases are the lines of a file, or, with the
+    'coordinator' and 'worker' commands, are shared between many processes
+    through a work queue (see tilescopethree.workqueue).
+    """
+    import argparse
+    from tilescopethree import strategy_packs_v2
+    from tilescopethree.workqueue import coordinate, run_worker
+
+    if not argv or argv[0] not in ('coordinator', 'worker'):
+        filename = argv[0]
+        if len(argv) > 1:
+            scope = UniveralScope(
+                filename=filename,
+                strategy_pack=row_and_col_placements,
+                window=int(argv[1]),
+                output=filename + ".trees")
+            scope.stream_search(verbose=True)
+        else:
+            scope = UniveralScope(
+                filename=filename,
+                strategy_pack=row_and_col_placements)
+            scope.auto_search(verbose=True, status_update=30)
+            scope.auto_search()
+            print(scope.status())
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Run a universe with a work queue.")
+    parser.add_argument('command', choices=['coordinator', 'worker'])
+    parser.add_argument('queue', help="the SQLite file of the work queue")
+    parser.add_argument('--pack', default='row_and_col_placements',
+                        help="the name of a strategy pack in "
+                             "tilescopethree.strategy_packs_v2")
+    parser.add_argument('--max-time', type=int, default=None,
+                        help="the maximum time to search for each basis")
+    parser.add_argument('--lease', type=int, default=600,
+                        help="the seconds until an unrenewed claim expires")
+    parser.add_argument('--max-attempts', type=int, default=3,
+                        help="the number of times a basis is claimed before "
+                             "giving up on it")
+    parser.add_argument('--filename', help="a file with a basis on each line")
+    parser.add_argument('-n', type=int, help="the length of the patterns")
+    parser.add_argument('-k', type=int, help="the size of the bases")
+    parser.add_argument('--symmetries', action='store_true',
+                        help="only search for one basis in each symmetry "
+                             "class")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="the number of workers the coordinator starts")
+    parser.add_argument('--output', help="the file to write proof trees to")
+    args = parser.parse_args(argv)
+    strategy_pack = getattr(strategy_packs_v2, args.pack)
+    if args.command == 'worker':
+        run_worker(args.queue, strategy_pack, max_time=args.max_time,
+                   lease=args.lease, max_attempts=args.max_attempts)
+    else:
+        bases = (basis_string(tiling) for tiling in
+                 UniveralScope._get_start_tilings(args.n, args.k,
+                                                  args.filename, None))
+        solved = coordinate(args.queue, bases, strategy_pack,
+                            workers=args.workers,
+                            symmetries=args.symmetries, output=args.output,
+                            max_time=args.max_time, lease=args.lease,
+                            max_attempts=args.max_attempts)
+        print("Found proof trees for {} bases".format(solved))
+
+
 if __name__ == '__main__':
     import sys
-    filename = sys.argv[1]
-
-    scope = UniveralScope(
-        filename=filename,
-        strategy_pack=row_and_col_placements)
-    trees = scope.auto_search(verbose=True, status_update=30)
-    trees = scope.auto_search()
-    print(scope.status())
+    main(sys.argv[1:])
@@ -0,0 +1,176 @@
+"""
+A persistent cache of the results of verification strategies.
+
+The verification strategies give the same answer for a tiling in every run,
+and the same small tilings are checked in run after run. The cache stores
+the formal step of the verification rule, or that there was none, in an
+SQLite database, keyed on a hash of the compact encoding of the tiling, the
+module and name of the strategy and its keyword arguments. The database can
+be shared by many searches, also at the same time.
+
+When the database has more than maxsize results, the least recently used
+ones are removed.
+"""
+import hashlib
+import sqlite3
+import time
+from functools import partial
+
+from comb_spec_searcher import VerificationRule
+from comb_spec_searcher.utils import get_func_name, get_module_and_func_names
+from tilescopethree.encoding import encode_tiling
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key BLOB PRIMARY KEY,
+    formal_step TEXT,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+
+class VerificationCache(object):
+    """The results of verification strategies in the database at path."""
+
+    def __init__(self, path, maxsize=1000000, commit_every=100):
+        self.path = path
+        self.maxsize = maxsize
+        self.commit_every = commit_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # The results and uses not yet written, so that the database is only
+        # locked for a short time when they are written together.
+        self._results = {}
+        self._used = {}
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.executescript(SCHEMA)
+        self._size = self._conn.execute(
+            "SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @staticmethod
+    def key(tiling, strategy, kwargs):
+        """
+        Return the key for the strategy applied to the tiling with the
+        keyword arguments, or None if the arguments can not be written in a
+        way that is the same in every run.
+        """
+        arguments = dict(kwargs)
+        if isinstance(strategy, partial):
+            arguments.update(strategy.keywords)
+        arguments = repr(sorted(arguments.items()))
+        if " at 0x" in arguments:
+            return None
+        digest = hashlib.sha1(encode_tiling(tiling))
+        digest.update(repr(get_module_and_func_names(strategy)).encode())
+        digest.update(arguments.encode())
+        return digest.digest()
+
+    def get(self, key):
+        """
+        Return a pair (found, formal_step), where formal_step is None if the
+        tiling was not verified.
+        """
+        if key in self._results:
+            self.hits += 1
+            return True, self._results[key]
+        row = self._conn.execute("SELECT formal_step FROM results "
+                                 "WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._used[key] = time.time()
+        self._written()
+        return True, row[0]
+
+    def put(self, key, formal_step):
+        """Store the formal step, or None if not verified, under the key."""
+        self._results[key] = formal_step
+        self._used[key] = time.time()
+        self._written()
+
+    def _written(self):
+        if len(self._used) >= self.commit_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the new results to the database, and remove the least recently
+        used results if there are too many.
+        """
+        if not self._used:
+            return
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                             ((key, formal_step, self._used[key])
+                              for key, formal_step in self._results.items()))
+            conn.executemany("UPDATE results SET used = ? WHERE key = ?",
+                             ((used, key) for key, used in self._used.items()
+                              if key not in self._results))
+            self._size += len(self._results)
+            if self._size > self.maxsize:
+                self._size = conn.execute(
+                    "SELECT COUNT(*) FROM results").fetchone()[0]
+                extra = self._size - self.maxsize
+                if extra > 0:
+                    conn.execute(
+                        "DELETE FROM results WHERE key IN (SELECT key FROM "
+                        "results ORDER BY used LIMIT ?)", (extra,))
+                    self.evictions += extra
+                    self._size -= extra
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        self._results = {}
+        self._used = {}
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def wrap(self, strategy):
+        """
+        Return the verification strategy, answered from the cache, unless
+        the strategy has the attribute cacheable set to False.
+        """
+        func = strategy.func if isinstance(strategy, partial) else strategy
+        if not getattr(func, 'cacheable', True):
+            return strategy
+        return CachedVerification(strategy, self)
+
+    def status(self):
+        total = self.hits + self.misses
+        return ("Verification cache: {} hits of {} ({:.0f}%), {} results, "
+                "{} evicted\n".format(self.hits, total,
+                                      100 * self.hits / total if total else 0,
+                                      self._size, self.evictions))
+
+
+class CachedVerification(object):
+    """
+    A verification strategy that looks in the cache first. It has the same
+    name as the strategy it wraps.
+    """
+
+    def __init__(self, strategy, cache):
+        self.strategy = strategy
+        self.cache = cache
+        self.__name__ = get_func_name(strategy)
+
+    def __call__(self, tiling, **kwargs):
+        key = self.cache.key(tiling, self.strategy, kwargs)
+        if key is None:
+            return self.strategy(tiling, **kwargs)
+        found, formal_step = self.cache.get(key)
+        if not found:
+            rule = self.strategy(tiling, **kwargs)
+            formal_step = rule.formal_step if rule is not None else None
+            self.cache.put(key, formal_step)
+        if formal_step is None:
+            return None
+        return VerificationRule(formal_step)
@@ -0,0 +1,305 @@
+"""
+A work queue of bases stored in an SQLite database, for running a universe
+on many machines that share a filesystem.
+
+A coordinator adds the bases to the queue. Each worker repeatedly claims a
+basis, searches for a proof tree with TileScopeTHREE and writes the tree, or
+None, and its status back to the queue. A worker renews its claim while it
+is searching, and a claim that has not been renewed for 'lease' seconds,
+e.g. because the worker died, expires and the basis goes back to the queue.
+A search that raises an exception also puts the basis back. After
+'max_attempts' claims, the basis is marked as failed with the exception, or
+with the expired claim, as its status.
+
+If the bases are split into symmetry classes, only the representatives are
+put in the queue, and the proof trees of the other bases are derived from
+the proof tree of their representative when the results are collected.
+"""
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+
+from logzero import logger
+
+from comb_spec_searcher import ProofTree
+from tilescopethree.symmetry import (canonical_form, inverse_symmetry,
+                                     symmetric_tree)
+from tilescopethree.tilescope import TileScopeTHREE
+from tilescopethree.universescope import basis_string
+from tilings import Tiling
+
+PENDING = 'pending'
+CLAIMED = 'claimed'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bases (
+    basis TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    worker TEXT,
+    claimed REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    tree TEXT,
+    status TEXT
+);
+CREATE TABLE IF NOT EXISTS members (
+    basis TEXT PRIMARY KEY,
+    representative TEXT NOT NULL,
+    symmetry TEXT NOT NULL
+);
+"""
+
+
+class WorkQueue(object):
+    """A queue of bases in the SQLite database at path."""
+
+    def __init__(self, path, lease=600, max_attempts=3):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        return Transaction(conn)
+
+    def add(self, bases, symmetries=False):
+        """
+        Add the bases, given as strings of the form 'p1_p2', to the queue.
+        If symmetries, only add one basis in each symmetry class.
+        """
+        with self._connect() as conn:
+            conn.begin()
+            for basis in bases:
+                representative = basis
+                symmetry = 'identity'
+                if symmetries:
+                    tiling, name = canonical_form(Tiling.from_string(basis))
+                    representative = basis_string(tiling)
+                    symmetry = inverse_symmetry(name)
+                conn.execute("INSERT OR IGNORE INTO members VALUES (?, ?, ?)",
+                             (basis, representative, symmetry))
+                conn.execute("INSERT OR IGNORE INTO bases (basis, state) "
+                             "VALUES (?, ?)", (representative, PENDING))
+
+    def claim(self, worker):
+        """
+        Return a basis for the worker to search for, or None if there are no
+        bases waiting. Expired claims are returned to the queue first, or
+        failed if the basis has been claimed max_attempts times.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.begin()
+            conn.execute("UPDATE bases SET state = CASE WHEN attempts < ? "
+                         "THEN ? ELSE ? END, worker = NULL, "
+                         "status = 'The claim of ' || worker || ' expired.' "
+                         "WHERE state = ? AND claimed < ?",
+                         (self.max_attempts, PENDING, FAILED, CLAIMED,
+                          now - self.lease))
+            row = conn.execute("SELECT basis FROM bases WHERE state = ? "
+                               "ORDER BY rowid LIMIT 1",
+                               (PENDING,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE bases SET state = ?, worker = ?, "
+                         "claimed = ?, attempts = attempts + 1 "
+                         "WHERE basis = ?", (CLAIMED, worker, now, row[0]))
+            return row[0]
+
+    def renew(self, worker, basis):
+        """Renew the claim of the worker on the basis."""
+        with self._connect() as conn:
+            conn.execute("UPDATE bases SET claimed = ? WHERE basis = ? AND "
+                         "state = ? AND worker = ?",
+                         (time.time(), basis, CLAIMED, worker))
+
+    def complete(self, worker, basis, tree, status):
+        """Record the proof tree, or None, and status found for the basis."""
+        tree = json.dumps(tree.to_jsonable()) if tree is not None else None
+        with self._connect() as conn:
+            conn.execute("UPDATE bases SET state = ?, worker = ?, tree = ?, "
+                         "status = ? WHERE basis = ? AND state != ?",
+                         (DONE, worker, tree, status, basis, DONE))
+
+    def fail(self, worker, basis, error):
+        """
+        Record the error raised by the search of the worker for the basis.
+        The basis goes back to the queue, or is failed if it has been claimed
+        max_attempts times.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE bases SET state = CASE WHEN attempts < ? "
+                         "THEN ? ELSE ? END, worker = NULL, status = ? "
+                         "WHERE basis = ? AND state = ? AND worker = ?",
+                         (self.max_attempts, PENDING, FAILED, error, basis,
+                          CLAIMED, worker))
+
+    def failed(self):
+        """Return a list of the failed bases and their last errors."""
+        with self._connect() as conn:
+            return conn.execute("SELECT basis, status FROM bases "
+                                "WHERE state = ? ORDER BY rowid",
+                                (FAILED,)).fetchall()
+
+    def counts(self):
+        """Return a dictionary from states to the number of bases in it."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT state, COUNT(*) FROM bases "
+                                "GROUP BY state").fetchall()
+        counts = {PENDING: 0, CLAIMED: 0, DONE: 0, FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def finished(self):
+        """Return True if every basis is done or failed."""
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[CLAIMED] == 0
+
+    def results(self):
+        """
+        Yield every basis added, with its proof tree or None, including the
+        bases that were not searched for as another basis in their symmetry
+        class was. The failed bases have no proof tree.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT members.basis, members.symmetry, bases.tree "
+                "FROM members JOIN bases "
+                "ON members.representative = bases.basis "
+                "WHERE bases.state IN (?, ?) ORDER BY members.rowid",
+                (DONE, FAILED)).fetchall()
+        for basis, symmetry, tree in rows:
+            if tree is not None:
+                tree = symmetric_tree(
+                    ProofTree.from_dict(Tiling, json.loads(tree)), symmetry)
+            yield basis, tree
+
+
+class Transaction(object):
+    """A connection that is closed when leaving the with statement, and
+    commits if a transaction was begun."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.execute = conn.execute
+        self.executescript = conn.executescript
+
+    def begin(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.conn.in_transaction:
+            if exc_type is None:
+                self.conn.execute("COMMIT")
+            else:
+                self.conn.execute("ROLLBACK")
+        self.conn.close()
+
+
+def worker_name():
+    """Return a name for this process that is unique across machines."""
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+
+def run_worker(path, strategy_pack, max_time=None, lease=600, poll=5,
+               worker=None, max_attempts=3):
+    """
+    Claim bases from the queue at path and search for their proof trees,
+    until every basis is done or failed. Return the number of bases searched
+    for.
+
+    The claim is renewed every third of the lease while searching. If
+    max_time is given, a search that has not returned a lease after it
+    should have is taken to hang, and its claim is no longer renewed.
+    """
+    queue = WorkQueue(path, lease=lease, max_attempts=max_attempts)
+    worker = worker or worker_name()
+    searched = 0
+    while True:
+        basis = queue.claim(worker)
+        if basis is None:
+            if queue.finished():
+                return searched
+            time.sleep(poll)
+            continue
+        stop = threading.Event()
+        deadline = (time.time() + max_time + lease
+                    if max_time is not None else None)
+        renewer = threading.Thread(target=_renew,
+                                   args=(queue, worker, basis, stop, deadline))
+        renewer.daemon = True
+        renewer.start()
+        try:
+            searcher = TileScopeTHREE(basis, strategy_pack,
+                                      logger_kwargs={'processname': worker})
+            tree = searcher.auto_search(max_time=max_time)
+        except Exception:
+            error = traceback.format_exc()
+            logger.error("Searching for %s failed:\n%s", basis, error)
+            queue.fail(worker, basis, error)
+        else:
+            queue.complete(worker, basis, tree, searcher.status())
+        finally:
+            stop.set()
+            renewer.join()
+        searched += 1
+
+
+def _renew(queue, worker, basis, stop, deadline=None):
+    while not stop.wait(queue.lease / 3):
+        if deadline is not None and time.time() > deadline:
+            return
+        queue.renew(worker, basis)
+
+
+def coordinate(path, bases, strategy_pack=None, workers=0, symmetries=False,
+               output=None, max_time=None, lease=600, poll=5, max_attempts=3):
+    """
+    Add the bases to the queue at path and wait until every basis is done or
+    failed, running the given number of workers on this machine. If output is
+    given, the proof trees are written to it as lines of JSON. Return the
+    number of bases with a proof tree.
+    """
+    queue = WorkQueue(path, lease=lease, max_attempts=max_attempts)
+    queue.add(bases, symmetries=symmetries)
+    processes = [multiprocessing.Process(target=run_worker,
+                                         args=(path, strategy_pack, max_time,
+                                               lease, poll, None,
+                                               max_attempts))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    while not queue.finished():
+        time.sleep(poll)
+    # A worker still searching for a basis that failed may hang forever.
+    for process in processes:
+        process.join(poll)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    for basis, error in queue.failed():
+        logger.error("Gave up on %s:\n%s", basis, error)
+    solved = 0
+    lines = []
+    for basis, tree in queue.results():
+        if tree is not None:
+            solved += 1
+        lines.append(json.dumps({'basis': basis,
+                                 'tree': (tree.to_jsonable()
+                                          if tree is not None else None)}))
+    if output is not None:
+        with open(output, 'w') as f:
+            for line in lines:
+                f.write(line + "\n")
+    return solved